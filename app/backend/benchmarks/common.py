@@ -0,0 +1,137 @@
+"""
+Shared helpers for the benchmark scripts: latency statistics, seeding a
+database, running the API in a uvicorn subprocess and generating load.
+"""
+
+import os, sys, time, asyncio, socket, statistics, subprocess
+from contextlib import contextmanager
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCH_USERNAME = "bench_admin"
+BENCH_PASSWORD = "bench_password"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_database(database_url: str, tasks: int = 0, schedule_cron: str | None = None,
+                  script_path: str = "/bin/true", reset: bool = False):
+    """
+    Creates the schema, an active admin user and `tasks` task rows in a subprocess.
+    With reset=True all app tables and scheduler jobs are dropped first.
+    """
+    script = f"""
+from sqlalchemy import insert, text
+from sqlmodel import SQLModel, Session, select
+from db.session import engine
+from db.schema import migrate
+from models.user import Users, UserRole
+from models.task import Task
+from core.hashing import hash_password_sync
+
+if {reset}:
+    SQLModel.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS apscheduler_jobs"))
+migrate(engine)
+with Session(engine) as session:
+    if not session.exec(select(Users).where(Users.username == {BENCH_USERNAME!r})).first():
+        session.add(Users(username={BENCH_USERNAME!r}, email="bench@example.com",
+                          hashed_password=hash_password_sync({BENCH_PASSWORD!r}),
+                          is_active=True, is_admin=True, role=UserRole.admin))
+    rows = [dict(taskname=f"bench_{{i}}", sheduled={schedule_cron is not None}, runcount=0, successful=True,
+                 schedule_cron={schedule_cron!r}, script_path={script_path!r}, script_type="bash")
+            for i in range({tasks})]
+    for start in range(0, len(rows), 5000):
+        session.execute(insert(Task), rows[start:start + 5000])
+    session.commit()
+"""
+    subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, check=True,
+                   env=os.environ | {"DATABASE_URL": database_url})
+
+
+@contextmanager
+def run_server(database_url: str, extra_env: dict | None = None, workers: int = 1, poll_interval: float = 0.2):
+    """Starts the API with uvicorn on a free port and yields its base URL once it answers."""
+    port = free_port()
+    env = os.environ | {"DATABASE_URL": database_url} | (extra_env or {})
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                httpx.get(f"{url}/docs", timeout=1)
+                break
+            except httpx.TransportError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("API server did not start")
+                time.sleep(poll_interval)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def login(url: str, username: str = BENCH_USERNAME, password: str = BENCH_PASSWORD) -> str:
+    response = httpx.post(f"{url}/login", data={"username": username, "password": password}, timeout=30)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _load(url: str, headers: dict, request, concurrency: int, duration: float) -> dict:
+    samples, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=60) as client:
+        async def worker(number: int):
+            nonlocal errors
+            sequence = 0
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await request(client, number, sequence)
+                sequence += 1
+                if response.is_success:
+                    samples.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker(number) for number in range(concurrency)))
+
+    return summarize(samples) | {"requests_per_second": len(samples) / duration, "errors": errors}
+
+
+def run_load(url: str, request, concurrency: int, duration: float, token: str | None = None) -> dict:
+    """
+    Runs `await request(client, worker_number, sequence)` from `concurrency`
+    concurrent clients for `duration` seconds and summarizes the latencies.
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    return asyncio.run(_load(url, headers, request, concurrency, duration))
@@ -0,0 +1,56 @@
+"""
+compare.py
+
+Compares two reports written by suite.py and prints the change of every
+latency and throughput figure. Exits with status 1 if anything got worse by
+more than --threshold percent, so it can gate CI.
+
+    python benchmarks/compare.py baseline.json results.json --threshold 10
+"""
+
+import sys, json, argparse
+
+# metric -> True if a higher value is better
+METRICS = {"p50_ms": False, "p99_ms": False, "mean_ms": False, "requests_per_second": True}
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    values = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values |= flatten(value, path)
+        elif key in METRICS and isinstance(value, (int, float)):
+            values[path] = value
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    print(f"baseline {baseline['meta'].get('commit')}  ->  current {current['meta'].get('commit')}")
+
+    before, after = flatten(baseline["results"]), flatten(current["results"])
+    regressions = 0
+    for path in sorted(before.keys() & after.keys()):
+        old, new = before[path], after[path]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = change < -args.threshold if METRICS[path.rsplit(".", 1)[1]] else change > args.threshold
+        regressions += worse
+        print(f"{'REGRESSION ' if worse else '           '}{path:60} {old:12.2f} -> {new:12.2f}  ({change:+.1f}%)")
+
+    if regressions:
+        print(f"{regressions} figures regressed by more than {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
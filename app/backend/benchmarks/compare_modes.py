@@ -0,0 +1,64 @@
+"""
+compare_modes.py
+
+Load benchmark comparing API_MODE=sync and API_MODE=async. For each mode the
+script seeds a fresh database, starts the API with uvicorn and hammers
+GET /tasks with many concurrent clients, then prints throughput and latency
+percentiles as JSON.
+
+    python benchmarks/compare_modes.py --concurrency 200 --duration 15
+
+Without --database-url each mode gets its own temporary SQLite database.
+"""
+
+import argparse, asyncio, json, os, tempfile, time
+import httpx
+
+from common import seed_database, run_server, login, summarize
+
+
+async def hammer(url: str, token: str, concurrency: int, duration: float) -> dict:
+    samples, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, headers={"Authorization": f"Bearer {token}"}, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.get("/tasks", params={"limit": 50})
+                if response.status_code == 200:
+                    samples.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return summarize(samples) | {"requests_per_second": len(samples) / duration, "errors": errors}
+
+
+def run_mode(mode: str, database_url: str | None, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url_for_mode = database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed_database(url_for_mode, tasks=args.tasks)
+        with run_server(url_for_mode, {"API_MODE": mode, "TASK_LOG_DIR": tmp}) as url:
+            token = login(url)
+            return asyncio.run(hammer(url, token, args.concurrency, args.duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to benchmark against (must be empty or disposable)")
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    report = {mode: run_mode(mode, args.database_url, args) for mode in ("sync", "async")}
+    report["config"] = vars(args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+login_storm.py
+
+Measures GET /tasks latency while a storm of logins is running against the
+same API instance. Start the API first, then run e.g.
+
+    python benchmarks/login_storm.py --url http://localhost:5000 --username admin --password adminpass
+
+Prints a JSON report with p50/p99 latency of GET /tasks with and without the
+concurrent logins, plus login throughput.
+"""
+
+import argparse, json, threading, time
+import httpx
+
+from common import summarize
+
+
+def login(client: httpx.Client, username: str, password: str) -> str:
+    response = client.post("/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def poll_tasks(url: str, token: str, stop: threading.Event, samples: list[float]):
+    with httpx.Client(base_url=url, headers={"Authorization": f"Bearer {token}"}) as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get("/tasks")
+            samples.append(time.perf_counter() - started)
+
+
+def login_loop(url: str, username: str, password: str, stop: threading.Event, samples: list[float], errors: list[int]):
+    with httpx.Client(base_url=url, timeout=30) as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post("/login", data={"username": username, "password": password})
+            if response.status_code == 200:
+                samples.append(time.perf_counter() - started)
+            else:
+                errors.append(response.status_code)
+
+
+def measure(url: str, token: str, username: str, password: str, duration: float, pollers: int, logins: int) -> dict:
+    stop = threading.Event()
+    task_samples, login_samples, login_errors = [], [], []
+    threads = [threading.Thread(target=poll_tasks, args=(url, token, stop, task_samples)) for _ in range(pollers)]
+    threads += [threading.Thread(target=login_loop, args=(url, username, password, stop, login_samples, login_errors)) for _ in range(logins)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "login_workers": logins,
+        "get_tasks": summarize(task_samples),
+        "login": summarize(login_samples) | {"per_second": len(login_samples) / duration, "errors": len(login_errors)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--pollers", type=int, default=4)
+    parser.add_argument("--logins", type=int, default=32)
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.url, timeout=30) as client:
+        token = login(client, args.username, args.password)
+
+    report = {
+        "baseline": measure(args.url, token, args.username, args.password, args.duration, args.pollers, 0),
+        "login_storm": measure(args.url, token, args.username, args.password, args.duration, args.pollers, args.logins),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
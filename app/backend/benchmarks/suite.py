@@ -0,0 +1,272 @@
+"""
+suite.py
+
+Reproducible benchmark suite for the backend. Every scenario starts the API
+with uvicorn against a freshly seeded database and writes its results to one
+JSON file, so runs of different commits can be compared with compare.py.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --database-url postgresql://... --scenarios login,get_tasks
+
+Scenarios:
+- login: throughput and latency of POST /login.
+- get_tasks: GET /tasks (first page and a filtered page) at several table sizes.
+- create_tasks: POST /tasks with a cron schedule, i.e. including the job store write.
+- scheduler_lag: fire-to-start lag when 1k/10k cron jobs fire in the same minute.
+- run_overhead: cost of run_script per run compared to a bare subprocess.
+- startup: time to import the API and the worker, and until a started API answers.
+
+Without --database-url each scenario uses its own temporary SQLite database.
+A given --database-url is wiped before every scenario.
+"""
+
+import os, sys, json, time, argparse, platform, tempfile, subprocess
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import create_engine, select, func, table, column, DateTime
+
+from common import BACKEND_DIR, summarize, seed_database, run_server, login, run_load, BENCH_USERNAME, BENCH_PASSWORD
+
+SCENARIOS = ("login", "get_tasks", "create_tasks", "scheduler_lag", "run_overhead", "startup")
+
+taskrun = table("taskrun", column("started_at", DateTime))
+apscheduler_jobs = table("apscheduler_jobs", column("id"))
+
+
+def int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def write_script(directory: str) -> str:
+    path = os.path.join(directory, "noop.sh")
+    with open(path, "w") as f:
+        f.write("exit 0\n")
+    return path
+
+
+def bench_login(database_url: str, workdir: str, args) -> dict:
+    seed_database(database_url, reset=True)
+    with run_server(database_url, {"TASK_LOG_DIR": workdir}) as url:
+        async def request(client, number, sequence):
+            return await client.post("/login", data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+        return run_load(url, request, args.concurrency, args.duration)
+
+
+def bench_get_tasks(database_url: str, workdir: str, args) -> dict:
+    results = {}
+    seeded = 0
+    seed_database(database_url, reset=True)
+    for size in sorted(args.table_sizes):
+        # Sizes grow, so only the difference is inserted for each step
+        seed_database(database_url, tasks=size - seeded)
+        seeded = size
+        with run_server(database_url, {"TASK_LOG_DIR": workdir}) as url:
+            token = login(url)
+
+            async def first_page(client, number, sequence):
+                return await client.get("/tasks", params={"limit": 50})
+
+            async def filtered_page(client, number, sequence):
+                return await client.get("/tasks", params={"limit": 50, "script_type": "bash", "name_prefix": "bench_1"})
+
+            results[str(size)] = {
+                "first_page": run_load(url, first_page, args.concurrency, args.duration, token),
+                "filtered_page": run_load(url, filtered_page, args.concurrency, args.duration, token),
+            }
+    return results
+
+
+def bench_create_tasks(database_url: str, workdir: str, args) -> dict:
+    seed_database(database_url, reset=True)
+    script_path = write_script(workdir)
+    with run_server(database_url, {"TASK_LOG_DIR": workdir}) as url:
+        token = login(url)
+
+        async def request(client, number, sequence):
+            return await client.post("/tasks", json={
+                "taskname": f"create_{number}_{sequence}", "sheduled": True, "runcount": 0, "successful": True,
+                # a yearly schedule so the created jobs never fire during the benchmark
+                "schedule_cron": "0 0 1 1 *", "script_path": script_path, "script_type": "bash",
+            })
+
+        return run_load(url, request, args.concurrency, args.duration, token)
+
+
+def wait_for(condition, timeout: float, interval: float = 1.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes, they are stored in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def bench_scheduler_lag(database_url: str, workdir: str, args) -> dict:
+    results = {}
+    script_path = write_script(workdir)
+    engine = create_engine(database_url)
+    for jobs in args.cron_jobs:
+        seed_database(database_url, tasks=jobs, schedule_cron="* * * * *", script_path=script_path, reset=True)
+        # The executor queue has to hold one full minute of fires, otherwise runs are rejected
+        env = {"TASK_LOG_DIR": workdir, "TASK_MAX_QUEUE": str(jobs)}
+        with run_server(database_url, env):
+            def registered():
+                with engine.connect() as connection:
+                    return connection.execute(select(func.count()).select_from(apscheduler_jobs)).scalar() >= jobs
+            if not wait_for(registered, timeout=300):
+                raise RuntimeError(f"Scheduler did not register {jobs} jobs")
+
+            now = datetime.now(timezone.utc)
+            fire_time = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            time.sleep(max((fire_time - datetime.now(timezone.utc)).total_seconds(), 0))
+
+            def started_runs() -> list[datetime]:
+                with engine.connect() as connection:
+                    rows = connection.execute(select(taskrun.c.started_at)).scalars().all()
+                return [as_utc(started_at) for started_at in rows if as_utc(started_at) < fire_time + timedelta(minutes=1)]
+
+            # Runs are recorded in batches after they finish, give the last ones time to land
+            wait_for(lambda: len(started_runs()) >= jobs, timeout=args.drain_timeout)
+            lags = [(started_at - fire_time).total_seconds() for started_at in started_runs()]
+
+        results[str(jobs)] = summarize(lags) | {"jobs": jobs, "started": len(lags), "missed": jobs - len(lags)}
+    engine.dispose()
+    return results
+
+
+RUN_OVERHEAD_SCRIPT = """
+import sys, json, time, subprocess
+from db.session import engine
+from db.schema import migrate
+from core.runner import run_script
+from core.runs import run_writer
+
+migrate(engine)
+script_path, runs = sys.argv[1], int(sys.argv[2])
+
+bare = []
+for _ in range(runs):
+    started = time.perf_counter()
+    subprocess.run(["bash", script_path], stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    bare.append(time.perf_counter() - started)
+
+full = []
+for _ in range(runs):
+    started = time.perf_counter()
+    run_script(0, script_path, "", "bash")
+    full.append(time.perf_counter() - started)
+run_writer.stop()
+print(json.dumps({"bare": bare, "run_script": full}))
+"""
+
+
+def bench_run_overhead(database_url: str, workdir: str, args) -> dict:
+    seed_database(database_url, reset=True)
+    script_path = write_script(workdir)
+    output = subprocess.run(
+        [sys.executable, "-c", RUN_OVERHEAD_SCRIPT, script_path, str(args.runs)],
+        cwd=BACKEND_DIR, check=True, capture_output=True, text=True,
+        env=os.environ | {"DATABASE_URL": database_url, "TASK_LOG_DIR": workdir},
+    ).stdout
+    samples = json.loads(output.strip().splitlines()[-1])
+    bare, full = summarize(samples["bare"]), summarize(samples["run_script"])
+    return {
+        "bare_subprocess": bare,
+        "run_script": full,
+        "overhead_p50_ms": full["p50_ms"] - bare["p50_ms"],
+        "overhead_mean_ms": full["mean_ms"] - bare["mean_ms"],
+    }
+
+
+def bench_startup(database_url: str, workdir: str, args) -> dict:
+    seed_database(database_url, reset=True)
+    env = os.environ | {"DATABASE_URL": database_url, "TASK_LOG_DIR": workdir}
+    results = {}
+    for module in ("main", "worker"):
+        samples = []
+        for _ in range(args.startup_runs):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", f"import {module}"], cwd=BACKEND_DIR, env=env, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            samples.append(time.perf_counter() - started)
+        results[f"import_{module}"] = summarize(samples)
+
+    samples = []
+    for _ in range(args.startup_runs):
+        started = time.perf_counter()
+        with run_server(database_url, {"TASK_LOG_DIR": workdir}, poll_interval=0.01):
+            samples.append(time.perf_counter() - started)
+    results["server_ready"] = summarize(samples)
+    return results
+
+
+BENCHMARKS = {
+    "login": bench_login,
+    "get_tasks": bench_get_tasks,
+    "create_tasks": bench_create_tasks,
+    "scheduler_lag": bench_scheduler_lag,
+    "run_overhead": bench_run_overhead,
+    "startup": bench_startup,
+}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to benchmark against (wiped before every scenario)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per measurement")
+    parser.add_argument("--table-sizes", type=int_list, default=[1000, 10000, 100000])
+    parser.add_argument("--cron-jobs", type=int_list, default=[1000, 10000])
+    parser.add_argument("--drain-timeout", type=float, default=120, help="Seconds to wait for the runs of one minute")
+    parser.add_argument("--runs", type=int, default=200, help="Runs per measurement in run_overhead")
+    parser.add_argument("--startup-runs", type=int, default=10, help="Process starts per measurement in startup")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": (args.database_url or "sqlite").split(":", 1)[0],
+            "config": {key: value for key, value in vars(args).items() if key not in ("database_url", "output")},
+        },
+        "results": {},
+    }
+    for name in scenarios:
+        print(f"Running {name} ...", file=sys.stderr)
+        with tempfile.TemporaryDirectory() as workdir:
+            database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+            started = time.monotonic()
+            report["results"][name] = BENCHMARKS[name](database_url, workdir, args)
+            print(f"  done in {time.monotonic() - started:.0f}s", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
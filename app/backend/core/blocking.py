@@ -0,0 +1,33 @@
+"""
+blocking.py
+
+Dedicated thread pool for the blocking calls the async handlers (API_MODE=async)
+still make: job store writes, script validation, the task version counter and
+the registration mail. Handlers await the pool's futures through
+asyncio.wrap_future, so these calls never wait for, or take, a slot of the
+threadpool that sync endpoints and dependencies share.
+
+Environment Variables:
+- ASYNC_BLOCKING_WORKERS: Number of threads for blocking calls.
+"""
+
+import os, asyncio, threading
+from concurrent.futures import ThreadPoolExecutor
+
+ASYNC_BLOCKING_WORKERS = int(os.getenv("ASYNC_BLOCKING_WORKERS", 8))
+
+_pool = None
+_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=ASYNC_BLOCKING_WORKERS, thread_name_prefix="async-blocking")
+        return _pool
+
+
+async def run_blocking(fn, *args):
+    """Runs `fn(*args)` on the blocking pool and awaits its result."""
+    return await asyncio.wrap_future(_get_pool().submit(fn, *args))
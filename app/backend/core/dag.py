@@ -0,0 +1,181 @@
+"""
+dag.py
+
+Task dependencies. A task may depend on other tasks (TaskDependency rows);
+when a task run succeeds, everything downstream of it is started as one DAG
+run: each node is handed to the executor as soon as all of its parents inside
+that DAG run succeeded, so independent branches run in parallel up to the
+executor limits and a pipeline finishes at its critical-path time.
+
+Parents outside the downstream set of the triggering task are not waited for.
+If a node fails, everything below it is skipped.
+"""
+
+import threading, logging
+from concurrent.futures import Future
+from sqlmodel import Session, select
+
+from db.session import scheduler_engine
+from models.task import Task, TaskDependency
+from core.executor import executor, QueueFull
+from core.runner import run_script
+from core.limits import task_limits
+from core.retry import retry_failed
+
+logger = logging.getLogger(__name__)
+
+
+def downstream_edges(session: Session, task_id: int) -> list[tuple[int, int]]:
+    """(child, parent) edges of everything reachable downstream of `task_id`, one query per level."""
+    edges, seen, frontier = [], {task_id}, {task_id}
+    while frontier:
+        rows = session.exec(
+            select(TaskDependency.task_id, TaskDependency.depends_on_id).where(TaskDependency.depends_on_id.in_(frontier))
+        ).all()
+        edges.extend(rows)
+        frontier = {child for child, _ in rows} - seen
+        seen |= frontier
+    return edges
+
+
+def has_cycle(nodes: set[int], edges: list[tuple[int, int]]) -> bool:
+    remaining = {node: 0 for node in nodes}
+    children = {node: [] for node in nodes}
+    for child, parent in edges:
+        remaining[child] += 1
+        children[parent].append(child)
+    ready = [node for node, count in remaining.items() if count == 0]
+    visited = 0
+    while ready:
+        node = ready.pop()
+        visited += 1
+        for child in children[node]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                ready.append(child)
+    return visited != len(nodes)
+
+
+class DagRun:
+    """Runs the downstream nodes of `root_id`, whose run already succeeded."""
+
+    def __init__(self, root_id: int, tasks: dict[int, dict], edges: list[tuple[int, int]]):
+        self.root_id = root_id
+        self.tasks = tasks
+        self.children = {task_id: [] for task_id in tasks}
+        self.children[root_id] = []
+        self.waiting = {task_id: 0 for task_id in tasks}
+        for child, parent in edges:
+            self.children[parent].append(child)
+            self.waiting[child] += 1
+        self.status = {task_id: "pending" for task_id in tasks}
+        self.done = Future()
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def start(self) -> Future:
+        """Returns a future with {task_id: "succeeded" | "failed" | "skipped"} once every node settled."""
+        self._node_finished(self.root_id, True)
+        return self.done
+
+    def _submit(self, task_id: int):
+        task = self.tasks[task_id]
+        try:
+            future = executor.submit_run(task_id, task["max_instances"], task["skip_if_running"], task["script_type"],
+                                         run_script, task_id, task["script_path"], task["parameters"] or "", task["script_type"],
+                                         task_limits(task))
+        except QueueFull as e:
+            logger.error(f"DAG run of task {self.root_id}: could not start task {task_id}: {e}")
+            self._node_finished(task_id, False)
+            return
+        if future is None:
+            logger.warning(f"DAG run of task {self.root_id}: task {task_id} is already running, not starting it again")
+            self._node_finished(task_id, False)
+            return
+        future.add_done_callback(lambda f: _retry_failed(task_id, task["script_type"], f))
+        future.add_done_callback(lambda f: self._node_finished(task_id, f.exception() is None and f.result().successful))
+
+    def _skip(self, task_id: int):
+        # Must be called with self._lock held
+        for child in self.children[task_id]:
+            if self.status[child] == "pending":
+                self.status[child] = "skipped"
+                self._skip(child)
+
+    def _node_finished(self, task_id: int, succeeded: bool):
+        ready = []
+        with self._lock:
+            if task_id != self.root_id:
+                self.status[task_id] = "succeeded" if succeeded else "failed"
+            if succeeded:
+                for child in self.children[task_id]:
+                    self.waiting[child] -= 1
+                    if self.waiting[child] == 0 and self.status[child] == "pending":
+                        self.status[child] = "running"
+                        ready.append(child)
+            else:
+                self._skip(task_id)
+            finished = not self._finished and all(status not in ("pending", "running") for status in self.status.values())
+            self._finished |= finished
+        for child in ready:
+            self._submit(child)
+        if finished:
+            logger.info(f"DAG run of task {self.root_id} finished: {self.status}")
+            self.done.set_result(dict(self.status))
+
+
+def start_downstream(task_id: int) -> Future | None:
+    """Starts the DAG run below `task_id` after it succeeded. Returns None if nothing depends on it."""
+    with Session(scheduler_engine) as session:
+        edges = downstream_edges(session, task_id)
+        if not edges:
+            return None
+        nodes = {child for child, _ in edges}
+        tasks = {task.id: task.model_dump() for task in session.exec(select(Task).where(Task.id.in_(nodes))).all()}
+
+    # Tasks deleted in the meantime drop out of the run, together with
+    # whatever was only reachable through them
+    edges = [(child, parent) for child, parent in edges if child in tasks and (parent in tasks or parent == task_id)]
+    reachable, frontier = set(), {task_id}
+    while frontier:
+        frontier = {child for child, parent in edges if parent in frontier} - reachable
+        reachable |= frontier
+    tasks = {node: task for node, task in tasks.items() if node in reachable}
+    edges = [(child, parent) for child, parent in edges if child in reachable and (parent in reachable or parent == task_id)]
+    if has_cycle(set(tasks) | {task_id}, edges):
+        logger.error(f"Dependencies below task {task_id} contain a cycle, not starting the DAG run")
+        return None
+    return DagRun(task_id, tasks, edges).start()
+
+
+def _retry_failed(task_id: int, script_type: str, future: Future):
+    # Runs in the submitting process, which owns the scheduler
+    if future.exception() is None:
+        retry_failed(task_id, script_type, future.result())
+
+
+def _trigger_downstream(task_id: int, future: Future):
+    if future.exception() is not None or not future.result().successful:
+        return
+    try:
+        start_downstream(task_id)
+    except Exception:
+        logger.exception(f"Could not start the DAG run below task {task_id}")
+
+
+def submit_run(task_id: int, script_path: str, parameters: str, script_type: str,
+               max_instances: int = 1, skip_if_running: bool = False, limits: dict | None = None,
+               attempt: int = 1) -> Future | None:
+    """
+    Hands one run to the executor, schedules its retry if it failed and starts
+    the tasks depending on it once it succeeded. Returns None if the run was
+    dropped by the task's overlap policy.
+    """
+    future = executor.submit_run(task_id, max_instances, skip_if_running, script_type,
+                                 run_script, task_id, script_path, parameters, script_type, limits, attempt)
+    if future is None:
+        logger.info(f"Task {task_id} is at its limit of {max_instances} running instance(s), skipping this run")
+        return None
+    future.add_done_callback(lambda f: _retry_failed(task_id, script_type, f))
+    future.add_done_callback(lambda f: _trigger_downstream(task_id, f))
+    return future
@@ -1,23 +1,15 @@
-import smtplib, os, logging, secrets
+import os, logging, secrets
 from urllib.parse import urlencode
 from email.message import EmailMessage
 from datetime import datetime, timezone, timedelta
-from dotenv import load_dotenv
-from jinja2 import Environment, FileSystemLoader
+from core.templates import render
 from core.token import create_secure_token
+from core.mailer import mail_queue
 from models.user import Users, UserApprovalToken
 from sqlmodel import Session, select
 
-load_dotenv()
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-env = Environment(loader=FileSystemLoader("templates"))
-
-SMTP_SERVER = os.getenv("SMTP_SERVER", "localhost")
-SMTP_PORT = os.getenv("SMTP_PORT", 587)
-SMTP_USERNAME = os.getenv("SMTP_USERNAME")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 FROM_EMAIL = os.getenv("FROM_EMAIL")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
 
@@ -43,8 +35,7 @@ def send_email(session: Session, user: Users):
 
     approval_link = f"https://dashboard.tuschkoreit.de/admin/approve/?token={token}"
 
-    template = env.get_template("user_approval_email.html")
-    html = template.render(username=user.username, approve_link=approval_link)
+    html = render("user_approval_email.html", username=user.username, approve_link=approval_link)
 
     msg = EmailMessage()
     msg["Subject"] = f"User {user.username} awaits approval"
@@ -53,23 +44,11 @@ def send_email(session: Session, user: Users):
     msg.set_content("Your client doesnt support HTML emails")
     msg.add_alternative(html, subtype='html')
 
-    try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.set_debuglevel(1)
-            server.starttls()
-            if SMTP_USERNAME and SMTP_PASSWORD:
-                server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.send_message(msg)
-            logger.info(f"Email sent to {ADMIN_EMAIL}")
-    except Exception as e:
-        logger.error(f"Error sending email to {ADMIN_EMAIL}: {e}", exc_info=True)
+    mail_queue.enqueue(msg)
+    logger.info(f"Approval request for {user.username} queued for {msg['To']}")
 
-def send_approval_email(session: Session, user: Users):
-    
-    
-    
-    template = env.get_template("user_approved_email.html")
-    html = template.render(username=user.username)
+def send_approval_email(user: Users):
+    html = render("user_approved_email.html", username=user.username)
 
     msg = EmailMessage()
     msg["Subject"] = f"Hey {user.username}, your account has now been approved"
@@ -78,13 +57,5 @@ def send_approval_email(session: Session, user: Users):
     msg.set_content("Your client doesnt support HTML emails")
     msg.add_alternative(html, subtype='html')
 
-    try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.set_debuglevel(1)
-            server.starttls()
-            if SMTP_USERNAME and SMTP_PASSWORD:   
-                server.login(SMTP_USERNAME, SMTP_PASSWORD)  
-            server.send_message(msg)
-            logger.info(f"Approval mail has been sent to {user.email}")
-    except Exception as e:
-        logger.error(f"Error sending approval email to {user.email}: {e}", exc_info=True)
\ No newline at end of file
+    mail_queue.enqueue(msg)
+    logger.info(f"Approval mail for {user.email} queued")
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+etag.py
+
+Conditional GETs for the task read endpoints. The task table's version
+counter (core/versions.py) is the strong ETag: a poll whose If-None-Match
+still matches is answered with 304 without touching the database, and a
+changed-but-cached page is served from the serialized response cache without
+running the query or encoding JSON again.
+
+Environment Variables:
+- TASK_RESPONSE_CACHE_SIZE: Number of serialized responses kept.
+- TASK_RESPONSE_CACHE_TTL: Seconds a serialized response is kept.
+"""
+
+import os
+from fastapi import Request, Response
+
+from core.cache import TTLCache
+
+TASK_RESPONSE_CACHE_SIZE = int(os.getenv("TASK_RESPONSE_CACHE_SIZE", 256))
+TASK_RESPONSE_CACHE_TTL = float(os.getenv("TASK_RESPONSE_CACHE_TTL", 60))
+
+response_cache = TTLCache(maxsize=TASK_RESPONSE_CACHE_SIZE, ttl=TASK_RESPONSE_CACHE_TTL)
+
+
+def etag_for(version: int) -> str:
+    return f'"v{version}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _response(status_code: int, etag: str, content: bytes = b"", headers: dict | None = None) -> Response:
+    headers = (headers or {}) | {"ETag": etag, "Cache-Control": "no-cache"}
+    if status_code == 304:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def cached_response(request: Request, version: int, key: tuple) -> Response | None:
+    """304 if the client is up to date, the cached response for `key` at `version`, else None."""
+    etag = etag_for(version)
+    entry = response_cache.get((key, version))
+    if _matches(request, etag):
+        return _response(304, etag, headers=entry[1] if entry else None)
+    if entry is not None:
+        return _response(200, etag, *entry)
+    return None
+
+
+def store_response(version: int, key: tuple, content: bytes, headers: dict | None = None) -> Response:
+    response_cache.set((key, version), (content, headers or {}))
+    return _response(200, etag_for(version), content, headers)
+
+
+def json_list(models: list) -> bytes:
+    return b"[" + b",".join(model.model_dump_json().encode() for model in models) + b"]"
@@ -0,0 +1,82 @@
+"""
+events.py
+
+In-process pub/sub for run events (run_started, output, run_finished).
+Publishers are plain threads (executor, output capture); subscribers are
+asyncio consumers such as the SSE endpoint. Each event is handed to every
+event loop with a single call_soon_threadsafe, no matter how many subscribers
+that loop serves, and slow subscribers lose their oldest events instead of
+growing memory. Publishing with no subscribers costs a dict lookup.
+
+Only runs executed by this process are visible; runs executed by worker.py or
+by another API process publish in their own process.
+
+Environment Variables:
+- EVENT_QUEUE_SIZE: Events buffered per subscriber before the oldest are dropped.
+"""
+
+import os, asyncio, threading
+from collections import defaultdict
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 256))
+
+
+class Subscription:
+    def __init__(self, task_id: int | None, maxsize: int):
+        self.task_id = task_id
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def wants(self, event: dict) -> bool:
+        return self.task_id is None or self.task_id == event.get("task_id")
+
+    def push(self, event: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+def _deliver(subscriptions: list[Subscription], event: dict):
+    for subscription in subscriptions:
+        if subscription.wants(event):
+            subscription.push(event)
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, task_id: int | None = None) -> Subscription:
+        """Must be called from the event loop that will consume the subscription."""
+        subscription = Subscription(task_id, self.queue_size)
+        with self._lock:
+            self._subscribers[asyncio.get_running_loop()].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for loop, subscriptions in list(self._subscribers.items()):
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[loop]
+
+    def publish(self, event: dict):
+        if not self._subscribers:
+            return
+        with self._lock:
+            targets = [(loop, list(subscriptions)) for loop, subscriptions in self._subscribers.items()]
+        for loop, subscriptions in targets:
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, event)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+
+broker = EventBroker()
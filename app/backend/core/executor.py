@@ -0,0 +1,247 @@
+"""
+executor.py
+
+Bounded execution layer for task runs. Scheduler jobs only hand runs over to
+the executor, which caps how many scripts run at once (globally and per
+script_type) and keeps everything else in a FIFO wait queue.
+
+Environment Variables:
+- TASK_MAX_WORKERS: Global number of scripts allowed to run at the same time.
+- TASK_TYPE_LIMITS: Per script_type caps, e.g. "python=4,bash=8".
+- TASK_MAX_QUEUE: Maximum number of waiting runs before new runs get rejected.
+- TASK_EXECUTOR_MODE: "thread" (default) or "process" for process-pool isolation.
+
+In process mode runs execute in forkserver (or spawn) pool processes. Run
+history still reaches the database through each pool process's run writer,
+but run events and metrics are recorded inside the pool processes: /events
+and /metrics of the parent do not see them. Retries are scheduled by the
+parent from the returned RunResult (see core/retry.py).
+"""
+
+import os, time, threading, logging, multiprocessing
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+from core.metrics import executor_wait
+
+logger = logging.getLogger(__name__)
+
+TASK_MAX_WORKERS = int(os.getenv("TASK_MAX_WORKERS", 8))
+TASK_TYPE_LIMITS = os.getenv("TASK_TYPE_LIMITS", "")
+TASK_MAX_QUEUE = int(os.getenv("TASK_MAX_QUEUE", 1000))
+TASK_EXECUTOR_MODE = os.getenv("TASK_EXECUTOR_MODE", "thread")
+
+
+def parse_type_limits(value: str) -> dict[str, int]:
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        script_type, _, limit = item.partition("=")
+        limits[script_type.strip()] = int(limit)
+    return limits
+
+
+def _init_process():
+    # Pool processes exit through multiprocessing, which skips atexit, so the
+    # run writer is flushed by a multiprocessing finalizer instead
+    from multiprocessing.util import Finalize
+    from core.runs import run_writer
+    Finalize(None, run_writer.stop, exitpriority=10)
+
+
+def _process_context():
+    # Never fork: the parent has scheduler, writer and watchdog threads and
+    # pooled DB connections that a forked child would inherit half-copied
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class TaskExecutor:
+    """
+    Runs submitted callables on a pool that never has more than `max_workers`
+    runs in flight, and no more than `type_limits[script_type]` per type.
+    Runs that cannot start yet wait in the queue without holding a pool thread.
+    Runs submitted with submit_run are additionally limited per task.
+    """
+
+    def __init__(self, max_workers: int = TASK_MAX_WORKERS, type_limits: dict[str, int] | None = None,
+                 max_queue: int = TASK_MAX_QUEUE, mode: str = TASK_EXECUTOR_MODE):
+        self.max_workers = max_workers
+        self.type_limits = type_limits if type_limits is not None else parse_type_limits(TASK_TYPE_LIMITS)
+        self.max_queue = max_queue
+        self.mode = mode
+
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._pending = deque()
+        self._running = 0
+        self._running_by_type: dict[str, int] = {}
+        self._running_by_task: dict[int, int] = {}
+        self._pending_by_task: dict[int, int] = {}
+        self._pool = None
+
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.peak_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_process_context(),
+                                                     initializer=_init_process)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task-run")
+            return self._pool
+
+    def _has_slot(self, script_type: str, task_id: int | None, task_limit: int | None) -> bool:
+        if self._running >= self.max_workers:
+            return False
+        if task_id is not None and self._running_by_task.get(task_id, 0) >= task_limit:
+            return False
+        limit = self.type_limits.get(script_type)
+        return limit is None or self._running_by_type.get(script_type, 0) < limit
+
+    def _enqueue(self, item: tuple):
+        # Must be called with self._lock held
+        if len(self._pending) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(f"Executor queue is full ({self.max_queue} runs waiting)")
+        self.submitted += 1
+        self._pending.append(item)
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self._pending))
+
+    def submit(self, script_type: str, fn, *args, **kwargs) -> Future:
+        """Queue `fn(*args, **kwargs)`; raises QueueFull when the wait queue is at capacity."""
+        result = Future()
+        item = (script_type, None, None, fn, args, kwargs, result, time.monotonic())
+        with self._lock:
+            self._enqueue(item)
+            ready = self._take_ready()
+        self._start(ready)
+        return result
+
+    def submit_run(self, task_id: int, max_instances: int, skip_if_running: bool,
+                   script_type: str, fn, *args, **kwargs) -> Future | None:
+        """
+        Like submit, for a run of task `task_id`: at most `max_instances` runs of
+        the task execute at once. A run submitted while the task is at its limit
+        is dropped with skip_if_running; otherwise it waits, but only one run
+        per task ever waits and further ones are folded into it.
+        Returns None if the run was dropped.
+        """
+        result = Future()
+        max_instances = max(max_instances, 1)
+        item = (script_type, task_id, max_instances, fn, args, kwargs, result, time.monotonic())
+        with self._lock:
+            pending = self._pending_by_task.get(task_id, 0)
+            if self._running_by_task.get(task_id, 0) + pending >= max_instances and (skip_if_running or pending):
+                self.skipped += 1
+                return None
+            self._enqueue(item)
+            self._pending_by_task[task_id] = pending + 1
+            ready = self._take_ready()
+        self._start(ready)
+        return result
+
+    def _take_ready(self) -> list:
+        # Must be called with self._lock held. Picks runs in FIFO order,
+        # skipping over types that are at their cap so they don't block others.
+        ready = []
+        skipped = deque()
+        while self._pending and self._running < self.max_workers:
+            item = self._pending.popleft()
+            script_type, task_id, task_limit = item[:3]
+            if self._has_slot(script_type, task_id, task_limit):
+                self._running += 1
+                self._running_by_type[script_type] = self._running_by_type.get(script_type, 0) + 1
+                if task_id is not None:
+                    self._running_by_task[task_id] = self._running_by_task.get(task_id, 0) + 1
+                    self._pending_by_task[task_id] -= 1
+                    if not self._pending_by_task[task_id]:
+                        del self._pending_by_task[task_id]
+                ready.append(item)
+            else:
+                skipped.append(item)
+        skipped.extend(self._pending)
+        self._pending = skipped
+        return ready
+
+    def _start(self, ready: list):
+        now = time.monotonic()
+        for script_type, task_id, _, fn, args, kwargs, result, queued_at in ready:
+            waited = now - queued_at
+            with self._lock:
+                self.started += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            executor_wait.observe(waited, script_type)
+            future = self._get_pool().submit(fn, *args, **kwargs)
+            future.add_done_callback(lambda f, t=script_type, k=task_id, r=result: self._finished(t, k, f, r))
+
+    def _finished(self, script_type: str, task_id: int | None, future: Future, result: Future):
+        with self._lock:
+            self._running -= 1
+            self._running_by_type[script_type] -= 1
+            if task_id is not None:
+                self._running_by_task[task_id] -= 1
+                if not self._running_by_task[task_id]:
+                    del self._running_by_task[task_id]
+            self.completed += 1
+            error = future.exception()
+            if error is not None:
+                self.failed += 1
+            ready = self._take_ready()
+        if error is not None:
+            logger.error(f"Run of script type {script_type} raised: {error}")
+            result.set_exception(error)
+        else:
+            result.set_result(future.result())
+        self._start(ready)
+
+    def free_slots(self) -> int:
+        """Runs that could start right now without waiting in the queue."""
+        with self._lock:
+            return max(self.max_workers - self._running - len(self._pending), 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "type_limits": dict(self.type_limits),
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "running_by_type": dict(self._running_by_type),
+                "queue_depth": len(self._pending),
+                "peak_queue_depth": self.peak_queue_depth,
+                "submitted": self.submitted,
+                "started": self.started,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "skipped": self.skipped,
+                "tasks_running": len(self._running_by_task),
+                "avg_wait_seconds": self.total_wait_seconds / self.started if self.started else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._pool_lock:
+            pool = self._pool
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+
+executor = TaskExecutor()
@@ -0,0 +1,99 @@
+"""
+hashing.py
+
+Password hashing and verification on a dedicated process pool. bcrypt costs
+a few hundred milliseconds of CPU per call, so doing it inside the API process
+lets a burst of logins starve every other endpoint. This module is imported by
+the pool workers as well and therefore only depends on passlib.
+
+Environment Variables:
+- HASH_WORKERS: Number of hashing processes (defaults to the CPU count).
+- HASH_MAX_PENDING: Maximum number of queued and running hash operations.
+- HASH_TIMEOUT: Seconds to wait for a result before giving up.
+- HASH_NICE: Nice increment for the hashing processes, so request handling wins the CPU.
+"""
+
+import os, asyncio, threading, multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from passlib.context import CryptContext
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 2))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", 64))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", 5))
+HASH_NICE = int(os.getenv("HASH_NICE", 10))
+
+bcrypt = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password_sync(password: str) -> str:
+    return bcrypt.hash(password)
+
+
+def verify_password_sync(plaintext: str, hashed: str) -> bool:
+    return bcrypt.verify(plaintext, hashed)
+
+
+def _init_worker(nice: int):
+    if nice:
+        os.nice(nice)
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING, timeout: float = HASH_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn keeps the workers free of the API's threads, sockets and DB pool
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(HASH_NICE,),
+                )
+            return self._pool
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("Too many pending password operations")
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy("Password operation timed out")
+
+    async def run_async(self, fn, *args):
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise HashingBusy("Password operation timed out")
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+hashing_pool = HashingPool()
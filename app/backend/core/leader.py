@@ -0,0 +1,127 @@
+"""
+leader.py
+
+Leader election for running the scheduler in several API processes or
+replicas. Every process runs a LeaderElector; the one that holds a Postgres
+session-level advisory lock is the leader and is the only one whose scheduler
+fires jobs. The lock lives as long as the leader's database connection, so
+if the leader dies Postgres releases it and another process takes over
+within one poll interval.
+
+SQLite has no advisory locks; there every process considers itself leader,
+which is only correct for a single process.
+
+If taking over fails (on_elected raises), the process steps down again and
+retries on the next poll. While leader, on_tick runs every `tick_interval`
+seconds, which can be shorter than the poll interval. Every tick first checks
+that the lock connection still holds the lock: once it is gone another
+process can be elected, so this one must not fire a single job more.
+
+Environment Variables:
+- SCHEDULER_LOCK_KEY: Advisory lock key shared by all processes of a deployment.
+- LEADER_POLL_INTERVAL: Seconds between lock attempts, and between lock checks of a leader without on_tick.
+"""
+
+import os, threading, logging
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LOCK_KEY = int(os.getenv("SCHEDULER_LOCK_KEY", 726_001))
+LEADER_POLL_INTERVAL = float(os.getenv("LEADER_POLL_INTERVAL", 10))
+
+# pg_locks shows a bigint advisory key split into classid (high) and objid (low 32 bits)
+HOLDS_LOCK = text(
+    "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid() AND granted"
+    " AND classid::bigint = :classid AND objid::bigint = :objid AND objsubid = 1"
+)
+
+
+class LeaderElector:
+    def __init__(self, engine: Engine, on_elected, on_demoted, on_tick=None,
+                 key: int = SCHEDULER_LOCK_KEY, interval: float = LEADER_POLL_INTERVAL,
+                 tick_interval: float | None = None):
+        self.engine = engine
+        self.key = key
+        self.interval = interval
+        self.tick_interval = min(tick_interval or interval, interval)
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.on_tick = on_tick
+        self.is_leader = False
+        self._connection = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="leader-elector", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        single = self.engine.dialect.name != "postgresql"
+        if single:
+            logger.warning("Advisory locks need Postgres; assuming a single scheduler process")
+
+        while not self._stop.is_set():
+            try:
+                if not self.is_leader:
+                    if single:
+                        self._elected()
+                    else:
+                        self._try_acquire()
+                else:
+                    if not single:
+                        self._check_lock()
+                    if self.on_tick:
+                        self.on_tick()
+            except Exception as e:
+                logger.error(f"Leader election check failed: {e}")
+                self._release()
+            self._stop.wait(self.tick_interval if self.is_leader and self.on_tick else self.interval)
+        self._release()
+
+    def _try_acquire(self):
+        if self._connection is None:
+            # Held for as long as we are leader; the lock dies with this connection
+            self._connection = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        acquired = self._connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+        if acquired:
+            self._elected()
+
+    def _check_lock(self):
+        # Fails as well if the connection, and with it the lock, is gone
+        held = self._connection.execute(HOLDS_LOCK, {"classid": self.key >> 32, "objid": self.key & 0xFFFFFFFF}).scalar()
+        if not held:
+            raise RuntimeError(f"advisory lock {self.key} is no longer held")
+
+    def _elected(self):
+        self.is_leader = True
+        logger.info(f"Process {os.getpid()} is now scheduler leader")
+        try:
+            self.on_elected()
+        except Exception:
+            # Step down (and give up the lock) so this or another process can retry the takeover
+            logger.exception(f"Process {os.getpid()} failed to take over as scheduler leader, stepping down")
+            self._release()
+
+    def _release(self):
+        was_leader = self.is_leader
+        self.is_leader = False
+        if self._connection is not None:
+            try:
+                if was_leader:
+                    self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                self._connection.close()
+            except Exception:
+                self._connection.invalidate()
+            self._connection = None
+        if was_leader:
+            logger.info(f"Process {os.getpid()} stepped down as scheduler leader")
+            self.on_demoted()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,51 @@
+"""
+limited_exec.py
+
+Exec wrapper for runs with resource limits. Applies the rlimits and the nice
+increment given on its command line to itself and then replaces itself with
+the script's command, which inherits both. The runner starts limited runs
+through it instead of passing preexec_fn to subprocess: preexec_fn has to run
+Python code in a fork of the whole threaded API or worker process, which can
+deadlock on locks held by other threads at the time of the fork. Only built-in
+modules are imported, so the extra interpreter start costs a few milliseconds.
+
+    python -I -S limited_exec.py [--rlimit WHICH:SOFT:HARD]... [--nice N] -- COMMAND...
+"""
+
+import os, sys, resource
+
+
+def main(argv: list[str]) -> int:
+    rlimits, nice = [], 0
+    try:
+        split = argv.index("--")
+    except ValueError:
+        print("limited_exec: missing -- before the command", file=sys.stderr)
+        return 2
+    options, command = argv[:split], argv[split + 1:]
+    if not command:
+        print("limited_exec: no command given", file=sys.stderr)
+        return 2
+    for option, value in zip(options[::2], options[1::2]):
+        if option == "--rlimit":
+            rlimits.append(tuple(int(part) for part in value.split(":")))
+        elif option == "--nice":
+            nice = int(value)
+
+    try:
+        for which, soft, hard in rlimits:
+            resource.setrlimit(which, (soft, hard))
+        if nice:
+            os.nice(nice)
+    except (ValueError, OSError) as e:
+        print(f"Could not apply the resource limits of this run: {e}", file=sys.stderr)
+        return 126
+    try:
+        os.execvp(command[0], command)
+    except OSError as e:
+        print(f"Could not execute {command[0]}: {e}", file=sys.stderr)
+        return 127
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
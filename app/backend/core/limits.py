@@ -0,0 +1,166 @@
+"""
+limits.py
+
+Resource limits for script runs. A task can set a wall-clock timeout, an
+address space limit (RLIMIT_AS), a CPU time limit (RLIMIT_CPU), a nice level
+and a maximum output size; unset values fall back to the defaults below.
+rlimits and nice are applied in the run's process before the script starts,
+by the exec wrapper in core/limited_exec.py for spawned runs and by the warm
+template's child for warm python runs.
+Timeouts and the output limit are enforced by one shared watchdog thread that
+kills the run's process group: SIGTERM first, SIGKILL if it is still there
+TASK_KILL_GRACE_SECONDS later.
+
+Environment Variables:
+- TASK_DEFAULT_TIMEOUT: Wall-clock seconds a run may take (0 = unlimited).
+- TASK_DEFAULT_MAX_MEMORY_MB: Address space limit per run in MB (0 = unlimited).
+- TASK_DEFAULT_MAX_CPU_SECONDS: CPU seconds a run may use (0 = unlimited).
+- TASK_DEFAULT_NICE: Nice increment for runs (0 = same priority as the API).
+- TASK_DEFAULT_MAX_OUTPUT_BYTES: Output after which a run is killed (0 = unlimited).
+- TASK_KILL_GRACE_SECONDS: Seconds between SIGTERM and SIGKILL.
+"""
+
+import os, sys, time, heapq, signal, resource, threading, logging
+
+logger = logging.getLogger(__name__)
+
+TASK_DEFAULT_TIMEOUT = int(os.getenv("TASK_DEFAULT_TIMEOUT", 0))
+TASK_DEFAULT_MAX_MEMORY_MB = int(os.getenv("TASK_DEFAULT_MAX_MEMORY_MB", 0))
+TASK_DEFAULT_MAX_CPU_SECONDS = int(os.getenv("TASK_DEFAULT_MAX_CPU_SECONDS", 0))
+TASK_DEFAULT_NICE = int(os.getenv("TASK_DEFAULT_NICE", 0))
+TASK_DEFAULT_MAX_OUTPUT_BYTES = int(os.getenv("TASK_DEFAULT_MAX_OUTPUT_BYTES", 0))
+TASK_KILL_GRACE_SECONDS = float(os.getenv("TASK_KILL_GRACE_SECONDS", 5))
+
+EXEC_WRAPPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "limited_exec.py")
+
+DEFAULTS = {
+    "timeout_seconds": TASK_DEFAULT_TIMEOUT,
+    "max_memory_mb": TASK_DEFAULT_MAX_MEMORY_MB,
+    "max_cpu_seconds": TASK_DEFAULT_MAX_CPU_SECONDS,
+    "nice": TASK_DEFAULT_NICE,
+    "max_output_bytes": TASK_DEFAULT_MAX_OUTPUT_BYTES,
+}
+
+
+def task_limits(task) -> dict:
+    """The limit fields of a Task (or of a task dict); None means "use the default"."""
+    if isinstance(task, dict):
+        return {field: task.get(field) for field in DEFAULTS}
+    return {field: getattr(task, field) for field in DEFAULTS}
+
+
+def effective_limits(limits: dict | None) -> dict:
+    limits = limits or {}
+    return {field: default if limits.get(field) is None else limits[field] for field, default in DEFAULTS.items()}
+
+
+def rlimits_for(limits: dict) -> list[tuple[int, int, int]]:
+    rlimits = []
+    if limits["max_memory_mb"]:
+        size = limits["max_memory_mb"] * 1024 * 1024
+        rlimits.append((resource.RLIMIT_AS, size, size))
+    if limits["max_cpu_seconds"]:
+        # SIGXCPU at the soft limit, SIGKILL at the hard one
+        seconds = limits["max_cpu_seconds"]
+        rlimits.append((resource.RLIMIT_CPU, seconds, seconds + max(int(TASK_KILL_GRACE_SECONDS), 1)))
+    return rlimits
+
+
+def limited_command(command: list[str], limits: dict) -> list[str]:
+    """`command`, run through the exec wrapper if the run has rlimits or a nice level to apply."""
+    rlimits = rlimits_for(limits)
+    if not rlimits and not limits["nice"]:
+        return command
+    wrapper = [sys.executable, "-I", "-S", EXEC_WRAPPER]
+    for which, soft, hard in rlimits:
+        wrapper += ["--rlimit", f"{which}:{soft}:{hard}"]
+    if limits["nice"]:
+        wrapper += ["--nice", str(limits["nice"])]
+    return wrapper + ["--"] + command
+
+
+def killed_reason(deadline, returncode: int | None) -> str | None:
+    if deadline is not None and deadline.reason is not None:
+        return deadline.reason
+    if returncode == -signal.SIGXCPU:
+        return "cpu_limit"
+    return None
+
+
+def usage_of(rusage) -> dict:
+    return {
+        "cpu_user_seconds": rusage.ru_utime,
+        "cpu_system_seconds": rusage.ru_stime,
+        "max_rss_kb": rusage.ru_maxrss,
+    }
+
+
+class Deadline:
+    """A pending kill of one process group; cancel() once the run was reaped."""
+
+    def __init__(self, at: float, pgid: int):
+        self.at = at
+        self.pgid = pgid
+        self.reason = None
+        self.active = True
+        self._lock = threading.Lock()
+
+    def kill(self, reason: str, sig: int = signal.SIGTERM) -> bool:
+        with self._lock:
+            if not self.active:
+                return False
+            if self.reason is None:
+                self.reason = reason
+            try:
+                os.killpg(self.pgid, sig)
+            except ProcessLookupError:
+                return False
+        return True
+
+    def cancel(self):
+        with self._lock:
+            self.active = False
+
+
+class Watchdog:
+    def __init__(self, grace_seconds: float = TASK_KILL_GRACE_SECONDS):
+        self.grace_seconds = grace_seconds
+        self._heap = []
+        self._counter = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def watch(self, pgid: int, timeout: float | None) -> Deadline:
+        deadline = Deadline(time.monotonic() + timeout if timeout else float("inf"), pgid)
+        if timeout:
+            self._schedule(deadline.at, deadline, "timeout", signal.SIGTERM)
+        return deadline
+
+    def terminate(self, deadline: Deadline, reason: str):
+        """Kills the group now (e.g. output limit) and force-kills it after the grace period."""
+        if deadline.kill(reason):
+            self._schedule(time.monotonic() + self.grace_seconds, deadline, reason, signal.SIGKILL)
+
+    def _schedule(self, at: float, deadline: Deadline, reason: str, sig: int):
+        with self._cond:
+            self._counter += 1
+            heapq.heappush(self._heap, (at, self._counter, deadline, reason, sig))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="run-watchdog", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, deadline, reason, sig = heapq.heappop(self._heap)
+            if not deadline.active:
+                continue
+            logger.warning(f"Killing process group {deadline.pgid} ({reason}) with {signal.Signals(sig).name}")
+            if deadline.kill(reason, sig) and sig == signal.SIGTERM:
+                self._schedule(time.monotonic() + self.grace_seconds, deadline, reason, signal.SIGKILL)
+
+
+watchdog = Watchdog()
@@ -0,0 +1,202 @@
+"""
+mailer.py
+
+Outbound mail queue. Messages are handed to a background delivery thread that
+keeps one authenticated SMTP connection open, sends queued messages in batches
+over it and retries failed deliveries with exponential backoff. Request
+handlers only enqueue and never wait for SMTP.
+
+Environment Variables:
+- SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD: SMTP relay settings.
+- SMTP_STARTTLS: Set to "false" to skip STARTTLS (e.g. for a local relay).
+- MAIL_BATCH_SIZE: Maximum number of messages sent per batch.
+- MAIL_IDLE_TIMEOUT: Seconds an idle connection is kept open.
+- MAIL_MAX_ATTEMPTS: Delivery attempts per message before it is dropped.
+- MAIL_RETRY_DELAY: Base delay in seconds for the exponential backoff.
+"""
+
+import os, time, heapq, itertools, queue, random, smtplib, threading, logging
+from email.message import EmailMessage
+
+from core.metrics import smtp_send_latency, mail_messages, smtp_connections
+
+logger = logging.getLogger(__name__)
+
+SMTP_SERVER = os.getenv("SMTP_SERVER", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 50))
+MAIL_IDLE_TIMEOUT = float(os.getenv("MAIL_IDLE_TIMEOUT", 60))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+MAIL_RETRY_DELAY = float(os.getenv("MAIL_RETRY_DELAY", 2))
+
+_STOP = object()
+
+
+class MailQueue:
+    def __init__(self, host: str = SMTP_SERVER, port: int = SMTP_PORT, username: str | None = SMTP_USERNAME,
+                 password: str | None = SMTP_PASSWORD, starttls: bool = SMTP_STARTTLS,
+                 batch_size: int = MAIL_BATCH_SIZE, idle_timeout: float = MAIL_IDLE_TIMEOUT,
+                 max_attempts: int = MAIL_MAX_ATTEMPTS, retry_delay: float = MAIL_RETRY_DELAY):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self._queue = queue.Queue()
+        self._retries = []
+        self._sequence = itertools.count()
+        self._connection = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+
+    def enqueue(self, msg: EmailMessage):
+        self._ensure_started()
+        self._queue.put((msg, 1))
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="mail-queue", daemon=True)
+                self._thread.start()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._connection is not None:
+            try:
+                if self._connection.noop()[0] == 250:
+                    return self._connection
+            except smtplib.SMTPException:
+                pass
+            self._disconnect()
+
+        connection = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            connection.starttls()
+        if self.username and self.password:
+            connection.login(self.username, self.password)
+        self._connection = connection
+        self.connections_opened += 1
+        smtp_connections.inc()
+        return connection
+
+    def _disconnect(self):
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._connection = None
+
+    def _next_timeout(self) -> float:
+        if self._retries:
+            return max(self._retries[0][0] - time.monotonic(), 0)
+        return self.idle_timeout
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now and len(batch) < self.batch_size:
+            _, _, msg, attempt = heapq.heappop(self._retries)
+            batch.append((msg, attempt))
+        return batch
+
+    def _loop(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self._next_timeout())
+            except queue.Empty:
+                if self._retries and self._retries[0][0] <= time.monotonic():
+                    _, _, msg, attempt = heapq.heappop(self._retries)
+                    item = (msg, attempt)
+                else:
+                    self._disconnect()
+                    continue
+            if item is _STOP:
+                self._disconnect()
+                return
+            try:
+                self._send_batch(self._collect(item))
+            except Exception:
+                # The thread is the only sender; it must outlive any bad batch
+                logger.exception("Mail queue failed to send a batch")
+                self._disconnect()
+
+    def _send_batch(self, batch: list):
+        connection = None
+        for msg, attempt in batch:
+            started = None
+            try:
+                # Check the pooled connection once per batch, then reuse it as is
+                if connection is None:
+                    connection = self._connect()
+                started = time.perf_counter()
+                connection.send_message(msg)
+                smtp_send_latency.observe(time.perf_counter() - started, "sent")
+                self.sent += 1
+                mail_messages.inc("sent")
+                logger.info(f"Mail '{msg['Subject']}' sent to {msg['To']}")
+            except smtplib.SMTPRecipientsRefused as e:
+                self.failed += 1
+                mail_messages.inc("failed")
+                logger.error(f"Mail '{msg['Subject']}' refused for all recipients: {e.recipients}")
+            except (smtplib.SMTPException, OSError) as e:
+                if started is not None:
+                    smtp_send_latency.observe(time.perf_counter() - started, "error")
+                self._disconnect()
+                connection = None
+                self._retry(msg, attempt, e)
+            except Exception:
+                # e.g. a message without sender or recipients; sending it again won't help
+                self.failed += 1
+                mail_messages.inc("failed")
+                logger.exception(f"Mail '{msg['Subject']}' to {msg['To']} could not be sent, dropping it")
+
+    def _retry(self, msg: EmailMessage, attempt: int, error: Exception):
+        if attempt >= self.max_attempts:
+            self.failed += 1
+            mail_messages.inc("failed")
+            logger.error(f"Giving up on mail '{msg['Subject']}' to {msg['To']} after {attempt} attempts: {error}")
+            return
+        delay = self.retry_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+        logger.warning(f"Mail '{msg['Subject']}' to {msg['To']} failed ({error}), retrying in {delay:.1f}s")
+        heapq.heappush(self._retries, (time.monotonic() + delay, next(self._sequence), msg, attempt + 1))
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "retrying": len(self._retries),
+            "sent": self.sent,
+            "failed": self.failed,
+            "connections_opened": self.connections_opened,
+        }
+
+    def stop(self, timeout: float | None = 10):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+
+mail_queue = MailQueue()
@@ -0,0 +1,276 @@
+"""
+metrics.py
+
+Minimal Prometheus instrumentation without external dependencies. Counters and
+histograms are sharded per thread: every thread only ever writes its own dict,
+so recording a sample takes no lock and never touches the database. Shards are
+summed up when /metrics is scraped. Gauges are read from callbacks at scrape
+time (executor, DB pools, queues).
+
+Environment Variables:
+- METRICS_TOKEN: If set, /metrics requires "Authorization: Bearer <token>".
+"""
+
+import os, time, bisect, threading, logging
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RUN_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded(ABC):
+    """
+    Per-thread dicts that are only written by their owning thread. Shards of
+    threads that have exited are folded into one retired shard at scrape time,
+    so short-lived threads don't leave a shard behind each.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()  # only taken once per thread, on its first sample, and per scrape
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    @abstractmethod
+    def _merge(self, into: dict, shard: dict):
+        """Adds the samples of `shard` to `into`."""
+
+    def _snapshots(self) -> list[dict]:
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    # The owning thread is gone, nothing writes this shard any more
+                    self._merge(self._retired, shard)
+            self._shards = alive
+            retired = {}
+            self._merge(retired, self._retired)
+        # dict.copy() is atomic under the GIL, so a shard can be copied while its thread writes
+        return [retired] + [shard.copy() for _, shard in alive]
+
+
+class Counter(_Sharded):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def inc(self, *labelvalues, amount: float = 1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def _merge(self, into: dict, shard: dict):
+        for key, value in list(shard.items()):
+            into[key] = into.get(key, 0) + value
+
+    def collect(self) -> list[str]:
+        totals = {}
+        for shard in self._snapshots():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return [f"{self.name}_total{_labels(self.labelnames, key)} {_number(value)}" for key, value in sorted(totals.items())]
+
+
+class Histogram(_Sharded):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues):
+        shard = self._shard()
+        counts = shard.get(labelvalues)
+        if counts is None:
+            # one slot per bucket, one for +Inf, then sum and count
+            counts = shard[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def time(self, *labelvalues):
+        return _Timer(self, labelvalues)
+
+    def _merge(self, into: dict, shard: dict):
+        for key, counts in list(shard.items()):
+            total = into.get(key)
+            if total is None:
+                into[key] = list(counts)
+            else:
+                for i, value in enumerate(counts):
+                    total[i] += value
+
+    def collect(self) -> list[str]:
+        totals = {}
+        for shard in self._snapshots():
+            for key, counts in shard.items():
+                counts = list(counts)
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = counts
+                else:
+                    for i, value in enumerate(counts):
+                        total[i] += value
+
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for key, counts in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(counts[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labelvalues: tuple):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+
+class Gauge:
+    """Value read from `callback` at scrape time. The callback returns {labelvalues: value}."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple, callback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+
+    def collect(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+                for key, value in sorted(self.callback().items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple, callback) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = metric.collect()
+            except Exception as e:
+                logger.warning(f"Could not collect metric {metric.name}: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_latency = registry.histogram(
+    "http_request_duration_seconds", "Time until the response starts, per route template.",
+    ("method", "route", "status"),
+)
+run_duration = registry.histogram(
+    "task_run_duration_seconds", "Wall time of script runs.", ("task_id", "script_type", "successful"), RUN_BUCKETS,
+)
+scheduler_lag = registry.histogram(
+    "scheduler_lag_seconds", "Delay between the scheduled and the actual fire time of a job.",
+)
+executor_wait = registry.histogram(
+    "executor_queue_wait_seconds", "Time runs waited in the executor queue before starting.", ("script_type",),
+)
+run_retries = registry.counter(
+    "task_run_retries", "Failed runs that were scheduled for another attempt.", ("script_type",),
+)
+runs_dropped = registry.counter(
+    "task_runs_dropped", "Finished runs the run writer gave up on writing to the database.",
+)
+smtp_send_latency = registry.histogram(
+    "smtp_send_duration_seconds", "Time to hand one message to the SMTP relay.", ("outcome",),
+)
+mail_messages = registry.counter(
+    "mail_messages", "Outbound mail messages that were delivered or given up on.", ("outcome",),
+)
+smtp_connections = registry.counter(
+    "smtp_connections_opened", "SMTP connections opened by the mail queue.",
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so it adds no extra task or body buffering per request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # route templates keep the label set bounded, unmatched paths share one label
+                route = getattr(scope.get("route"), "path", "<unmatched>")
+                request_latency.observe(time.perf_counter() - start, scope["method"], route, message["status"])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,181 @@
+"""
+output.py
+
+Streaming capture of script output. Output is read from the process pipe in
+fixed-size chunks, kept in a bounded ring buffer for live tailing and appended
+to one log file per run. Memory use stays constant however much a script prints.
+
+Environment Variables:
+- TASK_LOG_DIR: Directory for per-run log files (one sub directory per task).
+- TASK_OUTPUT_BUFFER_BYTES: Size of the in-memory tail buffer per run.
+- TASK_LOG_MAX_BYTES: Maximum size of a single run log before it is truncated.
+- TASK_OUTPUT_CAPTURES: Number of tasks whose latest capture is kept in memory.
+
+A run can also have an output limit (see core/limits.py): once it printed
+more than that, `on_output_limit` is called to stop it.
+"""
+
+import os, uuid, threading, logging
+from collections import OrderedDict
+
+from core.events import broker
+
+logger = logging.getLogger(__name__)
+
+TASK_LOG_DIR = os.getenv("TASK_LOG_DIR", "logs/runs")
+TASK_OUTPUT_BUFFER_BYTES = int(os.getenv("TASK_OUTPUT_BUFFER_BYTES", 64 * 1024))
+TASK_LOG_MAX_BYTES = int(os.getenv("TASK_LOG_MAX_BYTES", 10 * 1024 * 1024))
+TASK_OUTPUT_CAPTURES = int(os.getenv("TASK_OUTPUT_CAPTURES", 256))
+CHUNK_SIZE = 4096
+
+TRUNCATION_MARKER = "\n[... output truncated after {} bytes ...]\n"
+
+
+class RingBuffer:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = bytearray()
+        self.dropped = 0
+
+    def append(self, chunk: bytes):
+        self._data += chunk
+        overflow = len(self._data) - self.capacity
+        if overflow > 0:
+            del self._data[:overflow]
+            self.dropped += overflow
+
+    def tail(self, size: int) -> bytes:
+        return bytes(self._data[-size:]) if size > 0 else b""
+
+
+class OutputCapture:
+    """Collects the merged stdout/stderr of a single run."""
+
+    def __init__(self, task_id: int, run_id: str | None = None,
+                 buffer_bytes: int = TASK_OUTPUT_BUFFER_BYTES, max_bytes: int = TASK_LOG_MAX_BYTES,
+                 output_limit: int = 0):
+        self.task_id = task_id
+        self.run_id = run_id or uuid.uuid4().hex
+        self.log_path = os.path.join(TASK_LOG_DIR, str(task_id), f"{self.run_id}.log")
+        self.max_bytes = max_bytes
+        self.output_limit = output_limit
+        self.on_output_limit = None
+        self.buffer = RingBuffer(buffer_bytes)
+        self.total_bytes = 0
+        self.truncated = False
+        self.running = True
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        self._log = open(self.log_path, "ab")
+        register_capture(self)
+
+    def write(self, chunk: bytes):
+        with self._lock:
+            self.buffer.append(chunk)
+            written = self.total_bytes
+            self.total_bytes += len(chunk)
+            if self.truncated:
+                return
+            if self.total_bytes > self.max_bytes:
+                self._log.write(chunk[:max(self.max_bytes - written, 0)])
+                self._log.write(TRUNCATION_MARKER.format(self.max_bytes).encode())
+                self.truncated = True
+            else:
+                self._log.write(chunk)
+            self._log.flush()
+
+    def consume(self, stream):
+        """Read `stream` until EOF. Blocks the calling thread."""
+        fd = stream.fileno()
+        while True:
+            chunk = os.read(fd, CHUNK_SIZE)
+            if not chunk:
+                break
+            self.write(chunk)
+            if self.output_limit and self.total_bytes > self.output_limit and self.on_output_limit is not None:
+                callback, self.on_output_limit = self.on_output_limit, None
+                callback()
+            broker.publish({
+                "type": "output",
+                "task_id": self.task_id,
+                "run_id": self.run_id,
+                "data": chunk.decode(errors="replace"),
+            })
+
+    def close(self):
+        with self._lock:
+            self.running = False
+            self._log.close()
+
+    def tail(self, size: int) -> str:
+        with self._lock:
+            return self.buffer.tail(size).decode(errors="replace")
+
+
+# Latest capture per task, kept after the run finishes so it can still be tailed.
+# Least recently started tasks are evicted first; their output is then served
+# from the log file like that of runs executed by another process.
+_captures: OrderedDict[int, OutputCapture] = OrderedDict()
+_captures_lock = threading.Lock()
+
+
+def register_capture(capture: OutputCapture):
+    with _captures_lock:
+        _captures[capture.task_id] = capture
+        _captures.move_to_end(capture.task_id)
+        while len(_captures) > TASK_OUTPUT_CAPTURES:
+            _captures.popitem(last=False)
+
+
+def drop_captures(task_ids: list[int]):
+    """Forgets the captures of deleted tasks."""
+    with _captures_lock:
+        for task_id in task_ids:
+            _captures.pop(task_id, None)
+
+
+def latest_log_path(task_id: int) -> str | None:
+    task_dir = os.path.join(TASK_LOG_DIR, str(task_id))
+    try:
+        entries = [entry for entry in os.scandir(task_dir) if entry.name.endswith(".log")]
+    except FileNotFoundError:
+        return None
+    if not entries:
+        return None
+    return max(entries, key=lambda entry: entry.stat().st_mtime).path
+
+
+def read_log_tail(path: str, size: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - size, 0))
+        return f.read().decode(errors="replace")
+
+
+def tail_output(task_id: int, size: int) -> dict | None:
+    """
+    Returns the last `size` bytes of output of the latest run of a task.
+    Falls back to the log file on disk for runs executed by another process.
+    """
+    with _captures_lock:
+        capture = _captures.get(task_id)
+    if capture is not None:
+        return {
+            "run_id": capture.run_id,
+            "running": capture.running,
+            "total_bytes": capture.total_bytes,
+            "truncated": capture.truncated,
+            "output": capture.tail(size),
+        }
+
+    path = latest_log_path(task_id)
+    if path is None:
+        return None
+    return {
+        "run_id": os.path.splitext(os.path.basename(path))[0],
+        "running": None,
+        "total_bytes": os.path.getsize(path),
+        "truncated": None,
+        "output": read_log_tail(path, size),
+    }
@@ -0,0 +1,33 @@
+import base64, json
+from datetime import datetime
+from fastapi import HTTPException
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"after": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(_decode(cursor)["after"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _decode(cursor: str):
+    return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+
+
+# Timeline pages continue after the (fire_at, task_id) of the last entry
+def encode_time_cursor(fire_at: datetime, task_id: int) -> str:
+    raw = json.dumps({"at": fire_at.isoformat(), "after": task_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_time_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        position = _decode(cursor)
+        return datetime.fromisoformat(position["at"]), int(position["after"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,113 @@
+"""
+retry.py
+
+Retries of failed runs. A task can allow up to max_attempts attempts per run;
+after a failed attempt the next one is scheduled retry_delay_seconds * 2^(n-1)
+later (capped at retry_max_delay_seconds), minus a random share of up to
+retry_jitter of that delay. With the default full jitter, tasks that failed
+together on the same outage spread their retries over the whole backoff window
+instead of hitting the recovering dependency in lockstep.
+
+Nothing waits for a retry: with EXECUTION_MODE=local it becomes a one-shot job
+in the shared scheduler job store (registered by routers/tasks.py), with
+EXECUTION_MODE=queue a RunRequest that workers only claim once it is due.
+
+The run itself only decides when the next attempt is due (plan_retry) and
+returns it with its result; the process that submitted the run places it
+(retry_failed). With TASK_EXECUTOR_MODE=process the run executes in a pool
+process that has no scheduler, so the retry could not be placed there.
+"""
+
+import random, logging
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select
+
+from db.session import scheduler_engine
+from models.task import Task
+from core.run_queue import EXECUTION_MODE, enqueue_run
+from core.metrics import run_retries
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("max_attempts", "retry_delay_seconds", "retry_max_delay_seconds", "retry_jitter", "retry_exit_codes")
+
+task_table = Task.__table__
+
+# Called with (task_id, attempt, run_at); set by the process that owns the scheduler
+_schedule_local = None
+
+
+def use_scheduler(schedule):
+    global _schedule_local
+    _schedule_local = schedule
+
+
+def retry_policy(task_id: int) -> dict | None:
+    # Only read once a run failed, so the policy is always the task's current one
+    with scheduler_engine.connect() as connection:
+        row = connection.execute(
+            select(*(task_table.c[field] for field in FIELDS)).where(task_table.c.id == task_id)
+        ).first()
+    return dict(zip(FIELDS, row)) if row is not None else None
+
+
+def exit_codes(value: str | None) -> set[int] | None:
+    """"1, 75" -> {1, 75}; None (or nothing parseable) means every failure is retried."""
+    if not value:
+        return None
+    codes = set()
+    for code in value.split(","):
+        try:
+            codes.add(int(code))
+        except ValueError:
+            logger.warning(f"Ignoring invalid retry exit code {code!r}")
+    return codes or None
+
+
+def is_retryable(policy: dict, attempt: int, exit_code: int | None) -> bool:
+    if attempt >= policy["max_attempts"]:
+        return False
+    codes = exit_codes(policy["retry_exit_codes"])
+    return codes is None or exit_code in codes
+
+
+def backoff_delay(policy: dict, attempt: int) -> float:
+    """Seconds to wait before the attempt after `attempt`."""
+    delay = min(policy["retry_delay_seconds"] * 2 ** (attempt - 1), policy["retry_max_delay_seconds"])
+    jitter = min(max(policy["retry_jitter"], 0.0), 1.0)
+    return delay * (1 - jitter * random.random())
+
+
+def plan_retry(task_id: int, attempt: int, exit_code: int | None) -> datetime | None:
+    """
+    When the attempt after a failed `attempt` is due if the task's policy
+    allows it, or None if the run is not retried.
+    """
+    policy = retry_policy(task_id)
+    if policy is None or not is_retryable(policy, attempt, exit_code):
+        return None
+    return datetime.now(timezone.utc) + timedelta(seconds=backoff_delay(policy, attempt))
+
+
+def schedule_retry(task_id: int, attempt: int, run_at: datetime):
+    """Places `attempt` of the task at `run_at`."""
+    if EXECUTION_MODE != "queue" and _schedule_local is not None:
+        _schedule_local(task_id, attempt, run_at)
+        return
+    if EXECUTION_MODE != "queue":
+        logger.warning(f"No scheduler in this process, attempt {attempt} of task {task_id} is queued for a worker")
+    enqueue_run(task_id, attempt=attempt, available_at=run_at)
+
+
+def retry_failed(task_id: int, script_type: str, result):
+    """Schedules the next attempt a finished run asked for with its RunResult.retry_at."""
+    if result.retry_at is None:
+        return
+    try:
+        schedule_retry(task_id, result.attempt + 1, result.retry_at)
+    except Exception:
+        logger.exception(f"Could not schedule a retry of task {task_id}")
+        return
+    run_retries.inc(script_type)
+    delay = (result.retry_at - datetime.now(timezone.utc)).total_seconds()
+    logger.info(f"Task {task_id} attempt {result.attempt + 1} scheduled in {max(delay, 0):.1f} s")
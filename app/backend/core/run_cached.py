@@ -0,0 +1,50 @@
+"""
+run_cached.py
+
+Launcher for cold python runs, started by core/runner.py - not imported by the
+app. Runs a script from its cached bytecode (see core/scripts.py) so the
+interpreter neither reads nor compiles the source, with the same argv, import
+path and __main__ as "python3 script.py". Falls back to running the source
+when the bytecode is gone (evicted) or was compiled by another python version.
+
+    python3 run_cached.py CODE_PATH SCRIPT [ARGS...]
+"""
+
+import sys
+
+# Python put core/ first on the import path, where token.py and email.py
+# would shadow the stdlib for everything imported below
+sys.path.pop(0)
+
+import os, types, runpy, marshal, builtins, importlib.util
+
+
+def load_code(path: str):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != importlib.util.MAGIC_NUMBER:
+            return None
+        return marshal.loads(data[16:])
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+
+
+def main():
+    code_path, script, *args = sys.argv[1:]
+    sys.argv = [script] + args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    code = load_code(code_path)
+    if code is None:
+        runpy.run_path(script, run_name="__main__")
+        return
+    module = types.ModuleType("__main__")
+    module.__file__ = script
+    module.__cached__ = None
+    module.__builtins__ = builtins
+    sys.modules["__main__"] = module
+    exec(code, module.__dict__)
+
+
+if __name__ == "__main__":
+    main()
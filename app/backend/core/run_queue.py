@@ -0,0 +1,122 @@
+"""
+run_queue.py
+
+DB-backed run queue for EXECUTION_MODE=queue. The API (scheduler jobs and
+manual runs) only inserts RunRequest rows; worker.py processes claim them with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers on any number of
+hosts can pull from the same queue without handing out a run twice.
+
+Environment Variables:
+- EXECUTION_MODE: "local" (default) runs scripts in the API process, "queue" hands them to workers.
+- WORKER_LEASE_SECONDS: A claimed run whose worker stopped heart-beating for this long is handed out again.
+"""
+
+import os
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import insert, update, delete, or_, and_, func
+from sqlmodel import Session, select
+
+from db.session import scheduler_engine
+from models.task import Task, RunRequest
+
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "local")
+WORKER_LEASE_SECONDS = int(os.getenv("WORKER_LEASE_SECONDS", 300))
+
+run_requests = RunRequest.__table__
+
+
+def enqueue_run(task_id: int, max_instances: int | None = None, skip_if_running: bool = False,
+                attempt: int = 1, available_at: datetime | None = None) -> bool:
+    """
+    Queues a run of the task. With `max_instances` the task's overlap policy is
+    applied like in the local executor: while the task is at its limit the run
+    is dropped with skip_if_running, otherwise only one run per task waits.
+    Retries pass their `attempt` and are not claimed before `available_at`.
+    Returns False if the run was dropped.
+    """
+    now = datetime.now(timezone.utc)
+    with scheduler_engine.begin() as connection:
+        if max_instances is not None:
+            # Retries that are not due yet don't hold back regular runs
+            counts = dict(connection.execute(
+                select(run_requests.c.status, func.count())
+                .where(run_requests.c.task_id == task_id)
+                .where(or_(run_requests.c.available_at == None, run_requests.c.available_at <= now))
+                .group_by(run_requests.c.status)
+            ).all())
+            pending, running = counts.get("pending", 0), counts.get("running", 0)
+            if running + pending >= max(max_instances, 1) and (skip_if_running or pending):
+                return False
+        connection.execute(insert(run_requests).values(
+            task_id=task_id, status="pending", enqueued_at=now,
+            attempt=attempt, available_at=available_at,
+        ))
+    return True
+
+
+def claim_runs(worker_id: str, limit: int) -> list[dict]:
+    """Claims up to `limit` runs for this worker and returns them with their task settings."""
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=WORKER_LEASE_SECONDS)
+    with Session(scheduler_engine) as session:
+        requests = session.exec(
+            select(RunRequest)
+            .where(or_(
+                and_(RunRequest.status == "pending", or_(RunRequest.available_at == None, RunRequest.available_at <= now)),
+                and_(RunRequest.status == "running", RunRequest.claimed_at < stale),
+            ))
+            .order_by(RunRequest.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not requests:
+            return []
+
+        task_ids = {request.task_id for request in requests}
+        tasks = {task.id: task for task in session.exec(select(Task).where(Task.id.in_(task_ids))).all()}
+        # Runs of a task that is already at max_instances stay pending for a later poll
+        running = dict(session.exec(
+            select(RunRequest.task_id, func.count())
+            .where(RunRequest.task_id.in_(task_ids), RunRequest.status == "running", RunRequest.claimed_at >= stale)
+            .group_by(RunRequest.task_id)
+        ).all())
+        claimed = []
+        for request in requests:
+            task = tasks.get(request.task_id)
+            if request.status == "pending" and task is not None:
+                if running.get(task.id, 0) >= max(task.max_instances, 1):
+                    continue
+                running[task.id] = running.get(task.id, 0) + 1
+            request.status = "running"
+            request.claimed_at = now
+            request.claimed_by = worker_id
+            claimed.append({
+                "request_id": request.id,
+                "task_id": request.task_id,
+                "attempt": request.attempt,
+                "task": task.model_dump() if task else None,
+            })
+        session.commit()
+    return claimed
+
+
+def heartbeat(worker_id: str):
+    with scheduler_engine.begin() as connection:
+        connection.execute(
+            update(run_requests)
+            .where(run_requests.c.claimed_by == worker_id, run_requests.c.status == "running")
+            .values(claimed_at=datetime.now(timezone.utc))
+        )
+
+
+def finish_run(request_id: int):
+    with scheduler_engine.begin() as connection:
+        connection.execute(delete(run_requests).where(run_requests.c.id == request_id))
+
+
+def queue_depth() -> dict:
+    with scheduler_engine.connect() as connection:
+        rows = connection.execute(
+            select(run_requests.c.status, func.count()).group_by(run_requests.c.status)
+        ).all()
+    return {status: count for status, count in rows}
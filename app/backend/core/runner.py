@@ -0,0 +1,146 @@
+"""
+runner.py
+
+Executes a single task run: spawns the script under the task's resource
+limits, streams its output and hands the result, together with the resource
+usage of the run reported by wait4, to the run writer. Scripts come from the
+registry in core/scripts.py, so a missing or broken script fails the run
+without spawning anything; cold python runs execute the registry's cached
+bytecode through core/run_cached.py. A failed attempt asks core/retry.py when
+the next one is due and returns that with its RunResult, for the submitting
+process to schedule. Used by the API's executor and by worker.py.
+"""
+
+import os, subprocess, logging
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from core.output import OutputCapture
+from core.runs import run_writer
+from core.events import broker
+from core.metrics import run_duration
+from core.warm_pool import warm_pool, WarmPoolUnavailable
+from core.limits import watchdog, effective_limits, limited_command, killed_reason, usage_of
+from core.retry import plan_retry
+from core.scripts import script_registry, ScriptInvalid
+
+logger = logging.getLogger(__name__)
+
+RUN_CACHED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_cached.py")
+
+
+class RunResult(NamedTuple):
+    successful: bool
+    attempt: int = 1
+    # When the next attempt is due, if the failed run is retried
+    retry_at: datetime | None = None
+
+
+def _spawn(command: list[str], capture: OutputCapture, limits: dict) -> tuple[int, dict, object]:
+    # A session of its own, so the watchdog can kill everything the script started
+    process = subprocess.Popen(limited_command(command, limits), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               start_new_session=True)
+    deadline = watchdog.watch(process.pid, limits["timeout_seconds"])
+    capture.on_output_limit = lambda: watchdog.terminate(deadline, "output_limit")
+    try:
+        with process.stdout:
+            capture.consume(process.stdout)
+        _, status, rusage = os.wait4(process.pid, 0)
+    finally:
+        deadline.cancel()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, usage_of(rusage), deadline
+
+
+def _cold_command(command: list[str], script: dict) -> list[str]:
+    # Cold python runs start from the cached bytecode instead of compiling the script
+    if script["script_type"] == "python" and script["code_path"]:
+        return [command[0], RUN_CACHED, script["code_path"]] + command[1:]
+    return command
+
+
+def run_script(task_id: int, script_path: str, parameters: str, script_type: str, limits: dict | None = None,
+               attempt: int = 1) -> RunResult:
+    if script_type == "python":
+        command = ["python3", script_path]
+    elif script_type == "bash":
+        command = ["bash", script_path]
+    else:
+        logger.error(f"Task {task_id} has unknown script type: {script_type}")
+        return RunResult(False, attempt)
+    if parameters:
+        command += parameters.split()
+
+    limits = effective_limits(limits)
+    started_at = datetime.now(timezone.utc)
+    capture = OutputCapture(task_id, output_limit=limits["max_output_bytes"])
+    returncode, usage, deadline = None, {}, None
+    broker.publish({
+        "type": "run_started",
+        "task_id": task_id,
+        "run_id": capture.run_id,
+        "attempt": attempt,
+        "started_at": started_at.isoformat(),
+    })
+    try:
+        script = script_registry.lookup(script_path, script_type)
+        if script_type == "python" and warm_pool is not None:
+            try:
+                returncode, usage, deadline = warm_pool.run(script_path, command[2:], capture, limits, script["code_path"])
+            except WarmPoolUnavailable as e:
+                logger.warning(f"Warm python pool unavailable ({e}), starting a fresh interpreter for task {task_id}")
+                returncode, usage, deadline = _spawn(_cold_command(command, script), capture, limits)
+        else:
+            returncode, usage, deadline = _spawn(_cold_command(command, script), capture, limits)
+    except ScriptInvalid as e:
+        logger.error(f"Task {task_id} not started: {e}")
+        capture.write(f"{e}\n".encode())
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.exception(f"Task {task_id} failed to execute: {e}")
+    finally:
+        capture.close()
+    finished_at = datetime.now(timezone.utc)
+
+    killed = killed_reason(deadline, returncode)
+    success = returncode == 0 and killed is None
+    duration = (finished_at - started_at).total_seconds()
+    run_duration.observe(duration, task_id, script_type, "true" if success else "false")
+    if success:
+        logger.info(f"Task {task_id} run {capture.run_id} finished, {capture.total_bytes} bytes of output in {capture.log_path}")
+    elif killed:
+        logger.error(f"Task {task_id} run {capture.run_id} was killed ({killed}), output in {capture.log_path}")
+    else:
+        logger.error(f"Task {task_id} run {capture.run_id} exited with code {returncode}, output in {capture.log_path}")
+
+    run_writer.record(
+        task_id=task_id,
+        run_id=capture.run_id,
+        started_at=started_at,
+        finished_at=finished_at,
+        duration=duration,
+        exit_code=returncode,
+        successful=success,
+        output_path=capture.log_path,
+        cpu_user_seconds=usage.get("cpu_user_seconds"),
+        cpu_system_seconds=usage.get("cpu_system_seconds"),
+        max_rss_kb=usage.get("max_rss_kb"),
+        killed_reason=killed,
+        attempt=attempt,
+    )
+    broker.publish({
+        "type": "run_finished",
+        "task_id": task_id,
+        "run_id": capture.run_id,
+        "exit_code": returncode,
+        "successful": success,
+        "duration": duration,
+        "killed_reason": killed,
+        "attempt": attempt,
+    })
+    retry_at = None
+    if not success:
+        try:
+            retry_at = plan_retry(task_id, attempt, returncode)
+        except Exception:
+            logger.exception(f"Could not plan a retry of task {task_id}")
+    return RunResult(success, attempt, retry_at)
@@ -0,0 +1,143 @@
+"""
+runs.py
+
+Background writer for run results. Finished runs are queued in memory and
+flushed in batches: all TaskRun rows of a batch go out as one multi-row INSERT
+and the Task counters are bumped with atomic UPDATE statements in the same
+transaction, so concurrent runs never lose a runcount increment.
+
+A batch that cannot be written (e.g. while the database is restarting) is
+kept and written again with exponential backoff, together with the runs that
+arrive in the meantime. It is only dropped after RUN_WRITER_MAX_ATTEMPTS
+failed writes, or if the last write on shutdown fails; dropped runs are
+counted in task_runs_dropped.
+
+Environment Variables:
+- RUN_WRITER_BATCH_SIZE: Maximum number of runs written per flush.
+- RUN_WRITER_FLUSH_INTERVAL: Seconds to wait for more runs before flushing.
+- RUN_WRITER_MAX_ATTEMPTS: Writes of a batch before its runs are dropped.
+- RUN_WRITER_RETRY_DELAY: Base delay in seconds for the exponential backoff.
+"""
+
+import os, time, queue, threading, atexit, logging
+from sqlalchemy import insert, update, bindparam
+
+from db.session import scheduler_engine
+from models.task import Task, TaskRun
+from core.versions import task_version
+from core.timeline import refresh_fire_times
+from core.metrics import runs_dropped
+
+logger = logging.getLogger(__name__)
+
+RUN_WRITER_BATCH_SIZE = int(os.getenv("RUN_WRITER_BATCH_SIZE", 500))
+RUN_WRITER_FLUSH_INTERVAL = float(os.getenv("RUN_WRITER_FLUSH_INTERVAL", 1.0))
+RUN_WRITER_MAX_ATTEMPTS = int(os.getenv("RUN_WRITER_MAX_ATTEMPTS", 5))
+RUN_WRITER_RETRY_DELAY = float(os.getenv("RUN_WRITER_RETRY_DELAY", 1.0))
+
+_STOP = object()
+
+task_table = Task.__table__
+
+increment_counters = (
+    update(task_table)
+    .where(task_table.c.id == bindparam("b_task_id"))
+    .values(
+        runcount=task_table.c.runcount + bindparam("b_runs"),
+        successful=bindparam("b_successful"),
+    )
+)
+
+
+class RunWriter:
+    def __init__(self, batch_size: int = RUN_WRITER_BATCH_SIZE, flush_interval: float = RUN_WRITER_FLUSH_INTERVAL,
+                 max_attempts: int = RUN_WRITER_MAX_ATTEMPTS, retry_delay: float = RUN_WRITER_RETRY_DELAY):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def record(self, **run):
+        """Queue one finished run. Keyword arguments are TaskRun columns."""
+        self._ensure_started()
+        self._queue.put(run)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="run-writer", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        batch, failures, stopping = [], 0, False
+        while batch or not stopping:
+            if not batch:
+                run = self._queue.get()
+                if run is _STOP:
+                    break
+                batch.append(run)
+            # After a failed write, wait out the backoff while collecting runs
+            retry_at = time.monotonic() + self.retry_delay * 2 ** (failures - 1) if failures else None
+            try:
+                while not stopping and len(batch) < self.batch_size:
+                    timeout = self.flush_interval if retry_at is None else max(retry_at - time.monotonic(), 0)
+                    run = self._queue.get(timeout=timeout)
+                    if run is _STOP:
+                        stopping = True
+                        break
+                    batch.append(run)
+            except queue.Empty:
+                pass
+            if retry_at is not None and not stopping:
+                time.sleep(max(retry_at - time.monotonic(), 0))
+            if self.flush(batch):
+                batch, failures = [], 0
+                continue
+            failures += 1
+            if failures >= self.max_attempts or stopping:
+                logger.error(f"Dropping {len(batch)} runs after {failures} failed writes")
+                runs_dropped.inc(amount=len(batch))
+                batch, failures = [], 0
+
+    def flush(self, batch: list[dict]) -> bool:
+        """Writes the batch in one transaction. Returns False if nothing was written."""
+        counters = {}
+        for run in batch:
+            entry = counters.setdefault(run["task_id"], {"b_task_id": run["task_id"], "b_runs": 0})
+            entry["b_runs"] += 1
+            entry["b_successful"] = run["successful"]
+
+        try:
+            with scheduler_engine.begin() as connection:
+                connection.execute(insert(TaskRun), batch)
+                connection.execute(increment_counters, list(counters.values()))
+        except Exception as e:
+            logger.error(f"Failed to record {len(batch)} runs: {e}", exc_info=True)
+            return False
+        logger.info(f"Recorded {len(batch)} runs for {len(counters)} tasks")
+        try:
+            # runcount/successful changed, so cached task pages are outdated
+            task_version.bump()
+        except Exception as e:
+            logger.error(f"Failed to bump the task version: {e}", exc_info=True)
+        try:
+            # Drop the fire times these runs used up and top up the timeline
+            refresh_fire_times(list(counters))
+        except Exception as e:
+            logger.error(f"Failed to refresh fire times of {len(counters)} tasks: {e}", exc_info=True)
+        return True
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+
+run_writer = RunWriter()
+atexit.register(run_writer.stop)
@@ -0,0 +1,317 @@
+"""
+scripts.py
+
+Registry of task scripts. The first lookup of a script reads it once, hashes
+it (sha256) and checks it: python scripts are compiled, bash scripts are
+parsed with `bash -n`. The result is kept per path, so later runs and task
+updates skip the file reads, the hashing and the compile. The bytecode of
+python scripts is also written to SCRIPT_CACHE_DIR under its content hash,
+where both cold runs (core/run_cached.py) and the warm interpreter
+(core/warm_pool.py) load it instead of compiling the script on every run.
+Once the directory outgrows SCRIPT_CACHE_MAX_MB, the least recently loaded
+files that no registry entry uses are removed.
+
+Entries are invalidated by an inotify watch on the script's directory (so
+editors that save by renaming are noticed too). Where inotify is not
+available, or the watch could not be added, every lookup compares the file's
+stat with the one it was loaded with instead.
+
+Environment Variables:
+- SCRIPT_VALIDATION: "on" rejects tasks whose script is missing or does not compile, "off" skips the check.
+  Defaults to "off" with EXECUTION_MODE=queue, where the scripts may only exist on the worker hosts.
+- SCRIPT_WATCH: "inotify" (default) watches script directories, "stat" checks the file on every lookup.
+- SCRIPT_CACHE_DIR: Directory for the compiled bytecode of python scripts.
+- SCRIPT_CACHE_MAX_MB: Size of SCRIPT_CACHE_DIR above which old bytecode is evicted.
+- SCRIPT_REGISTRY_SIZE: Maximum number of scripts kept in the registry.
+"""
+
+import os, sys, stat, struct, ctypes, hashlib, marshal, importlib.util, subprocess, threading, logging
+from collections import OrderedDict
+
+from core.run_queue import EXECUTION_MODE
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_VALIDATION = os.getenv("SCRIPT_VALIDATION", "off" if EXECUTION_MODE == "queue" else "on")
+SCRIPT_WATCH = os.getenv("SCRIPT_WATCH", "inotify")
+SCRIPT_CACHE_DIR = os.getenv("SCRIPT_CACHE_DIR", "logs/script-cache")
+SCRIPT_CACHE_MAX_MB = float(os.getenv("SCRIPT_CACHE_MAX_MB", 256))
+SCRIPT_REGISTRY_SIZE = int(os.getenv("SCRIPT_REGISTRY_SIZE", 10000))
+BASH_CHECK_TIMEOUT = 10
+
+SCRIPT_TYPES = ("python", "bash")
+
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_DELETE_SELF, IN_MOVE_SELF = 0x400, 0x800
+IN_Q_OVERFLOW, IN_IGNORED, IN_ONLYDIR, IN_CLOEXEC = 0x4000, 0x8000, 0x01000000, 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT = struct.Struct("iIII")
+
+
+class ScriptInvalid(ValueError):
+    """The script is missing or would fail before running a single line."""
+
+
+class DirectoryWatcher:
+    """
+    Minimal inotify binding. Calls `on_change(path)` for every changed entry of
+    a watched directory and `on_reset(directory)` when a directory stopped
+    being watched (None: events were lost, everything is suspect).
+    """
+
+    def __init__(self, on_change, on_reset):
+        self.on_change = on_change
+        self.on_reset = on_reset
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+        self._wds = {}
+        self._lock = threading.Lock()
+        self.alive = True
+        threading.Thread(target=self._read, name="script-watcher", daemon=True).start()
+
+    def watch(self, directory: str) -> bool:
+        with self._lock:
+            if directory in self._wds:
+                return True
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                # Missing directory or out of watches (fs.inotify.max_user_watches)
+                return False
+            self._wds[directory] = wd
+            self._dirs[wd] = directory
+            return True
+
+    def is_watching(self, directory: str) -> bool:
+        with self._lock:
+            return self.alive and directory in self._wds
+
+    def _read(self):
+        try:
+            while True:
+                data = os.read(self._fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _, length = EVENT.unpack_from(data, offset)
+                    name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+                    offset += EVENT.size + length
+                    self._handle(wd, mask, os.fsdecode(name))
+        except OSError as e:
+            logger.error(f"Script watcher stopped, falling back to stat checks: {e}")
+            with self._lock:
+                self.alive = False
+            self.on_reset(None)
+
+    def _handle(self, wd: int, mask: int, name: str):
+        if mask & IN_Q_OVERFLOW:
+            self.on_reset(None)
+            return
+        with self._lock:
+            directory = self._dirs.get(wd)
+            if directory is not None and mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                del self._dirs[wd]
+                del self._wds[directory]
+        if directory is None:
+            return
+        if name:
+            self.on_change(os.path.join(directory, name))
+        if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+            self.on_reset(directory)
+
+
+def _signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino
+
+
+class ScriptRegistry:
+    def __init__(self, cache_dir: str = SCRIPT_CACHE_DIR, maxsize: int = SCRIPT_REGISTRY_SIZE, watch: str = SCRIPT_WATCH,
+                 cache_max_bytes: int = int(SCRIPT_CACHE_MAX_MB * 1024 * 1024)):
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.maxsize = maxsize
+        self.watch_mode = watch
+        self._entries = OrderedDict()
+        self._bash_checks = {}
+        self._watcher = None
+        self._watcher_failed = watch != "inotify"
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_watcher(self) -> DirectoryWatcher | None:
+        with self._lock:
+            if self._watcher is None and not self._watcher_failed:
+                try:
+                    self._watcher = DirectoryWatcher(self.invalidate, self.invalidate_dir)
+                except (OSError, AttributeError) as e:
+                    logger.warning(f"inotify is not available ({e}), checking scripts with stat on every lookup")
+                    self._watcher_failed = True
+            return self._watcher
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(path, None)
+
+    def invalidate_dir(self, directory: str | None):
+        with self._lock:
+            self._generation += 1
+            if directory is None:
+                self._entries.clear()
+            else:
+                for path in [path for path in self._entries if os.path.dirname(path) == directory]:
+                    del self._entries[path]
+
+    def _is_fresh(self, entry: dict) -> bool:
+        if entry["watched"] and self._watcher is not None and self._watcher.is_watching(os.path.dirname(entry["path"])):
+            # The watch drops the entry on any change, no need to touch the file
+            return True
+        return _signature(entry["path"]) == entry["signature"]
+
+    def lookup(self, script_path: str, script_type: str) -> dict:
+        """
+        The registry entry of a script: path, sha256, size and, for python,
+        code_path (the cached bytecode). Raises ScriptInvalid if it is missing
+        or does not compile.
+        """
+        path = os.path.abspath(script_path)
+        with self._lock:
+            entry = self._entries.get(path)
+            generation = self._generation
+        if entry is not None and entry["script_type"] == script_type and self._is_fresh(entry):
+            with self._lock:
+                self.hits += 1
+                if path in self._entries:
+                    self._entries.move_to_end(path)
+        else:
+            entry = self._load(path, script_type, generation)
+        if entry["error"]:
+            raise ScriptInvalid(entry["error"])
+        return entry
+
+    def _load(self, path: str, script_type: str, generation: int) -> dict:
+        watcher = self._get_watcher()
+        # Watch before reading, so a change right after the read is not missed
+        watched = watcher is not None and watcher.watch(os.path.dirname(path))
+        entry = {"path": path, "script_type": script_type, "signature": _signature(path), "watched": watched,
+                 "sha256": None, "size": None, "code_path": None, "error": None}
+        try:
+            with open(path, "rb") as f:
+                if not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+                    raise IsADirectoryError(21, "Not a regular file")
+                source = f.read()
+        except OSError as e:
+            entry["error"] = f"Script {path} can't be read: {e.strerror}"
+        else:
+            entry["sha256"] = hashlib.sha256(source).hexdigest()
+            entry["size"] = len(source)
+            if script_type == "python":
+                entry["code_path"], entry["error"] = self._compile_python(path, source, entry["sha256"])
+            elif script_type == "bash":
+                entry["error"] = self._check_bash(path, entry["sha256"])
+            else:
+                entry["error"] = f"Unknown script type: {script_type}"
+
+        with self._lock:
+            self.misses += 1
+            # Changed while it was read: keep the entry, but make the next lookup check the stat
+            entry["watched"] &= generation == self._generation
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _compile_python(self, path: str, source: bytes, sha256: str) -> tuple[str | None, str | None]:
+        # Content addressed: the same source compiles once, even across restarts
+        code_path = os.path.join(self.cache_dir, f"{sha256}.{sys.implementation.cache_tag}.pyc")
+        try:
+            # The mtime records the last load, which is what eviction goes by
+            os.utime(code_path)
+            return code_path, None
+        except OSError:
+            pass
+        try:
+            code = compile(source, path, "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            line = f" (line {e.lineno})" if getattr(e, "lineno", None) else ""
+            return None, f"Script {path} does not compile{line}: {getattr(e, 'msg', e)}"
+        # Unchecked hash-based pyc (PEP 552), the file name already pins the source
+        data = importlib.util.MAGIC_NUMBER + (1).to_bytes(4, "little") + importlib.util.source_hash(source) + marshal.dumps(code)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{code_path}.{os.getpid()}.{threading.get_ident()}"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, code_path)
+        except OSError as e:
+            logger.warning(f"Could not cache the bytecode of {path}: {e}")
+            return None, None
+        self._prune_cache(keep=code_path)
+        return code_path, None
+
+    def _prune_cache(self, keep: str):
+        with self._lock:
+            in_use = {entry["code_path"] for entry in self._entries.values()} | {keep}
+        try:
+            files = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".pyc"):
+                    st = entry.stat()
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.cache_max_bytes:
+                break
+            if path in in_use:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def _check_bash(self, path: str, sha256: str) -> str | None:
+        with self._lock:
+            if sha256 in self._bash_checks:
+                return self._bash_checks[sha256]
+        try:
+            result = subprocess.run(["bash", "-n", path], capture_output=True, text=True, timeout=BASH_CHECK_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            # Can't tell; the run will find out
+            logger.warning(f"Could not check {path} with bash -n: {e}")
+            return None
+        error = f"Script {path} has a syntax error: {result.stderr.strip()}" if result.returncode else None
+        with self._lock:
+            if len(self._bash_checks) >= self.maxsize:
+                self._bash_checks.clear()
+            self._bash_checks[sha256] = error
+        return error
+
+    def validate(self, script_path: str | None, script_type: str):
+        """Raises ScriptInvalid for a task whose script could not run (no-op with SCRIPT_VALIDATION=off)."""
+        if SCRIPT_VALIDATION == "off" or not script_path:
+            return
+        if script_type not in SCRIPT_TYPES:
+            raise ScriptInvalid(f"Unknown script type: {script_type}")
+        self.lookup(script_path, script_type)
+
+    def stats(self) -> dict:
+        with self._lock:
+            watching = self._watcher is not None and self._watcher.alive
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                    "watch": "inotify" if watching else "stat", "validation": SCRIPT_VALIDATION}
+
+
+script_registry = ScriptRegistry()
@@ -1,32 +1,61 @@
 from datetime import datetime, timedelta
 from typing import Optional, List
 import os
-from dotenv import load_dotenv
 
 from fastapi import HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlmodel import Session
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 
 from sqlmodel import Session, select
 
 from models.user import Users, UserRole
-from db.session import get_session
+from db.session import get_session, get_async_session
+from core.cache import TTLCache
+from core.hashing import hashing_pool, hash_password_sync, verify_password_sync, HashingBusy
 
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback_unsafe_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTE")
-
-bcrypt = CryptContext(schemes=["bcrypt"], deprecated="auto")
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Resolved users by id. Entries are detached from their session and must be
+# treated as read-only; load a fresh row before modifying a user.
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def invalidate_user(user_id: int):
+    user_cache.pop(int(user_id))
+
+# bcrypt runs on the hashing process pool; callers only wait for the result
+def _hashing_unavailable(e: HashingBusy) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
 def hash_password(password: str) -> str:
-    return bcrypt.hash(password)
+    try:
+        return hashing_pool.run(hash_password_sync, password)
+    except HashingBusy as e:
+        raise _hashing_unavailable(e)
 
 def verify_password(plaintext: str, hashed: str) -> bool:
-    return bcrypt.verify(plaintext, hashed)
+    try:
+        return hashing_pool.run(verify_password_sync, plaintext, hashed)
+    except HashingBusy as e:
+        raise _hashing_unavailable(e)
+
+async def hash_password_async(password: str) -> str:
+    try:
+        return await hashing_pool.run_async(hash_password_sync, password)
+    except HashingBusy as e:
+        raise _hashing_unavailable(e)
+
+async def verify_password_async(plaintext: str, hashed: str) -> bool:
+    try:
+        return await hashing_pool.run_async(verify_password_sync, plaintext, hashed)
+    except HashingBusy as e:
+        raise _hashing_unavailable(e)
 
 def create_access_token(user: Users, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = {
@@ -38,23 +67,43 @@ def create_access_token(user: Users, expires_delta: Optional[timedelta] = None)
     }
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code = status.HTTP_401_UNAUTHORIZED,
         detail="Invalid Credentials",
         headers={"WWW-Authenticate": "Bearer"}
     )
+
+def _user_id_from_token(token: str) -> int:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
-    
-    user = session.get(Users, int(user_id))
+        raise _credentials_exception()
+    return int(user_id)
+
+def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+    user_id = _user_id_from_token(token)
+    user = user_cache.get(user_id)
+    if user is None:
+        user = session.get(Users, user_id)
+        if user is None:
+            raise _credentials_exception()
+        session.expunge(user)
+        user_cache.set(user.id, user)
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), session = Depends(get_async_session)):
+    user_id = _user_id_from_token(token)
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        user = await session.get(Users, user_id)
+        if user is None:
+            raise _credentials_exception()
+        session.expunge(user)
+        user_cache.set(user.id, user)
     return user
 
 def require_role(required_roles = list[UserRole]):
@@ -64,7 +113,17 @@ def require_role(required_roles = list[UserRole]):
         return user
     return role_checker
 
+def require_role_async(required_roles = list[UserRole]):
+    async def role_checker(user: Users = Depends(get_current_user_async)):
+        if user.role not in required_roles:
+            raise HTTPException(status_code=403, detail="Not authorized for this action")
+        return user
+    return role_checker
+
 require_admin = require_role([UserRole.admin])
 require_moderator = require_role([UserRole.admin, UserRole.moderator])
 require_power_user = require_role([UserRole.admin, UserRole.moderator, UserRole.power_user])
-require_viewer = require_role([UserRole.admin, UserRole.moderator, UserRole.power_user, UserRole.viewer])
\ No newline at end of file
+require_viewer = require_role([UserRole.admin, UserRole.moderator, UserRole.power_user, UserRole.viewer])
+
+require_power_user_async = require_role_async([UserRole.admin, UserRole.moderator, UserRole.power_user])
+require_viewer_async = require_role_async([UserRole.admin, UserRole.moderator, UserRole.power_user, UserRole.viewer])
\ No newline at end of file
@@ -0,0 +1,18 @@
+"""
+templates.py
+
+Jinja environment shared by the mail templates and the admin pages. It is
+built on first use, so importing the app does not set up (or import) Jinja.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache
+def template_env():
+    from jinja2 import Environment, FileSystemLoader
+    return Environment(loader=FileSystemLoader("templates"))
+
+
+def render(name: str, **context) -> str:
+    return template_env().get_template(name).render(**context)
@@ -0,0 +1,149 @@
+"""
+timeline.py
+
+Precomputed fire times of scheduled tasks. For every scheduled task the next
+fire times (at most TASK_FIRE_TIMES_AHEAD, at most TASK_FIRE_TIMES_HORIZON_HOURS
+ahead) are stored in TaskFireTime, so "what runs between T1 and T2" is an index
+range scan instead of cron parsing. TaskFireWindow records up to when a task's
+fire times are complete; a timeline is complete up to the earliest of those.
+
+Cron expressions are expanded in the scheduler's timezone, the same one its
+jobs fire in; fire times are stored in UTC.
+
+Fire times are rebuilt when a task is scheduled, pruned as its runs complete
+and topped up once more than half of its window has passed. Expanding a cron
+expression is memoized per expression and minute, so scheduling thousands of
+tasks that share a handful of schedules costs a handful of expansions.
+
+Environment Variables:
+- TASK_FIRE_TIMES_AHEAD: Maximum number of fire times stored per task.
+- TASK_FIRE_TIMES_HORIZON_HOURS: How far ahead fire times are computed.
+"""
+
+import os, logging
+from functools import lru_cache
+from datetime import datetime, timezone, timedelta
+from apscheduler.triggers.cron import CronTrigger
+from tzlocal import get_localzone
+from sqlalchemy import insert, delete, select, func
+from sqlalchemy.exc import IntegrityError
+
+from db.session import scheduler_engine
+from models.task import Task, TaskFireTime, TaskFireWindow
+
+logger = logging.getLogger(__name__)
+
+TASK_FIRE_TIMES_AHEAD = int(os.getenv("TASK_FIRE_TIMES_AHEAD", 120))
+TASK_FIRE_TIMES_HORIZON_HOURS = float(os.getenv("TASK_FIRE_TIMES_HORIZON_HOURS", 24))
+CHUNK = 1000
+
+fire_times_t = TaskFireTime.__table__
+windows_t = TaskFireWindow.__table__
+tasks_t = Task.__table__
+
+# Timezone cron expressions are evaluated in. Defaults to the scheduler's own
+# default; the process that owns the scheduler sets its actual timezone.
+_timezone = get_localzone()
+
+
+def use_timezone(tz):
+    global _timezone
+    _timezone = tz
+
+
+def as_utc(value: datetime) -> datetime:
+    # Naive datetimes are taken as UTC, like everything else the API stores
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=1024)
+def expand_cron(cron: str, start: datetime, tz) -> tuple[tuple[datetime, ...], datetime]:
+    """Fire times (UTC) of `cron` in `tz` after `start` (UTC, minute aligned) and up to when they are complete."""
+    trigger = CronTrigger.from_crontab(cron, timezone=tz)
+    end = start + timedelta(hours=TASK_FIRE_TIMES_HORIZON_HOURS)
+    fires = []
+    fire = trigger.get_next_fire_time(None, start)
+    while fire is not None and fire <= end and len(fires) < TASK_FIRE_TIMES_AHEAD:
+        fires.append(as_utc(fire))
+        fire = trigger.get_next_fire_time(fire, fire + timedelta(microseconds=1))
+    covered_until = fires[-1] if len(fires) == TASK_FIRE_TIMES_AHEAD else end
+    return tuple(fires), covered_until
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+
+def _write(connection, tasks: list, now: datetime):
+    task_ids = [task_id for task_id, _ in tasks]
+    for start in range(0, len(task_ids), CHUNK):
+        ids = task_ids[start:start + CHUNK]
+        connection.execute(delete(fire_times_t).where(fire_times_t.c.task_id.in_(ids)))
+        connection.execute(delete(windows_t).where(windows_t.c.task_id.in_(ids)))
+
+    fires, windows = [], []
+    for task_id, cron in tasks:
+        try:
+            times, covered_until = expand_cron(cron, now, _timezone)
+        except ValueError:
+            continue
+        fires.extend({"task_id": task_id, "fire_at": fire_at} for fire_at in times)
+        windows.append({"task_id": task_id, "built_at": now, "covered_until": covered_until})
+    for start in range(0, len(fires), CHUNK):
+        connection.execute(insert(fire_times_t), fires[start:start + CHUNK])
+    for start in range(0, len(windows), CHUNK):
+        connection.execute(insert(windows_t), windows[start:start + CHUNK])
+
+
+def rebuild_fire_times(tasks: list[tuple[int, str]]):
+    """Replaces the fire times of the given (task_id, schedule_cron) pairs."""
+    if not tasks:
+        return
+    try:
+        with scheduler_engine.begin() as connection:
+            _write(connection, tasks, _now())
+    except IntegrityError:
+        # Another process rebuilt the same tasks at the same time; its rows are just as good
+        logger.info(f"Fire times of {len(tasks)} tasks were rebuilt concurrently")
+
+
+def drop_fire_times(task_ids: list[int]):
+    if not task_ids:
+        return
+    with scheduler_engine.begin() as connection:
+        for start in range(0, len(task_ids), CHUNK):
+            ids = task_ids[start:start + CHUNK]
+            connection.execute(delete(fire_times_t).where(fire_times_t.c.task_id.in_(ids)))
+            connection.execute(delete(windows_t).where(windows_t.c.task_id.in_(ids)))
+
+
+def refresh_fire_times(task_ids: list[int] | None = None):
+    """
+    Drops past fire times of the given tasks (all tasks if None) and rebuilds
+    the ones that have no window yet or used up more than half of it.
+    """
+    now = _now()
+    with scheduler_engine.connect() as connection:
+        query = select(tasks_t.c.id, tasks_t.c.schedule_cron, windows_t.c.built_at, windows_t.c.covered_until) \
+            .select_from(tasks_t.outerjoin(windows_t, windows_t.c.task_id == tasks_t.c.id)) \
+            .where(tasks_t.c.sheduled == True, tasks_t.c.schedule_cron.is_not(None))
+        if task_ids is not None:
+            query = query.where(tasks_t.c.id.in_(task_ids))
+        rows = connection.execute(query).all()
+
+    stale = [
+        (task_id, cron) for task_id, cron, built_at, covered_until in rows
+        if covered_until is None or now - built_at > (covered_until - built_at) / 2
+    ]
+    with scheduler_engine.begin() as connection:
+        past = delete(fire_times_t).where(fire_times_t.c.fire_at < now)
+        if task_ids is not None:
+            past = past.where(fire_times_t.c.task_id.in_(task_ids))
+        connection.execute(past)
+    rebuild_fire_times(stale)
+
+
+def complete_until() -> datetime | None:
+    """The timeline contains every fire time up to this point."""
+    with scheduler_engine.connect() as connection:
+        return connection.execute(select(func.min(windows_t.c.covered_until))).scalar()
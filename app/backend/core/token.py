@@ -1,13 +1,17 @@
 from itsdangerous import URLSafeTimedSerializer
 from typing import Optional
 import os, secrets
-from dotenv import load_dotenv
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
 from sqlmodel import Session
 from models.user import UserApprovalToken
 
 SECRET = os.getenv("SECRET_KEY_TOKEN")
-serializer = URLSafeTimedSerializer(SECRET)
+
+@lru_cache
+def serializer() -> URLSafeTimedSerializer:
+    # Built on first use, so importing the app does not need the secret
+    return URLSafeTimedSerializer(SECRET)
 
 def create_secure_token(session: Session, user_id: int) -> str:
     token = secrets.token_urlsafe(32)  # Generate a secure random token
@@ -24,6 +28,6 @@ def create_secure_token(session: Session, user_id: int) -> str:
 
 def verify_secure_token(token: str) -> Optional[int]:
     try:
-        return serializer.loads(token, salt="approve-user", max_age=3600)  # Token valid for 1 hour
+        return serializer().loads(token, salt="approve-user", max_age=3600)  # Token valid for 1 hour
     except Exception:
         return None
\ No newline at end of file
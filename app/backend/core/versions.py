@@ -0,0 +1,81 @@
+"""
+versions.py
+
+Change counters for conditional GETs (see core/etag.py). Every write to the
+task table (API writes, batch writes and the run writer's counter updates)
+bumps a counter row in the database, so all API processes and workers share
+it. Readers keep the counter in memory for a short TTL.
+
+Writes made by this process are visible right away. Writes made by other
+processes can be missed for up to TASK_VERSION_TTL seconds.
+
+Environment Variables:
+- TASK_VERSION_TTL: Seconds a process trusts its in-memory copy of the counter.
+"""
+
+import os, time, threading
+from sqlalchemy import insert, update, select
+from sqlalchemy.exc import IntegrityError
+
+from db.session import scheduler_engine
+from models.task import DataVersion
+
+TASK_VERSION_TTL = float(os.getenv("TASK_VERSION_TTL", 1.0))
+
+versions = DataVersion.__table__
+
+
+class VersionCounter:
+    def __init__(self, name: str, ttl: float = TASK_VERSION_TTL):
+        self.name = name
+        self.ttl = ttl
+        self._value = None
+        self._expires = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> int:
+        with scheduler_engine.connect() as connection:
+            value = connection.execute(select(versions.c.version).where(versions.c.name == self.name)).scalar()
+        return value or 0
+
+    def _remember(self, value: int, generation: int):
+        with self._lock:
+            # A value read while this process bumped the counter may already be outdated
+            if generation == self._generation:
+                self._value = value
+                self._expires = time.monotonic() + self.ttl
+
+    def peek(self) -> int | None:
+        """The in-memory value, or None if it has to be read again (for async handlers)."""
+        with self._lock:
+            return self._value if time.monotonic() < self._expires else None
+
+    def current(self) -> int:
+        value = self.peek()
+        if value is None:
+            generation = self._generation
+            value = self._load()
+            self._remember(value, generation)
+        return value
+
+    def bump(self):
+        """Call after committing a change."""
+        with scheduler_engine.begin() as connection:
+            bumped = connection.execute(
+                update(versions).where(versions.c.name == self.name).values(version=versions.c.version + 1)
+            ).rowcount
+        if not bumped:
+            try:
+                with scheduler_engine.begin() as connection:
+                    connection.execute(insert(versions).values(name=self.name, version=1))
+            except IntegrityError:
+                # Another process created the row first
+                return self.bump()
+        with self._lock:
+            self._generation += 1
+            self._value = None
+            self._expires = 0.0
+
+
+task_version = VersionCounter("task")
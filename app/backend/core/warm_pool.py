@@ -0,0 +1,196 @@
+"""
+warm_pool.py
+
+Warm interpreter for script_type "python". Instead of starting python3 for
+every run, runs are handed to a long-lived template process (core/warm_worker.py)
+that has already imported the commonly used modules and forks a child per run.
+The run's output pipe is passed to the child directly, so output capture works
+exactly like for a spawned process. The template is replaced after a number of
+runs or when its memory grew too much.
+
+Environment Variables:
+- TASK_PYTHON_MODE: "cold" (default) spawns python3 per run, "warm" uses the template process.
+- WARM_PYTHON_PRELOAD: Comma separated modules imported once by the template, e.g. "json,requests,pandas".
+- WARM_PYTHON_MAX_RUNS: Runs after which the template is replaced.
+- WARM_PYTHON_MAX_RSS_GROWTH_MB: Growth of the template's peak RSS after which it is replaced.
+"""
+
+import os, json, uuid, socket, subprocess, threading, logging
+from concurrent.futures import Future
+
+from core.limits import watchdog, rlimits_for
+
+logger = logging.getLogger(__name__)
+
+TASK_PYTHON_MODE = os.getenv("TASK_PYTHON_MODE", "cold")
+WARM_PYTHON_PRELOAD = os.getenv("WARM_PYTHON_PRELOAD", "")
+WARM_PYTHON_MAX_RUNS = int(os.getenv("WARM_PYTHON_MAX_RUNS", 1000))
+WARM_PYTHON_MAX_RSS_GROWTH_MB = int(os.getenv("WARM_PYTHON_MAX_RSS_GROWTH_MB", 256))
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warm_worker.py")
+
+
+class WarmPoolUnavailable(Exception):
+    """The run could not be handed to a template; nothing was executed."""
+
+
+class _Template:
+    def __init__(self, preload: str):
+        sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self.process = subprocess.Popen(
+                ["python3", WORKER_SCRIPT, str(child_sock.fileno())],
+                pass_fds=[child_sock.fileno()], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                env=os.environ | {"WARM_PYTHON_PRELOAD": preload},
+            )
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            child_sock.close()
+        self.sock = sock
+        self.runs = 0
+        self.baseline_rss_kb = None
+        self.rss_kb = 0
+        self.closed = False
+        self._pending: dict[str, tuple[Future, callable]] = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._read, name="warm-python-reader", daemon=True).start()
+
+    def submit(self, script_path: str, args: list[str], out_fd: int, limits: dict, on_start=None,
+               code_path: str | None = None) -> Future:
+        """`on_start(pid)` is called from the reader thread once the child was forked."""
+        run_id = uuid.uuid4().hex
+        future = Future()
+        request = json.dumps({
+            "id": run_id, "script": script_path, "code": code_path, "args": args, "cwd": os.getcwd(),
+            "rlimits": rlimits_for(limits), "nice": limits["nice"],
+        }).encode()
+        with self._lock:
+            if self.closed:
+                raise WarmPoolUnavailable("template is shutting down")
+            self._pending[run_id] = (future, on_start)
+            try:
+                socket.send_fds(self.sock, [request], [out_fd])
+            except OSError as e:
+                del self._pending[run_id]
+                self.closed = True
+                raise WarmPoolUnavailable(f"template not reachable: {e}")
+            self.runs += 1
+        return future
+
+    def _read(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            message = json.loads(data)
+            if "pid" in message:
+                with self._lock:
+                    _, on_start = self._pending.get(message["id"], (None, None))
+                if on_start is not None:
+                    on_start(message["pid"])
+                continue
+            self.rss_kb = message["template_rss_kb"]
+            if self.baseline_rss_kb is None:
+                self.baseline_rss_kb = self.rss_kb
+            with self._lock:
+                future, _ = self._pending.pop(message["id"], (None, None))
+            if future is not None:
+                future.set_result(message)
+
+        with self._lock:
+            self.closed = True
+            pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            future.set_exception(RuntimeError("warm python template exited during the run"))
+        self.sock.close()
+        self.process.wait()
+
+    def retire(self):
+        """Stops sending runs; the template finishes the running ones and exits."""
+        with self._lock:
+            self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+class WarmPool:
+    def __init__(self, preload: str = WARM_PYTHON_PRELOAD, max_runs: int = WARM_PYTHON_MAX_RUNS,
+                 max_rss_growth_mb: int = WARM_PYTHON_MAX_RSS_GROWTH_MB):
+        self.preload = preload
+        self.max_runs = max_runs
+        self.max_rss_growth_kb = max_rss_growth_mb * 1024
+        self.templates_started = 0
+        self._template = None
+        self._lock = threading.Lock()
+
+    def _needs_recycle(self, template: _Template) -> bool:
+        if template.closed or template.runs >= self.max_runs:
+            return True
+        return template.baseline_rss_kb is not None and template.rss_kb - template.baseline_rss_kb > self.max_rss_growth_kb
+
+    def _current(self) -> _Template:
+        with self._lock:
+            if self._template is not None and self._needs_recycle(self._template):
+                logger.info(f"Recycling warm python template after {self._template.runs} runs")
+                self._template.retire()
+                self._template = None
+            if self._template is None:
+                try:
+                    self._template = _Template(self.preload)
+                except OSError as e:
+                    raise WarmPoolUnavailable(f"could not start template: {e}")
+                self.templates_started += 1
+            return self._template
+
+    def run(self, script_path: str, args: list[str], capture, limits: dict,
+            code_path: str | None = None) -> tuple[int | None, dict, object]:
+        """
+        Runs the script in a forked warm interpreter, streaming its output into
+        `capture`. With `code_path` (cached bytecode, see core/scripts.py) the
+        template loads the code once and its children skip the compile.
+        Returns the exit code, the child's resource usage and the watchdog
+        deadline of the run (None if the child never started).
+        """
+        deadlines = []
+
+        def on_start(pid: int):
+            deadline = watchdog.watch(pid, limits["timeout_seconds"])
+            deadlines.append(deadline)
+            capture.on_output_limit = lambda: watchdog.terminate(deadline, "output_limit")
+
+        read_fd, write_fd = os.pipe()
+        try:
+            future = self._current().submit(script_path, args, write_fd, limits, on_start, code_path)
+        except WarmPoolUnavailable:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        with open(read_fd, "rb", buffering=0) as stream:
+            capture.consume(stream)
+        try:
+            result = future.result()
+            return result["exit_code"], result["usage"], deadlines[0] if deadlines else None
+        except RuntimeError as e:
+            logger.error(f"Warm python run of {script_path} failed: {e}")
+            return None, {}, deadlines[0] if deadlines else None
+        finally:
+            for deadline in deadlines:
+                deadline.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            if self._template is not None:
+                self._template.retire()
+                self._template = None
+
+
+warm_pool = WarmPool() if TASK_PYTHON_MODE == "warm" else None
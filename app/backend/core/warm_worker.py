@@ -0,0 +1,183 @@
+"""
+warm_worker.py
+
+Template process for warm python runs (TASK_PYTHON_MODE=warm), started by
+core/warm_pool.py - not imported by the app. It imports the modules listed in
+WARM_PYTHON_PRELOAD once and then forks one child per run, so each run starts
+from an interpreter that is already up and has those imports done, but still
+gets a fresh __main__ namespace and cannot leak state into the next run.
+Cached bytecode of a script (see core/scripts.py) is loaded by the template
+once, so its children neither read nor compile the script.
+
+Requests arrive over the SOCK_SEQPACKET socket whose fd is passed as argv[1],
+each with the write end of the run's output pipe attached. The template stays
+single threaded so forking it is safe; children are reaped with wait4 when
+SIGCHLD wakes the loop up.
+"""
+
+import sys
+
+# Python put core/ first on the import path, where token.py and email.py
+# would shadow the stdlib for everything imported below
+sys.path.pop(0)
+
+import os, json, types, runpy, atexit, select, signal, socket, marshal, builtins, resource, importlib.util, traceback
+
+CODE_CACHE_SIZE = 256
+
+# Code objects by bytecode path; content addressed, so they never go stale
+code_cache = {}
+
+
+def preload(names: list[str]):
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"warm worker: could not preload {name}: {e}", file=sys.stderr)
+
+
+def load_code(path: str | None):
+    if not path:
+        return None
+    code = code_cache.get(path)
+    if code is None:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Compiled by a different python version than this one
+            if data[:4] != importlib.util.MAGIC_NUMBER:
+                return None
+            code = marshal.loads(data[16:])
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+        if len(code_cache) >= CODE_CACHE_SIZE:
+            code_cache.clear()
+        code_cache[path] = code
+    return code
+
+
+def run_code(code, script: str):
+    # What runpy.run_path does for a plain file, minus reading and compiling it
+    module = types.ModuleType("__main__")
+    module.__file__ = script
+    module.__cached__ = None
+    module.__builtins__ = builtins
+    sys.modules["__main__"] = module
+    exec(code, module.__dict__)
+
+
+def send(sock: socket.socket, message: dict):
+    try:
+        sock.send(json.dumps(message).encode())
+    except OSError:
+        pass  # the pool is gone, the run result has nobody to go to
+
+
+def run_child(request: dict, out_fd: int, script_code):
+    os.dup2(out_fd, 1)
+    os.dup2(out_fd, 2)
+    os.close(out_fd)
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    # Own process group so a timeout kills whatever the script started too
+    os.setsid()
+
+    code = 0
+    try:
+        for which, soft, hard in request["rlimits"]:
+            resource.setrlimit(which, (soft, hard))
+        if request["nice"]:
+            os.nice(request["nice"])
+        os.chdir(request["cwd"])
+        script = request["script"]
+        # Same argv and import path as "python3 script.py"
+        sys.argv = [script] + request["args"]
+        sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+        if script_code is not None:
+            run_code(script_code, script)
+        else:
+            runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    try:
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code)
+
+
+def reap(sock: socket.socket, children: dict):
+    while children:
+        try:
+            pid, status, usage = os.wait4(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        run_id = children.pop(pid, None)
+        if run_id is None:
+            continue
+        send(sock, {
+            "id": run_id,
+            "exit_code": os.waitstatus_to_exitcode(status),
+            "usage": {"cpu_user_seconds": usage.ru_utime, "cpu_system_seconds": usage.ru_stime, "max_rss_kb": usage.ru_maxrss},
+            "template_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        })
+
+
+def main():
+    sock = socket.socket(fileno=int(sys.argv[1]))
+    preload([name.strip() for name in os.getenv("WARM_PYTHON_PRELOAD", "").split(",") if name.strip()])
+
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    children = {}
+    accepting = True
+    # After the pool closed its end, finish the running children and exit
+    while accepting or children:
+        readable = select.select([sock, wakeup_r] if accepting else [wakeup_r], [], [], 1.0)[0]
+        if wakeup_r in readable:
+            try:
+                os.read(wakeup_r, 4096)
+            except BlockingIOError:
+                pass
+        reap(sock, children)
+        if sock not in readable:
+            continue
+
+        data, fds, _, _ = socket.recv_fds(sock, 65536, 1)
+        if not data:
+            accepting = False
+            continue
+        request = json.loads(data)
+        script_code = load_code(request.get("code"))
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            sock.close()
+            os.close(wakeup_r)
+            os.close(wakeup_w)
+            run_child(request, fds[0], script_code)
+        os.close(fds[0])
+        children[pid] = request["id"]
+        send(sock, {"id": request["id"], "pid": pid})
+
+
+if __name__ == "__main__":
+    main()
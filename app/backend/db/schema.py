@@ -0,0 +1,62 @@
+"""
+schema.py
+
+Schema setup without a migration tool: creates missing tables and adds
+columns and indexes that were added to the models after a table was first
+created. Runs on API startup unless DB_SCHEMA_SETUP=skip; to run it once per
+deploy instead:
+
+    python -m db.schema
+New columns are added as nullable or with their model default, so existing
+rows stay valid.
+"""
+
+import logging
+from sqlalchemy import inspect, text
+from sqlmodel import SQLModel
+
+logger = logging.getLogger(__name__)
+
+
+def _default_literal(column, dialect) -> str | None:
+    default = column.default
+    if default is None or not default.is_scalar or default.arg is None:
+        return None
+    return column.type.literal_processor(dialect)(default.arg)
+
+
+def migrate(engine):
+    SQLModel.metadata.create_all(engine)
+    inspector = inspect(engine)
+    dialect = engine.dialect
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                quote = dialect.identifier_preparer
+                statement = f"ALTER TABLE {quote.format_table(table)} ADD COLUMN {quote.format_column(column)} {column.type.compile(dialect)}"
+                default = _default_literal(column, dialect)
+                if default is not None:
+                    statement += f" DEFAULT {default}"
+                    if not column.nullable:
+                        statement += " NOT NULL"
+                connection.execute(text(statement))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+                    logger.info(f"Added index {index.name}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    import models.task, models.user
+    from db.session import engine
+    migrate(engine)
@@ -1,14 +1,68 @@
-from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel import create_engine, Session
+from functools import lru_cache
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SQLModel.metadata.create_all(engine)
+def _engine_options(prefix: str, pool_size: int, max_overflow: int) -> dict:
+    # Pool tuning is read per engine, e.g. API_DB_POOL_SIZE or SCHEDULER_DB_POOL_SIZE
+    options = {
+        "pool_pre_ping": os.getenv(f"{prefix}_DB_PRE_PING", "true").lower() != "false",
+        "pool_recycle": int(os.getenv(f"{prefix}_DB_POOL_RECYCLE", 1800)),
+    }
+    if not DATABASE_URL.startswith("sqlite"):
+        options.update(
+            pool_size=int(os.getenv(f"{prefix}_DB_POOL_SIZE", pool_size)),
+            max_overflow=int(os.getenv(f"{prefix}_DB_MAX_OVERFLOW", max_overflow)),
+            pool_timeout=float(os.getenv(f"{prefix}_DB_POOL_TIMEOUT", 30)),
+        )
+    return options
+
+# Request handlers use `engine`; the scheduler, run writer and job store use
+# `scheduler_engine`, so a burst of runs can never take the connections
+# interactive requests need.
+engine = create_engine(DATABASE_URL, **_engine_options("API", pool_size=10, max_overflow=10))
+scheduler_engine = create_engine(DATABASE_URL, **_engine_options("SCHEDULER", pool_size=5, max_overflow=5))
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+# Async mode (API_MODE=async). The async engine is only built on first use so
+# sync deployments don't need asyncpg/aiosqlite installed.
+ASYNC_DRIVERS = {
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+@lru_cache
+def get_async_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine
+    return create_async_engine(ASYNC_DATABASE_URL, **_engine_options("API", pool_size=10, max_overflow=10))
+
+async def get_async_session():
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    return status
+
+def get_pool_status() -> dict:
+    status = {"api": pool_status(engine), "scheduler": pool_status(scheduler_engine)}
+    if get_async_engine.cache_info().currsize:
+        status["api_async"] = pool_status(get_async_engine().sync_engine)
+    return status
@@ -1,17 +1,62 @@
+import os, time, logging
+
+_import_started = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# The only place the API reads .env; everything below reads os.environ
+load_dotenv()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from sqlmodel import SQLModel
 from fastapi.middleware.cors import CORSMiddleware
 
-from routers import admin, auth, debug, tasks
+from routers import admin, auth, batch, debug, tasks, metrics
 from db.session import engine
-from models.user import Users
-from models.task import Task
+from db.schema import migrate
+from core.metrics import MetricsMiddleware
+from core.mailer import mail_queue
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# DB_SCHEMA_SETUP=skip leaves the schema alone on startup, e.g. when it is set
+# up once per deploy with `python -m db.schema` instead of by every replica
+DB_SCHEMA_SETUP = os.getenv("DB_SCHEMA_SETUP", "auto")
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", 2))
 
 #class Run(Enum):
 #    LOCAL = "local"
 #    REMOTE = "remote"
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Importing the app has no side effects; the database and the scheduler
+    # are only touched here, once the server actually starts
+    timings = {"imports": app.state.import_seconds}
+    started = time.perf_counter()
+    if DB_SCHEMA_SETUP != "skip":
+        migrate(engine)
+        timings["schema"] = time.perf_counter() - started
+    step = time.perf_counter()
+    tasks.start_scheduler()
+    timings["scheduler"] = time.perf_counter() - step
+    timings["total"] = sum(timings.values())
+    app.state.startup_timings = timings
+
+    summary = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+    if timings["total"] > STARTUP_BUDGET_SECONDS:
+        logger.warning(f"Startup took longer than the budget of {STARTUP_BUDGET_SECONDS} s: {summary}")
+    else:
+        logger.info(f"Startup: {summary}")
+
+    yield
+
+    tasks.stop_scheduler()
+    # Flushes mail that is still queued
+    mail_queue.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://0.0.0.0:5173",
@@ -24,12 +69,25 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"]
 )
+app.add_middleware(MetricsMiddleware)
+
+# API_MODE=async serves task CRUD and auth from async handlers on the async engine
+API_MODE = os.getenv("API_MODE", "sync")
 
 app.include_router(admin.router)
-app.include_router(auth.router)
 app.include_router(debug.router)
+app.include_router(metrics.router)
 app.include_router(tasks.router)
+app.include_router(batch.router)
+if API_MODE == "async":
+    from routers import async_auth, async_tasks
+    app.include_router(async_auth.router)
+    app.include_router(async_tasks.router)
+else:
+    app.include_router(auth.router)
+    app.include_router(tasks.crud_router)
 
-SQLModel.metadata.create_all(engine)
\ No newline at end of file
+app.state.import_seconds = time.perf_counter() - _import_started
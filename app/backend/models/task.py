@@ -1,9 +1,22 @@
 from enum import Enum
 from typing import Optional, Dict
-from sqlmodel import SQLModel, Field
+from datetime import datetime
+from sqlmodel import SQLModel, Field, Index
 from pydantic import BaseModel, EmailStr
 
+# Smallest misfire grace time (seconds) a scheduled job can have; the scheduler
+# leader wakes up at least this often (see routers/tasks.py)
+MIN_MISFIRE_GRACE_TIME = 1
+
 class Task(SQLModel, table=True):
+    # Composite (filter, id) indexes keep filtered keyset pages an index range scan
+    __table_args__ = (
+        Index("ix_task_sheduled_id", "sheduled", "id"),
+        Index("ix_task_script_type_id", "script_type", "id"),
+        Index("ix_task_successful_id", "successful", "id"),
+        Index("ix_task_taskname_prefix", "taskname", postgresql_ops={"taskname": "text_pattern_ops"}),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     taskname: str
     sheduled: bool
@@ -12,4 +25,95 @@ class Task(SQLModel, table=True):
     schedule_cron: Optional[str] = None
     script_path: Optional[str] = None
     parameters: Optional[str] = None
-    script_type: str
\ No newline at end of file
+    script_type: str
+    # Overlap and misfire policy. coalesce and misfire_grace_time (seconds,
+    # None = no limit) are applied by the scheduler, max_instances and
+    # skip_if_running by the executor.
+    max_instances: int = Field(default=1, ge=1)
+    coalesce: bool = True
+    misfire_grace_time: Optional[int] = Field(default=MIN_MISFIRE_GRACE_TIME, ge=MIN_MISFIRE_GRACE_TIME)
+    skip_if_running: bool = False
+    # Resource limits per run, None = the TASK_DEFAULT_* value (see core/limits.py)
+    timeout_seconds: Optional[int] = Field(default=None, ge=0)
+    max_memory_mb: Optional[int] = Field(default=None, ge=0)
+    max_cpu_seconds: Optional[int] = Field(default=None, ge=0)
+    # Only increments: lowering the priority below the API's needs privileges
+    nice: Optional[int] = Field(default=None, ge=0)
+    max_output_bytes: Optional[int] = Field(default=None, ge=0)
+    # Retry policy for failed runs (see core/retry.py). max_attempts counts the
+    # first attempt, so 1 means no retries. retry_exit_codes is a comma
+    # separated list; None retries every failure.
+    max_attempts: int = 1
+    retry_delay_seconds: float = 10
+    retry_max_delay_seconds: float = 3600
+    retry_jitter: float = 1.0
+    retry_exit_codes: Optional[str] = None
+
+class TaskRun(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_taskrun_task_id_id", "task_id", "id"),
+        Index("ix_taskrun_started_at", "started_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    task_id: int
+    run_id: str = Field(unique=True)
+    started_at: datetime
+    finished_at: datetime
+    duration: float
+    exit_code: Optional[int] = None
+    successful: bool
+    output_path: Optional[str] = None
+    # Resource usage of the run's process from wait4, and why it was killed
+    # ("timeout", "output_limit", "cpu_limit") if it was. Linux counts the
+    # spawning process' RSS before exec into max_rss_kb (the API or worker,
+    # the exec wrapper or the warm template), so it is an upper bound only
+    # and /tasks/usage does not rank by it.
+    cpu_user_seconds: Optional[float] = None
+    cpu_system_seconds: Optional[float] = None
+    max_rss_kb: Optional[int] = None
+    killed_reason: Optional[str] = None
+    # 1 for the first attempt of a run, counting up with every retry
+    attempt: int = 1
+
+class RunRequest(SQLModel, table=True):
+    # Queue of runs waiting for a worker (EXECUTION_MODE=queue). Rows are
+    # deleted once the run finished; the result lives in TaskRun.
+    __table_args__ = (Index("ix_runrequest_status_id", "status", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    task_id: int
+    status: str = "pending"
+    enqueued_at: datetime
+    claimed_at: Optional[datetime] = None
+    claimed_by: Optional[str] = None
+    # Retries are queued right away but not claimed before available_at
+    attempt: int = 1
+    available_at: Optional[datetime] = None
+
+class TaskDependency(SQLModel, table=True):
+    # Edge of the task DAG: task_id only runs after depends_on_id succeeded
+    __table_args__ = (Index("ix_taskdependency_depends_on_id", "depends_on_id", "task_id"),)
+
+    task_id: int = Field(primary_key=True)
+    depends_on_id: int = Field(primary_key=True)
+
+class TaskFireTime(SQLModel, table=True):
+    # Upcoming fire times of scheduled tasks, see core/timeline.py
+    __table_args__ = (Index("ix_taskfiretime_fire_at_task_id", "fire_at", "task_id"),)
+
+    task_id: int = Field(primary_key=True)
+    fire_at: datetime = Field(primary_key=True)
+
+class TaskFireWindow(SQLModel, table=True):
+    # TaskFireTime holds every fire time of the task up to covered_until
+    __table_args__ = (Index("ix_taskfirewindow_covered_until", "covered_until"),)
+
+    task_id: int = Field(primary_key=True)
+    built_at: datetime
+    covered_until: datetime
+
+class DataVersion(SQLModel, table=True):
+    # Change counter per table, bumped on every write; drives ETags (core/versions.py)
+    name: str = Field(primary_key=True)
+    version: int = 0
@@ -3,22 +3,19 @@ from datetime import datetime, timezone, timedelta
 from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request, BackgroundTasks
 from fastapi.responses import HTMLResponse
 from sqlmodel import Session, select
-from jinja2 import Environment, FileSystemLoader
 from schemas.user import Message, UserRead, RoleUpdate
-from db.session import get_session
-from core.security import require_admin
+from db.session import get_session, get_pool_status
+from core.security import require_admin, invalidate_user
 from core.token import verify_secure_token
 from models.user import Users, UserRole, UserApprovalToken
 from core.email import send_approval_email
+from core.templates import render
 
 router = APIRouter()
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-env = Environment(loader=FileSystemLoader("templates"))
-
 @router.get("/admin/approve", response_class=HTMLResponse)
-def approve_user(token: str, background_task: BackgroundTasks, request: Request, session: Session = Depends(get_session)):
+def approve_user(token: str, request: Request, session: Session = Depends(get_session)):
     
     secure_token = session.exec(
         select(UserApprovalToken).where(UserApprovalToken.token == token)
@@ -42,15 +39,15 @@ def approve_user(token: str, background_task: BackgroundTasks, request: Request,
         session.delete(secure_token)
         session.commit()
         session.refresh(target_user)
+        invalidate_user(target_user.id)
         logger.info(f"Approval email sent for {target_user.username}")
     else:
         logger.info(f"User {target_user.username} already active; skipping email.")
 
-    background_task.add_task(send_approval_email, target_user)
+    send_approval_email(target_user)
 
     logged_in = "session" in request.cookies
-    template = env.get_template("approve_success.html")
-    html_content = template.render(logged_in=logged_in)
+    html_content = render("approve_success.html", logged_in=logged_in)
     return HTMLResponse(content=html_content)
 
     #return {"message" : f"User {target_user.username} has been approved and activated."}
@@ -68,6 +65,7 @@ def delete_user(user_id: int, session: Session = Depends(get_session), user: Use
         raise HTTPException(status_code=404, detail="User not found")
     session.delete(user)
     session.commit()
+    invalidate_user(user_id)
     return {"message": f"User {user.username} deleted successfully"}
 
 @router.put("/admin/users/{user_id}/role")
@@ -79,5 +77,9 @@ def update_user_role(user_id: int, payload: RoleUpdate, session: Session = Depen
     user.role = payload.role
     session.add(user)
     session.commit()
+    invalidate_user(user_id)
     return {"message": f"User {user.id} has been modified successfully. Role now {user.role}"}
-    
\ No newline at end of file
+
+@router.get("/admin/db/pools")
+def db_pool_status(_: Users = Depends(require_admin)):
+    return get_pool_status()
@@ -0,0 +1,91 @@
+"""
+async_auth.py
+
+Async versions of the authentication endpoints in auth.py, used when the API
+runs with API_MODE=async. Database access goes through the async engine and
+password hashing is awaited on the hashing process pool, so neither holds a
+threadpool slot.
+
+Endpoints:
+1. /login
+2. /register
+3. /change-password
+"""
+
+import os
+from core.security import OAuth2PasswordRequestForm, verify_password_async, create_access_token, hash_password_async
+from fastapi import APIRouter, HTTPException, Depends
+from sqlmodel import select, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.user import Users
+from schemas.user import Message, UserCreate, PasswordChangeRequest
+from db.session import get_async_session, engine
+from core.security import require_viewer_async, invalidate_user
+from core.email import send_email
+from core.blocking import run_blocking
+
+router = APIRouter()
+
+ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTE")
+
+def _send_registration_email(user: Users):
+    # send_email stores the approval token through a sync session
+    with Session(engine) as session:
+        send_email(session, user)
+
+# Login endpoint
+@router.post("/login")
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_async_session)):
+    """
+    Authenticates a user and generates an access token. See auth.login.
+    """
+    user = (await session.exec(select(Users).where(Users.username == form_data.username))).first()
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=400, detail="Incorrect Username or Password")
+
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Account not approved by admin")
+
+    access_token = create_access_token(user=user, expires_delta=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {"access_token": access_token, "token_type": "bearer"}
+
+# Registration endpoint
+@router.post("/register", response_model=Message)
+async def register(user: UserCreate, session: AsyncSession = Depends(get_async_session)):
+    """
+    Registers a new user and sends a notification email to admin users. See auth.register.
+    """
+    existing = (await session.exec(select(Users).where(Users.username == user.username))).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Username already exists")
+
+    new_user = Users(
+        username=user.username,
+        email=user.email,
+        hashed_password=await hash_password_async(user.password),
+        is_active=False,
+        is_admin=False
+    )
+    session.add(new_user)
+    await session.commit()
+    await session.refresh(new_user)
+
+    await run_blocking(_send_registration_email, new_user)
+
+    return {"message": "Registration request submitted. Awaiting Admin approval"}
+
+# Change password endpoint
+@router.post("/change-password", response_model=Message)
+async def change_password(data: PasswordChangeRequest, session: AsyncSession = Depends(get_async_session), user: Users = Depends(require_viewer_async)):
+    """
+    Allows a user to change their password. See auth.change_password.
+    """
+    if not await verify_password_async(data.old_password, user.hashed_password):
+        raise HTTPException(status_code=403, detail="Old password is incorrect")
+
+    db_user = await session.get(Users, user.id)
+    db_user.hashed_password = await hash_password_async(data.new_password)
+    session.add(db_user)
+    await session.commit()
+    invalidate_user(user.id)
+    return {"message": "Password changed successfully"}
@@ -0,0 +1,113 @@
+"""
+async_tasks.py
+
+Async versions of the task CRUD endpoints, used when the API runs with
+API_MODE=async. They talk to the database through the async engine, so an
+in-flight request waiting on Postgres does not occupy a threadpool slot.
+Scheduler updates still go through the (blocking) job store and therefore run
+on the blocking pool in core/blocking.py, awaited as futures.
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlmodel import delete, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db.session import get_async_session
+from models.task import Task, TaskRun, TaskDependency
+from models.user import Users
+from core.security import get_current_user_async, require_viewer_async, require_power_user_async
+from core.pagination import encode_cursor
+from core.versions import task_version
+from core.etag import cached_response, store_response, json_list
+from core.output import drop_captures
+from core.blocking import run_blocking
+from routers.tasks import task_list_query, schedule_task, unschedule_task, validate_task
+
+router = APIRouter()
+
+#Creating a Task:
+@router.post("/tasks", response_model=Task)
+async def create_task(task: Task, session: AsyncSession = Depends(get_async_session), user: Users = Depends(require_power_user_async)):
+    await run_blocking(validate_task, task)
+    session.add(task)
+    await session.commit()
+    await session.refresh(task)
+    await run_blocking(task_version.bump)
+
+    await run_blocking(schedule_task, task)
+
+    return task
+
+async def current_version() -> int:
+    # Only hits the database (on the blocking pool) once the in-memory copy expired
+    version = task_version.peek()
+    return version if version is not None else await run_blocking(task_version.current)
+
+#Get Tasks (ETag / If-None-Match, pages are cached per task table version)
+@router.get("/tasks", response_model=list[Task])
+async def get_tasks(
+    request: Request,
+    user: Users = Depends(require_viewer_async),
+    limit: int = Query(default=10, gt=0, le=100),
+    cursor: str | None = None,
+    scheduled: bool | None = None,
+    script_type: str | None = None,
+    successful: bool | None = None,
+    name_prefix: str | None = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    version = await current_version()
+    key = ("tasks", limit, cursor, scheduled, script_type, successful, name_prefix)
+    response = cached_response(request, version, key)
+    if response is not None:
+        return response
+    query = task_list_query(limit, cursor, scheduled, script_type, successful, name_prefix)
+    tasks = (await session.exec(query)).all()
+    headers = {"X-Next-Cursor": encode_cursor(tasks[-1].id)} if len(tasks) == limit else {}
+    return store_response(version, key, json_list(tasks), headers)
+
+#Get Task by ID:
+@router.get("/tasks/{task_id}", response_model=Task)
+async def get_task_by_id(task_id: int, request: Request, session: AsyncSession = Depends(get_async_session), user: Users = Depends(require_viewer_async)):
+    version = await current_version()
+    response = cached_response(request, version, ("task", task_id))
+    if response is not None:
+        return response
+    task = await session.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not f0und")
+    return store_response(version, ("task", task_id), task.model_dump_json().encode())
+
+#Update Task:
+@router.put("/tasks/{task_id}", response_model=Task)
+async def update_task(task_id: int, task_data: Task, session: AsyncSession = Depends(get_async_session), user: Users = Depends(get_current_user_async)):
+    task = await session.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not f0und")
+    await run_blocking(validate_task, task_data)
+    for field, value in task_data.model_dump(exclude={"id"}).items():
+        setattr(task, field, value)
+
+    await session.commit()
+    await session.refresh(task)
+    await run_blocking(task_version.bump)
+
+    await run_blocking(schedule_task, task)
+    return task
+
+#Delete Task
+@router.delete("/tasks/{task_id}")
+async def delete_task(task_id: int, session: AsyncSession = Depends(get_async_session), user: Users = Depends(require_power_user_async)):
+    task = await session.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not f0und")
+
+    await session.delete(task)
+    await session.exec(delete(TaskRun).where(TaskRun.task_id == task_id))
+    await session.exec(delete(TaskDependency).where(or_(TaskDependency.task_id == task_id, TaskDependency.depends_on_id == task_id)))
+    await session.commit()
+    await run_blocking(task_version.bump)
+
+    await run_blocking(unschedule_task, task_id)
+    drop_captures([task_id])
+    return task
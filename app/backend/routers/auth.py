@@ -27,10 +27,9 @@ from sqlmodel import select, Session
 from models.user import Users
 from schemas.user import Message, UserCreate, PasswordChangeRequest
 from db.session import get_session
-from core.security import require_viewer
+from core.security import require_viewer, invalidate_user
 from core.email import send_email
 import os
-from dotenv import load_dotenv
 
 # Initialize the router for authentication-related endpoints
 router = APIRouter()
@@ -66,13 +65,12 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = D
 
 # Registration endpoint
 @router.post("/register", response_model=Message)
-def register(user: UserCreate, background_task: BackgroundTasks, session: Session = Depends(get_session)):
+def register(user: UserCreate, session: Session = Depends(get_session)):
     """
     Registers a new user and sends a notification email to admin users.
 
     Parameters:
     - user (UserCreate): Contains user registration details.
-    - background_task (BackgroundTasks): Used for sending emails asynchronously.
     - session (Session): Database session dependency.
 
     Returns:
@@ -81,12 +79,6 @@ def register(user: UserCreate, background_task: BackgroundTasks, session: Sessio
     Raises:
     - HTTPException: Username already exists.
     """
-    admin_users = session.exec(
-        select(Users).where(Users.role == "admin", Users.email != None)
-    ).all()
-
-    admin_emails = [admin.email for admin in admin_users if admin.email]
-    
     existing = session.exec(select(Users).where(Users.username == user.username)).first()
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
@@ -104,7 +96,7 @@ def register(user: UserCreate, background_task: BackgroundTasks, session: Sessio
     session.commit()
     session.refresh(new_user)
 
-    background_task.add_task(send_email, new_user, admin_emails)
+    send_email(session, new_user)
 
     return {"message": "Registration request submitted. Awaiting Admin approval"}
 
@@ -128,7 +120,10 @@ def change_password(data: PasswordChangeRequest, session: Session = Depends(get_
     if not verify_password(data.old_password, user.hashed_password):
         raise HTTPException(status_code=403, detail="Old password is incorrect")
     
-    user.hashed_password = hash_password(data.new_password)
-    session.add(user)
+    # The authenticated user may come from the user cache, so update a fresh row
+    db_user = session.get(Users, user.id)
+    db_user.hashed_password = hash_password(data.new_password)
+    session.add(db_user)
     session.commit()
+    invalidate_user(user.id)
     return {"message": "Password changed successfully"}
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+batch.py
+
+Bulk task endpoints for provisioning thousands of tasks at once. Batches are
+sent as a JSON array or as NDJSON (one task per line, Content-Type
+application/x-ndjson), validated as a whole, written in one transaction with
+multi-row statements and registered with the scheduler in one job store pass.
+A batch with any invalid item (including a missing or broken script, see
+core/scripts.py) is rejected completely.
+
+Environment Variables:
+- TASK_BATCH_MAX: Maximum number of items per batch request.
+- TASK_EXPORT_PAGE_SIZE: Rows fetched per query while streaming an export.
+"""
+
+import os, json
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlmodel import Session, select, delete, or_
+
+from db.session import engine
+from models.task import Task, TaskRun, TaskDependency
+from models.user import Users
+from core.security import require_viewer, require_power_user
+from core.versions import task_version
+from core.scripts import script_registry
+from core.output import drop_captures
+from routers.tasks import task_list_query, schedule_tasks, unschedule_tasks, scheduler, is_schedulable, build_job
+
+router = APIRouter()
+
+TASK_BATCH_MAX = int(os.getenv("TASK_BATCH_MAX", 10000))
+TASK_EXPORT_PAGE_SIZE = int(os.getenv("TASK_EXPORT_PAGE_SIZE", 1000))
+
+
+def _too_large():
+    return HTTPException(status_code=413, detail=f"Batches are limited to {TASK_BATCH_MAX} items")
+
+def _parse_line(line: bytes, number: int):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON on line {number}: {e}")
+
+async def read_items(request: Request) -> list:
+    """Reads a JSON array or an NDJSON stream; NDJSON is parsed while it arrives."""
+    if "ndjson" not in request.headers.get("content-type", ""):
+        try:
+            items = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array")
+        if len(items) > TASK_BATCH_MAX:
+            raise _too_large()
+        return items
+
+    items, buffer, number = [], b"", 0
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                items.append(_parse_line(line, number))
+        if len(items) > TASK_BATCH_MAX:
+            raise _too_large()
+    if buffer.strip():
+        items.append(_parse_line(buffer, number + 1))
+    if len(items) > TASK_BATCH_MAX:
+        raise _too_large()
+    return items
+
+def validate_tasks(items: list, require_id: bool) -> list[Task]:
+    now = datetime.now(scheduler.timezone)
+    tasks, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Expected a JSON object")
+            if not require_id:
+                item = {key: value for key, value in item.items() if key != "id"}
+            elif not isinstance(item.get("id"), int):
+                raise ValueError("Missing task id")
+            task = Task.model_validate(item)
+            # Build the job exactly as schedule_tasks will, so nothing can fail after the commit
+            if is_schedulable(task):
+                build_job(task, now)
+            # Registry lookups are cached, so a batch sharing one script checks it once
+            script_registry.validate(task.script_path, task.script_type)
+            tasks.append(task)
+        except ValidationError as e:
+            errors.append({"index": index, "errors": e.errors(include_url=False, include_context=False)})
+        except (ValueError, TypeError) as e:
+            errors.append({"index": index, "errors": [{"msg": str(e)}]})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return tasks
+
+
+def create_tasks(tasks: list[Task]) -> list[int]:
+    rows = [task.model_dump(exclude={"id"}) for task in tasks]
+    with Session(engine) as session:
+        ids = session.scalars(insert(Task).returning(Task.id, sort_by_parameter_order=True), rows).all()
+        session.commit()
+    task_version.bump()
+    for task, task_id in zip(tasks, ids):
+        task.id = task_id
+    schedule_tasks(tasks)
+    return ids
+
+def update_tasks(tasks: list[Task]) -> list[int]:
+    ids = [task.id for task in tasks]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=422, detail="Duplicate task ids in batch")
+    with Session(engine) as session:
+        existing = set(session.exec(select(Task.id).where(Task.id.in_(ids))).all())
+        missing = [task_id for task_id in ids if task_id not in existing]
+        if missing:
+            raise HTTPException(status_code=404, detail={"message": "Task not f0und", "ids": missing})
+        # ORM bulk UPDATE by primary key, sent as one executemany
+        session.execute(update(Task), [task.model_dump() for task in tasks])
+        session.commit()
+    task_version.bump()
+    schedule_tasks(tasks)
+    return ids
+
+def delete_tasks(ids: list[int]) -> list[int]:
+    with Session(engine) as session:
+        existing = session.exec(select(Task.id).where(Task.id.in_(ids))).all()
+        session.exec(delete(TaskRun).where(TaskRun.task_id.in_(existing)))
+        session.exec(delete(TaskDependency).where(or_(TaskDependency.task_id.in_(existing), TaskDependency.depends_on_id.in_(existing))))
+        session.exec(delete(Task).where(Task.id.in_(existing)))
+        session.commit()
+    task_version.bump()
+    unschedule_tasks(existing)
+    drop_captures(existing)
+    return existing
+
+
+#Create Tasks in bulk (JSON array or NDJSON):
+@router.post("/tasks/batch")
+async def create_tasks_batch(request: Request, user: Users = Depends(require_power_user)):
+    tasks = await run_in_threadpool(validate_tasks, await read_items(request), False)
+    ids = await run_in_threadpool(create_tasks, tasks)
+    return {"created": len(ids), "ids": ids}
+
+#Update Tasks in bulk (every item needs its id):
+@router.put("/tasks/batch")
+async def update_tasks_batch(request: Request, user: Users = Depends(require_power_user)):
+    tasks = await run_in_threadpool(validate_tasks, await read_items(request), True)
+    ids = await run_in_threadpool(update_tasks, tasks)
+    return {"updated": len(ids), "ids": ids}
+
+#Delete Tasks in bulk (JSON array of ids):
+@router.post("/tasks/batch/delete")
+def delete_tasks_batch(ids: list[int], user: Users = Depends(require_power_user)):
+    if len(ids) > TASK_BATCH_MAX:
+        raise _too_large()
+    deleted = delete_tasks(ids)
+    return {"deleted": len(deleted), "ids": deleted}
+
+#Export all Tasks as NDJSON:
+@router.get("/tasks/export")
+def export_tasks(
+    user: Users = Depends(require_viewer),
+    scheduled: bool | None = None,
+    script_type: str | None = None,
+    successful: bool | None = None,
+    name_prefix: str | None = None,
+):
+    def rows():
+        # Keyset pages with a short-lived session each, so neither the rows
+        # nor a connection are held for the whole download
+        last_id = None
+        while True:
+            query = task_list_query(TASK_EXPORT_PAGE_SIZE, None, scheduled, script_type, successful, name_prefix)
+            if last_id is not None:
+                query = query.where(Task.id > last_id)
+            with Session(engine) as session:
+                tasks = session.exec(query).all()
+            if not tasks:
+                return
+            yield "".join(task.model_dump_json() + "\n" for task in tasks)
+            last_id = tasks[-1].id
+            if len(tasks) < TASK_EXPORT_PAGE_SIZE:
+                return
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="tasks.ndjson"'})
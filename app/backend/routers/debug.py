@@ -1,10 +1,14 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session
 from db.session import get_session
 from models.user import Users
 from models.task import Task
 from core.security import require_admin
-from routers.tasks import run_script
+from core.executor import QueueFull
+from core.dag import submit_run
+from core.limits import task_limits
+from core.run_queue import EXECUTION_MODE, enqueue_run
+from core.scripts import script_registry
 
 router = APIRouter()
 
@@ -13,5 +17,27 @@ def run_now(task_id: int, session: Session = Depends(get_session), user: Users =
     task=session.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    run_script(task.id, task.script_path, task.parameters or "")
-    return {"status" : "task executed manually"}
\ No newline at end of file
+    # Manual runs go through the same caps and overlap policy as scheduled ones
+    if EXECUTION_MODE == "queue":
+        if not enqueue_run(task.id, task.max_instances, task.skip_if_running):
+            raise HTTPException(status_code=409, detail="Task is at its limit of running instances")
+        return {"status" : "task queued for a worker"}
+    try:
+        future = submit_run(task.id, task.script_path, task.parameters or "", task.script_type,
+                            task.max_instances, task.skip_if_running, task_limits(task))
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    if future is None:
+        raise HTTPException(status_code=409, detail="Task is at its limit of running instances")
+    future.result()
+    return {"status" : "task executed manually"}
+
+#Time spent per startup step (imports, schema, scheduler):
+@router.get("/debug/startup")
+def startup_timings(request: Request, user: Users = Depends(require_admin)):
+    return getattr(request.app.state, "startup_timings", None)
+
+#Script registry size, hit rate and how it notices changed scripts:
+@router.get("/debug/scripts")
+def script_registry_stats(user: Users = Depends(require_admin)):
+    return script_registry.stats()
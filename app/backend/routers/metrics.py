@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import registry, METRICS_TOKEN
+from core.executor import executor
+from core.mailer import mail_queue
+from core.events import broker
+from core.run_queue import EXECUTION_MODE, queue_depth
+from db.session import get_pool_status
+from routers.tasks import leader
+
+router = APIRouter()
+
+
+def _executor_running() -> dict:
+    return {(script_type,): running for script_type, running in executor.stats()["running_by_type"].items()}
+
+def _executor_queue() -> dict:
+    return {(): executor.stats()["queue_depth"]}
+
+def _run_requests() -> dict:
+    # Only in queue mode; one GROUP BY per scrape, never per API request
+    if EXECUTION_MODE != "queue":
+        return {}
+    return {(status,): count for status, count in queue_depth().items()}
+
+def _db_pool() -> dict:
+    values = {}
+    for name, status in get_pool_status().items():
+        for state in ("size", "checkedin", "checkedout", "overflow"):
+            if state in status:
+                values[(name, state)] = status[state]
+    return values
+
+def _mail_queue() -> dict:
+    # Delivery totals are the mail_messages and smtp_connections_opened counters
+    stats = mail_queue.stats()
+    return {(state,): stats[state] for state in ("queued", "retrying")}
+
+
+registry.gauge("executor_running_runs", "Runs currently executing, per script_type.", ("script_type",), _executor_running)
+registry.gauge("executor_queue_depth", "Runs waiting in the executor queue.", (), _executor_queue)
+registry.gauge("run_requests", "Run requests in the worker queue, per status (EXECUTION_MODE=queue).", ("status",), _run_requests)
+registry.gauge("db_pool_connections", "Connection pool usage per engine.", ("engine", "state"), _db_pool)
+registry.gauge("mail_queue", "Outbound mail waiting to be sent, per state.", ("state",), _mail_queue)
+registry.gauge("sse_subscribers", "Open run event streams.", (), lambda: {(): broker.subscriber_count()})
+registry.gauge("scheduler_is_leader", "1 if this process fires scheduled jobs.", (), lambda: {(): int(leader.is_leader)})
+
+
+#Prometheus metrics:
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(authorization: str | None = Header(default=None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,121 +1,545 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
-from sqlmodel import Session, select
-from datetime import datetime, timedelta
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Response, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select, delete, or_, func
+from sqlalchemy import tuple_
+from pydantic import ValidationError
+from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.job import Job
+from apscheduler.util import datetime_to_utc_timestamp
 from apscheduler.triggers.cron import CronTrigger
-import subprocess, logging
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.events import EVENT_JOB_SUBMITTED
+import asyncio, json, logging, os, pickle
 
-from db.session import get_session, engine
-from models.task import Task
+from db.session import get_session, scheduler_engine
+from models.task import Task, TaskRun, TaskDependency, TaskFireTime, MIN_MISFIRE_GRACE_TIME
 from models.user import Users
 from core.security import get_current_user, require_viewer, require_moderator, require_power_user, require_admin
+from core.executor import executor, QueueFull
+from core.output import tail_output, drop_captures, TASK_OUTPUT_BUFFER_BYTES
+from core.dag import submit_run, downstream_edges
+from core.run_queue import EXECUTION_MODE, enqueue_run, queue_depth
+from core.pagination import encode_cursor, decode_cursor, encode_time_cursor, decode_time_cursor
+from core.timeline import rebuild_fire_times, drop_fire_times, refresh_fire_times, complete_until, as_utc, use_timezone
+from core.leader import LeaderElector
+from core.events import broker
+from core.metrics import scheduler_lag
+from core.limits import task_limits
+from core.retry import use_scheduler
+from core.scripts import script_registry
+from core.versions import task_version
+from core.etag import cached_response, store_response, json_list
 
 
 router = APIRouter()
+# Task CRUD lives on its own router so API_MODE=async can swap in routers/async_tasks.py
+crud_router = APIRouter()
 
-logging.basicConfig()
-logging.getLogger('apscheduler').setLevel(logging.DEBUG)
+logging.getLogger('apscheduler').setLevel(os.getenv("APSCHEDULER_LOG_LEVEL", "INFO"))
 logging.getLogger('passlib').setLevel(logging.ERROR)
 
 logger = logging.getLogger(__name__)
 
-scheduler = BackgroundScheduler()
-scheduler.start()
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", 15))
 
-def run_script(task_id: int, script_path: str, parameters: str, script_type: str):
+# Defaults shared by add_job and the bulk job store writes in schedule_tasks
+JOB_DEFAULTS = {"misfire_grace_time": MIN_MISFIRE_GRACE_TIME, "coalesce": True, "max_instances": 1}
+JOB_STORE_CHUNK = 1000
+
+jobstore = SQLAlchemyJobStore(engine=scheduler_engine)
+scheduler = BackgroundScheduler(jobstores={"default": jobstore}, job_defaults=JOB_DEFAULTS)
+
+def _record_scheduler_lag(event):
+    now = datetime.now(timezone.utc)
+    for scheduled_at in event.scheduled_run_times:
+        scheduler_lag.observe((now - scheduled_at).total_seconds())
+
+scheduler.add_listener(_record_scheduler_lag, EVENT_JOB_SUBMITTED)
+use_timezone(scheduler.timezone)
+
+def enqueue_script(task_id: int, script_path: str, parameters: str, script_type: str,
+                   max_instances: int = 1, skip_if_running: bool = False, limits: dict | None = None,
+                   attempt: int = 1):
+    # Scheduler jobs only hand the run to the executor (or to the worker queue
+    # with EXECUTION_MODE=queue) so a burst of cron fires never blocks the
+    # scheduler's own thread pool. The overlap policy is enforced there as the
+    # job itself returns right away.
+    if EXECUTION_MODE == "queue":
+        if not enqueue_run(task_id, max_instances, skip_if_running, attempt):
+            logger.info(f"Task {task_id} is at its limit of {max_instances} running instance(s), skipping this run")
+        return
+    try:
+        submit_run(task_id, script_path, parameters, script_type, max_instances, skip_if_running, limits, attempt)
+    except QueueFull as e:
+        logger.error(f"Task {task_id} run dropped: {e}")
+
+def retry_job_id(task_id: int) -> str:
+    return f"{task_id}:retry"
+
+def retry_task(task_id: int, attempt: int):
+    # Job of a scheduled retry. The task is read again, so edits made since
+    # the failed attempt apply and deleted tasks are not retried.
+    with Session(scheduler_engine) as session:
+        task = session.get(Task, task_id)
+    if task is None or not (task.script_path and task.script_type):
+        logger.info(f"Task {task_id} no longer exists, dropping attempt {attempt}")
+        return
+    enqueue_script(*job_args(task), attempt=attempt)
+
+def schedule_retry_job(task_id: int, attempt: int, run_at: datetime):
+    # A one-shot job in the shared job store: the backoff costs no executor
+    # thread and survives a restart or a change of scheduler leader
+    scheduler.add_job(
+        retry_task,
+        DateTrigger(run_date=run_at),
+        args=[task_id, attempt],
+        id=retry_job_id(task_id),
+        replace_existing=True,
+        misfire_grace_time=None,
+    )
+
+use_scheduler(schedule_retry_job)
+
+
+def validate_task(task: Task):
+    # A missing or broken script, schedule or job option is rejected now,
+    # before the commit, instead of failing when the job is added or fires
     try:
-        if script_type == "python":
-            command = ["python3", script_path]
-        elif script_type == "bash":
-            command = ["bash", script_path]
-        else:
-            logger.error(f"Unknown script type: {script_type}")
-            raise HTTPException(status_code=404, detail=f"Script type {script_type} not found")
-        if parameters:
-            command += parameters.split()
-        result = subprocess.run(command, check=True, capture_output=True)
-
-        success = result.returncode == 0
-
-        logger.info(f"Task {task_id} STDOUT:\n{result.stdout}")
-        if result.stderr:
-            logger.error(f"Task {task_id} STDERR:\n{result.stderr}")
-
-        with Session(engine) as session:
-            task = session.exec(select(Task).where(Task.id == task_id)).first()
-            if task:
-                task.runcount += 1
-                task.successful = success
-                session.add(task)
-                session.commit()
-                logger.info(f"Task {task_id} updated in DB with runcount {task.runcount}, successful {task.successful}")
-
-        print(f"Task {task_id} ran sucessfully.")
-    except subprocess.CalledProcessError as e:
-            logger.exception(f"Task {task_id} failed to execute: {e}")
+        # Table models are not validated when FastAPI builds them from the body
+        Task.model_validate(task.model_dump())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    try:
+        script_registry.validate(task.script_path, task.script_type)
+        if is_schedulable(task):
+            build_job(task, datetime.now(scheduler.timezone))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def is_schedulable(task: Task) -> bool:
+    return bool(task.sheduled and task.schedule_cron and task.script_path and task.script_type)
+
+def job_args(task: Task) -> list:
+    return [task.id, task.script_path, task.parameters or "", task.script_type, task.max_instances, task.skip_if_running,
+            task_limits(task)]
+
+def job_options(task: Task) -> dict:
+    return {"coalesce": task.coalesce, "misfire_grace_time": task.misfire_grace_time}
+
+def schedule_task(task: Task):
+    if not is_schedulable(task):
+        unschedule_task(task.id)
+        return
+    trigger = CronTrigger.from_crontab(task.schedule_cron, timezone=scheduler.timezone)
+    scheduler.add_job(
+        enqueue_script,
+        trigger,
+        args=job_args(task),
+        id=str(task.id),
+        replace_existing=True,
+        **job_options(task)
+    )
+    rebuild_fire_times([(task.id, task.schedule_cron)])
+
+def unschedule_task(task_id: int):
+    try:
+        scheduler.remove_job(str(task_id))
+    except JobLookupError:
+        pass
+    drop_fire_times([task_id])
+
+def build_job(task: Task, now: datetime) -> Job:
+    """
+    The scheduler job of `task`, built the way the job store will hold it.
+    Raises ValueError or TypeError for a bad schedule or job option, so
+    callers can reject a task before anything is written.
+    """
+    trigger = CronTrigger.from_crontab(task.schedule_cron, timezone=scheduler.timezone)
+    return Job(
+        scheduler,
+        id=str(task.id),
+        func=enqueue_script,
+        trigger=trigger,
+        executor="default",
+        args=tuple(job_args(task)),
+        kwargs={},
+        name=enqueue_script.__name__,
+        next_run_time=trigger.get_next_fire_time(None, now),
+        **(JOB_DEFAULTS | job_options(task)),
+    )
+
+def _job_row(task: Task, now: datetime) -> dict:
+    job = build_job(task, now)
+    return {
+        "id": job.id,
+        "next_run_time": datetime_to_utc_timestamp(job.next_run_time),
+        "job_state": pickle.dumps(job.__getstate__(), jobstore.pickle_protocol),
+    }
+
+def schedule_tasks(tasks: list[Task]):
+    """
+    Bulk version of schedule_task. add_job commits every job on its own, here
+    the jobs of all `tasks` are replaced with one DELETE and one multi-row
+    INSERT per chunk in a single job store transaction.
+    """
+    now = datetime.now(scheduler.timezone)
+    rows, scheduled = [], {}
+    for task in tasks:
+        if not is_schedulable(task):
+            continue
+        try:
+            rows.append(_job_row(task, now))
+        except (ValueError, TypeError) as e:
+            logger.error(f"Task {task.id} has an invalid schedule {task.schedule_cron!r}, not scheduling it: {e}")
+            continue
+        scheduled[task.id] = task.schedule_cron
+    jobs_table = jobstore.jobs_t
+    with scheduler_engine.begin() as connection:
+        for start in range(0, len(tasks), JOB_STORE_CHUNK):
+            ids = [str(task.id) for task in tasks[start:start + JOB_STORE_CHUNK]]
+            connection.execute(jobs_table.delete().where(jobs_table.c.id.in_(ids)))
+        for start in range(0, len(rows), JOB_STORE_CHUNK):
+            connection.execute(jobs_table.insert(), rows[start:start + JOB_STORE_CHUNK])
+    scheduler.wakeup()
+    rebuild_fire_times(list(scheduled.items()))
+    drop_fire_times([task.id for task in tasks if task.id not in scheduled])
+
+def unschedule_tasks(task_ids: list[int]):
+    jobs_table = jobstore.jobs_t
+    with scheduler_engine.begin() as connection:
+        for start in range(0, len(task_ids), JOB_STORE_CHUNK):
+            ids = [str(task_id) for task_id in task_ids[start:start + JOB_STORE_CHUNK]]
+            connection.execute(jobs_table.delete().where(jobs_table.c.id.in_(ids)))
+    drop_fire_times([int(task_id) for task_id in task_ids if str(task_id).isdigit()])
+
+def sync_scheduled_tasks():
+    """
+    Reconciles the persistent job store with the Task table after a restart.
+
+    Loads all jobs and all scheduled tasks with one query each and only writes
+    jobs that are missing, changed or orphaned, so a restart with thousands of
+    unchanged tasks does no per-row work against the database.
+    """
+    jobs = {job.id: job for job in scheduler.get_jobs()}
+    with Session(scheduler_engine) as session:
+        tasks = session.exec(select(Task).where(Task.sheduled == True)).all()
+
+    changed = []
+    wanted = set()
+    for task in tasks:
+        if not is_schedulable(task):
+            continue
+        try:
+            trigger = CronTrigger.from_crontab(task.schedule_cron, timezone=scheduler.timezone)
+        except ValueError as e:
+            # One bad row must not keep every other task from being scheduled
+            logger.error(f"Task {task.id} has an invalid schedule {task.schedule_cron!r}, leaving it unscheduled: {e}")
+            continue
+        job_id = str(task.id)
+        wanted.add(job_id)
+        job = jobs.get(job_id)
+        if (job is None or list(job.args) != job_args(task) or str(job.trigger) != str(trigger)
+                or job.coalesce != task.coalesce or job.misfire_grace_time != task.misfire_grace_time):
+            changed.append(task)
+    # Pending retries are one-shot jobs that remove themselves
+    orphaned = [job_id for job_id in jobs.keys() - wanted if not job_id.endswith(":retry")]
+
+    schedule_tasks(changed)
+    unschedule_tasks(orphaned)
+    refresh_fire_times()
+
+    logger.info(f"Scheduler rehydrated: {len(wanted)} scheduled tasks, {len(changed)} jobs (re)registered, {len(orphaned)} orphaned jobs removed")
 
+def _on_elected():
+    sync_scheduled_tasks()
+    scheduler.resume()
+
+def _on_demoted():
+    scheduler.pause()
+
+# Every process keeps a paused scheduler so add_job/remove_job still reach the
+# shared job store; only the elected leader resumes it and fires jobs. The
+# leader wakes up to pick up jobs other processes added at least once per
+# smallest misfire grace time, so such a job can never misfire while waiting.
+leader = LeaderElector(scheduler_engine, on_elected=_on_elected, on_demoted=_on_demoted, on_tick=scheduler.wakeup,
+                       tick_interval=MIN_MISFIRE_GRACE_TIME)
+
+def start_scheduler():
+    scheduler.start(paused=True)
+    leader.start()
+
+def stop_scheduler():
+    leader.stop()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+
+def task_list_query(limit: int, cursor: str | None = None, scheduled: bool | None = None, script_type: str | None = None,
+                    successful: bool | None = None, name_prefix: str | None = None):
+    # Keyset pagination on Task.id: the next page continues after the last
+    # id of this one, so deep pages cost the same as the first page.
+    query = select(Task)
+    if cursor:
+        query = query.where(Task.id > decode_cursor(cursor))
+    if scheduled is not None:
+        query = query.where(Task.sheduled == scheduled)
+    if script_type is not None:
+        query = query.where(Task.script_type == script_type)
+    if successful is not None:
+        query = query.where(Task.successful == successful)
+    if name_prefix:
+        query = query.where(Task.taskname.startswith(name_prefix, autoescape=True))
+    return query.order_by(Task.id).limit(limit)
 
 #Creating a Task:
-@router.post("/tasks", response_model=Task)
+@crud_router.post("/tasks", response_model=Task)
 def create_task(task:Task, session: Session = Depends(get_session), user: Users = Depends(require_power_user)):
+    validate_task(task)
     session.add(task)
     session.commit()
     session.refresh(task)
+    task_version.bump()
 
-    if task.sheduled and task.schedule_cron and task.script_path and task.script_type:
-        trigger = CronTrigger.from_crontab(task.schedule_cron)
-        scheduler.add_job(
-            run_script,
-            trigger,
-            args=[task.id, task.script_path, task.parameters or "", task.script_type],
-            id=str(task.id),
-            replace_existing=True
-        )
+    schedule_task(task)
 
     return task
 
-#Get Tasks
-@router.get("/tasks", response_model=list[Task])
-def get_tasks(user: Users = Depends(require_viewer), skip: int = 0, limit: int = 10, session: Session = Depends(get_session)):
-    query = select(Task).offset(skip).limit(limit)
+#Get Tasks (ETag / If-None-Match, pages are cached per task table version)
+@crud_router.get("/tasks", response_model=list[Task])
+def get_tasks(
+    request: Request,
+    user: Users = Depends(require_viewer),
+    limit: int = Query(default=10, gt=0, le=100),
+    cursor: str | None = None,
+    scheduled: bool | None = None,
+    script_type: str | None = None,
+    successful: bool | None = None,
+    name_prefix: str | None = None,
+    session: Session = Depends(get_session)
+):
+    version = task_version.current()
+    key = ("tasks", limit, cursor, scheduled, script_type, successful, name_prefix)
+    response = cached_response(request, version, key)
+    if response is not None:
+        return response
+    query = task_list_query(limit, cursor, scheduled, script_type, successful, name_prefix)
     tasks = session.exec(query).all()
-    return tasks
+    headers = {"X-Next-Cursor": encode_cursor(tasks[-1].id)} if len(tasks) == limit else {}
+    return store_response(version, key, json_list(tasks), headers)
 
 #Get Task by ID:
-@router.get("/tasks/{task_id}", response_model=Task)
-def get_task_by_id(task_id: int, session: Session = Depends(get_session), user: Users = Depends(require_viewer)):
+@crud_router.get("/tasks/{task_id}", response_model=Task)
+def get_task_by_id(task_id: int, request: Request, session: Session = Depends(get_session), user: Users = Depends(require_viewer)):
+    version = task_version.current()
+    response = cached_response(request, version, ("task", task_id))
+    if response is not None:
+        return response
     task = session.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not f0und")
-    return task
+    return store_response(version, ("task", task_id), task.model_dump_json().encode())
+
+#Stream run events (Server-Sent Events):
+@router.get("/tasks/events")
+async def stream_task_events(request: Request, task_id: int | None = None, user: Users = Depends(require_viewer)):
+    subscription = broker.subscribe(task_id)
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+#Resource usage per Task over the recent runs, heaviest first:
+@router.get("/tasks/usage")
+def get_task_usage(
+    hours: int = Query(default=24, gt=0, le=24 * 31),
+    order_by: str = Query(default="cpu", pattern="^(cpu|duration)$"),
+    limit: int = Query(default=20, gt=0, le=200),
+    session: Session = Depends(get_session),
+    user: Users = Depends(require_viewer),
+):
+    cpu = func.sum(TaskRun.cpu_user_seconds + TaskRun.cpu_system_seconds)
+    max_rss = func.max(TaskRun.max_rss_kb)
+    duration = func.sum(TaskRun.duration)
+    rows = session.exec(
+        select(TaskRun.task_id, func.count(), cpu, max_rss, duration, func.count(TaskRun.killed_reason))
+        .where(TaskRun.started_at >= datetime.now(timezone.utc) - timedelta(hours=hours))
+        .group_by(TaskRun.task_id)
+        .order_by({"cpu": cpu, "duration": duration}[order_by].desc().nulls_last())
+        .limit(limit)
+    ).all()
+    return [
+        {"task_id": task_id, "runs": runs, "cpu_seconds": cpu_seconds, "max_rss_kb": rss_kb,
+         "duration_seconds": seconds, "killed": killed}
+        for task_id, runs, cpu_seconds, rss_kb, seconds, killed in rows
+    ]
+
+def timeline_range(start: datetime | None, end: datetime | None) -> tuple[datetime, datetime]:
+    start = as_utc(start) if start else datetime.now(timezone.utc)
+    end = as_utc(end) if end else start + timedelta(hours=1)
+    if end <= start:
+        raise HTTPException(status_code=422, detail="end must be after start")
+    return start, end
+
+#Upcoming runs of all scheduled Tasks between start and end (default: the next hour):
+@router.get("/tasks/timeline")
+def get_timeline(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = Query(default=100, gt=0, le=1000),
+    cursor: str | None = None,
+    session: Session = Depends(get_session),
+    user: Users = Depends(require_viewer),
+):
+    start, end = timeline_range(start, end)
+    query = (
+        select(TaskFireTime.fire_at, TaskFireTime.task_id, Task.taskname)
+        .join(Task, Task.id == TaskFireTime.task_id)
+        .where(TaskFireTime.fire_at >= start, TaskFireTime.fire_at < end)
+    )
+    if cursor:
+        # Keyset on the (fire_at, task_id) index, like the task list
+        query = query.where(tuple_(TaskFireTime.fire_at, TaskFireTime.task_id) > decode_time_cursor(cursor))
+    rows = session.exec(query.order_by(TaskFireTime.fire_at, TaskFireTime.task_id).limit(limit)).all()
+    return {
+        "fires": [{"fire_at": fire_at, "task_id": task_id, "taskname": taskname} for fire_at, task_id, taskname in rows],
+        "next_cursor": encode_time_cursor(rows[-1][0], rows[-1][1]) if len(rows) == limit else None,
+        "complete_until": complete_until(),
+    }
+
+#Minutes in which the most scheduled runs fire (default: the next hour):
+@router.get("/tasks/timeline/hotspots")
+def get_timeline_hotspots(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    top: int = Query(default=10, gt=0, le=100),
+    session: Session = Depends(get_session),
+    user: Users = Depends(require_viewer),
+):
+    start, end = timeline_range(start, end)
+    in_range = (TaskFireTime.fire_at >= start, TaskFireTime.fire_at < end)
+    fires = func.count()
+    # Cron fire times are whole minutes, so grouping by fire_at groups by minute
+    rows = session.exec(
+        select(TaskFireTime.fire_at, fires).where(*in_range).group_by(TaskFireTime.fire_at).order_by(fires.desc(), TaskFireTime.fire_at).limit(top)
+    ).all()
+    total = session.exec(select(func.count()).select_from(TaskFireTime).where(*in_range)).one()
+    return {
+        "start": start,
+        "end": end,
+        "fires": total,
+        "average_per_minute": total / ((end - start).total_seconds() / 60),
+        "hotspots": [{"minute": minute, "fires": count} for minute, count in rows],
+        "complete_until": complete_until(),
+    }
+
+#Tail the output of the latest run:
+@router.get("/tasks/{task_id}/output")
+def get_task_output(task_id: int, tail: int = Query(default=4096, gt=0, le=TASK_OUTPUT_BUFFER_BYTES), user: Users = Depends(require_viewer)):
+    output = tail_output(task_id, tail)
+    if output is None:
+        raise HTTPException(status_code=404, detail="No output recorded for this task")
+    return output
+
+#Run history of a Task:
+@router.get("/tasks/{task_id}/runs", response_model=list[TaskRun])
+def get_task_runs(task_id: int, limit: int = Query(default=20, gt=0, le=200), before: int | None = None, session: Session = Depends(get_session), user: Users = Depends(require_viewer)):
+    query = select(TaskRun).where(TaskRun.task_id == task_id)
+    if before is not None:
+        query = query.where(TaskRun.id < before)
+    return session.exec(query.order_by(TaskRun.id.desc()).limit(limit)).all()
+
+def dependencies_of(session: Session, task_id: int) -> dict:
+    depends_on = session.exec(select(TaskDependency.depends_on_id).where(TaskDependency.task_id == task_id)).all()
+    dependents = session.exec(select(TaskDependency.task_id).where(TaskDependency.depends_on_id == task_id)).all()
+    return {"task_id": task_id, "depends_on": sorted(depends_on), "dependents": sorted(dependents)}
+
+#Dependencies of a Task:
+@router.get("/tasks/{task_id}/dependencies")
+def get_task_dependencies(task_id: int, session: Session = Depends(get_session), user: Users = Depends(require_viewer)):
+    if not session.get(Task, task_id):
+        raise HTTPException(status_code=404, detail="Task not f0und")
+    return dependencies_of(session, task_id)
+
+#Set the upstream Tasks of a Task (replaces the existing ones):
+@router.put("/tasks/{task_id}/dependencies")
+def set_task_dependencies(task_id: int, depends_on: list[int], session: Session = Depends(get_session), user: Users = Depends(require_power_user)):
+    if not session.get(Task, task_id):
+        raise HTTPException(status_code=404, detail="Task not f0und")
+    depends_on = set(depends_on)
+    if task_id in depends_on:
+        raise HTTPException(status_code=422, detail="A task can not depend on itself")
+    existing = set(session.exec(select(Task.id).where(Task.id.in_(depends_on))).all())
+    if existing != depends_on:
+        raise HTTPException(status_code=404, detail={"message": "Task not f0und", "ids": sorted(depends_on - existing)})
+    # A new parent that is already downstream of this task would close a cycle
+    cycle = depends_on & {child for child, _ in downstream_edges(session, task_id)}
+    if cycle:
+        raise HTTPException(status_code=422, detail={"message": "Dependency would create a cycle", "ids": sorted(cycle)})
+
+    session.exec(delete(TaskDependency).where(TaskDependency.task_id == task_id))
+    session.add_all([TaskDependency(task_id=task_id, depends_on_id=parent) for parent in depends_on])
+    session.commit()
+    return dependencies_of(session, task_id)
 
 #Update Task:
-@router.put("/tasks/{task_id}", response_model=Task)
+@crud_router.put("/tasks/{task_id}", response_model=Task)
 def update_task(task_id: int, task_data: Task, session: Session = Depends(get_session), user: Users = Depends(get_current_user)):
     #Get the task
     task = session.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not f0und")
+    validate_task(task_data)
     #Update task
-    for field, value in task_data.model_dump().items():
+    for field, value in task_data.model_dump(exclude={"id"}).items():
         setattr(task, field, value)
 
     session.commit()
     session.refresh(task)
+    task_version.bump()
+
+    schedule_task(task)
     return task
 
 #Delete Task
-@router.delete("/tasks/{task_id}")
+@crud_router.delete("/tasks/{task_id}")
 def delete_task(task_id: int, session: Session = Depends(get_session), user: Users = Depends(require_power_user)):
     task = session.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not f0und")
     
     session.delete(task)
+    session.exec(delete(TaskRun).where(TaskRun.task_id == task_id))
+    session.exec(delete(TaskDependency).where(or_(TaskDependency.task_id == task_id, TaskDependency.depends_on_id == task_id)))
     session.commit()
+    task_version.bump()
+
+    unschedule_task(task_id)
+    drop_captures([task_id])
     return task
 
 @router.get("/debug/jobs")
 def list_jobs(user: Users = Depends(require_admin)):
-    return [str(job) for job in scheduler.get_jobs()]
\ No newline at end of file
+    return [str(job) for job in scheduler.get_jobs()]
+
+@router.get("/debug/leader")
+def leader_status(user: Users = Depends(require_admin)):
+    return {"pid": os.getpid(), "is_leader": leader.is_leader}
+
+@router.get("/debug/executor")
+def executor_stats(user: Users = Depends(require_admin)):
+    if EXECUTION_MODE == "queue":
+        return {"mode": "queue", "run_requests": queue_depth()}
+    return executor.stats()
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Starts several local processes that compete for scheduler leadership against
+one Postgres database, checks that there is exactly one leader at a time,
+kills the leader and checks that another process takes over.
+
+    DATABASE_URL=postgresql://... python scripts/leader_election_check.py --processes 4
+"""
+
+import os, sys, time, argparse, multiprocessing
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.insert(0, backend_dir)
+
+
+def contender(database_url: str, interval: float, leaders):
+    from sqlalchemy import create_engine
+    from core.leader import LeaderElector
+
+    pid = os.getpid()
+    engine = create_engine(database_url)
+    elector = LeaderElector(
+        engine,
+        on_elected=lambda: leaders.__setitem__(pid, True),
+        on_demoted=lambda: leaders.__setitem__(pid, False),
+        interval=interval,
+    )
+    leaders[pid] = False
+    elector.start()
+    while True:
+        time.sleep(1)
+
+
+def current_leaders(leaders, processes) -> list[int]:
+    alive = {process.pid for process in processes if process.is_alive()}
+    return [pid for pid, is_leader in leaders.items() if is_leader and pid in alive]
+
+
+def wait_for_single_leader(leaders, processes, timeout: float) -> int:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        elected = current_leaders(leaders, processes)
+        if len(elected) > 1:
+            raise SystemExit(f"FAIL: several leaders at once: {elected}")
+        if elected:
+            return elected[0]
+        time.sleep(0.1)
+    raise SystemExit("FAIL: no leader elected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    database_url = os.environ["DATABASE_URL"]
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        leaders = manager.dict()
+        processes = [context.Process(target=contender, args=(database_url, args.interval, leaders), daemon=True)
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+
+        try:
+            for round_number in range(args.processes - 1):
+                leader = wait_for_single_leader(leaders, processes, timeout=args.interval * 10)
+                print(f"Round {round_number + 1}: process {leader} is leader")
+                time.sleep(args.interval * 4)
+                if current_leaders(leaders, processes) != [leader]:
+                    raise SystemExit("FAIL: leadership changed without failure")
+                killed = next(process for process in processes if process.pid == leader)
+                killed.kill()
+                killed.join()
+            print("OK: exactly one leader at a time, failover works")
+        finally:
+            for process in processes:
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
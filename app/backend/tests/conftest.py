@@ -0,0 +1,88 @@
+import os, sys, tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The modules read their configuration at import time, so the test database
+# has to be in place before anything from the app is imported
+_database = tempfile.NamedTemporaryFile(prefix="scheduler-tests-", suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_database.name}"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("SECRET_KEY_TOKEN", "test-token-secret")
+_logs = tempfile.mkdtemp(prefix="scheduler-tests-logs-")
+os.environ.setdefault("TASK_LOG_DIR", os.path.join(_logs, "runs"))
+os.environ.setdefault("SCRIPT_CACHE_DIR", os.path.join(_logs, "script-cache"))
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from db.session import engine
+    from db.schema import migrate
+    migrate(engine)
+    return engine
+
+
+@pytest.fixture
+def session(engine):
+    from sqlmodel import Session
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client, engine):
+    from sqlmodel import Session, select
+    from models.user import Users, UserRole
+    from core.security import hash_password
+    with Session(engine) as session:
+        if not session.exec(select(Users).where(Users.username == "admin")).first():
+            session.add(Users(username="admin", email="admin@example.com", hashed_password=hash_password("admin"),
+                              is_active=True, is_admin=True, role=UserRole.admin))
+            session.commit()
+    token = client.post("/login", data={"username": "admin", "password": "admin"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def make_script(tmp_path):
+    def make_script(body: str = "echo hello\n", name: str = "job.sh") -> str:
+        path = tmp_path / name
+        path.write_text(body)
+        return str(path)
+
+    return make_script
+
+
+@pytest.fixture
+def script(make_script):
+    return make_script()
+
+
+@pytest.fixture
+def make_task(client, admin_headers):
+    created = []
+
+    def make_task(**fields):
+        body = {"taskname": "test task", "sheduled": False, "runcount": 0, "successful": False,
+                "script_type": "bash", **fields}
+        response = client.post("/tasks", json=body, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        created.append(response.json()["id"])
+        return response.json()
+
+    yield make_task
+    # Runs still queued in the run writer would land on a later task that reuses the id
+    from core.runs import run_writer
+    run_writer.stop()
+    for task_id in created:
+        client.delete(f"/tasks/{task_id}", headers=admin_headers)
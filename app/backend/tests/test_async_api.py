@@ -0,0 +1,40 @@
+import asyncio, threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+pytest.importorskip("aiosqlite")
+
+from core.blocking import run_blocking
+from routers import async_tasks
+
+
+@pytest.fixture
+def async_client(client):
+    # The shared client starts the scheduler; the async routers get an app of their own
+    app = FastAPI()
+    app.include_router(async_tasks.router)
+    with TestClient(app) as async_client:
+        yield async_client
+
+
+def test_run_blocking_uses_the_dedicated_pool():
+    name = asyncio.run(run_blocking(lambda: threading.current_thread().name))
+    assert name.startswith("async-blocking")
+
+
+def test_scheduling_is_awaited_on_the_blocking_pool(async_client, admin_headers, monkeypatch):
+    threads = []
+    schedule_task = async_tasks.schedule_task
+
+    def recording_schedule_task(task):
+        threads.append(threading.current_thread().name)
+        schedule_task(task)
+
+    monkeypatch.setattr(async_tasks, "schedule_task", recording_schedule_task)
+    body = {"taskname": "async", "sheduled": False, "runcount": 0, "successful": False, "script_type": "bash"}
+    response = async_client.post("/tasks", json=body, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert threads and threads[0].startswith("async-blocking")
+    assert async_client.delete(f"/tasks/{response.json()['id']}", headers=admin_headers).status_code == 200
@@ -0,0 +1,49 @@
+import pytest
+from sqlmodel import select, func
+
+from models.task import Task
+
+
+def task_count(session) -> int:
+    return session.exec(select(func.count()).select_from(Task)).one()
+
+
+def item(script: str, **fields) -> dict:
+    return {"taskname": "batch", "sheduled": True, "schedule_cron": "*/10 * * * *", "runcount": 0, "successful": False,
+            "script_path": script, "script_type": "bash", **fields}
+
+
+def test_batch_create_and_delete(client, admin_headers, session, script):
+    response = client.post("/tasks/batch", json=[item(script), item(script, sheduled=False)], headers=admin_headers)
+    assert response.status_code == 200, response.text
+    ids = response.json()["ids"]
+    assert len(ids) == 2
+    jobs = client.get("/debug/jobs", headers=admin_headers).json()
+    assert any(job.startswith("enqueue_script") for job in jobs)
+    response = client.post("/tasks/batch/delete", json=ids, headers=admin_headers)
+    assert response.json()["deleted"] == 2
+
+
+@pytest.mark.parametrize("bad", [
+    {"schedule_cron": "61 * * * *"},
+    {"misfire_grace_time": 0},
+    {"script_path": "/does/not/exist.sh"},
+    {"script_type": "perl"},
+])
+def test_batch_with_one_invalid_item_is_rejected_completely(client, admin_headers, session, script, bad):
+    before = task_count(session)
+    response = client.post("/tasks/batch", json=[item(script), item(script, **bad), item(script)], headers=admin_headers)
+    assert response.status_code == 422, response.text
+    assert [error["index"] for error in response.json()["detail"]] == [1]
+    assert task_count(session) == before
+
+
+def test_batch_update_with_one_invalid_item_changes_nothing(client, admin_headers, session, script):
+    ids = client.post("/tasks/batch", json=[item(script), item(script)], headers=admin_headers).json()["ids"]
+    try:
+        items = [item(script, id=ids[0], taskname="renamed"), item(script, id=ids[1], schedule_cron="not a cron")]
+        assert client.put("/tasks/batch", json=items, headers=admin_headers).status_code == 422
+        session.expire_all()
+        assert session.get(Task, ids[0]).taskname == "batch"
+    finally:
+        client.post("/tasks/batch/delete", json=ids, headers=admin_headers)
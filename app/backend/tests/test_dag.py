@@ -0,0 +1,58 @@
+import pytest
+
+from core.dag import start_downstream, has_cycle
+
+
+@pytest.fixture
+def scripts(make_script):
+    return {"ok": make_script("exit 0\n", "ok.sh"), "fail": make_script("exit 1\n", "fail.sh")}
+
+
+def depend(client, admin_headers, task: dict, *parents: dict):
+    response = client.put(f"/tasks/{task['id']}/dependencies", json=[parent["id"] for parent in parents],
+                          headers=admin_headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_has_cycle():
+    assert not has_cycle({1, 2, 3}, [(2, 1), (3, 2), (3, 1)])
+    assert has_cycle({1, 2, 3}, [(2, 1), (3, 2), (2, 3)])
+
+
+def test_failed_node_skips_everything_below_it(client, admin_headers, make_task, scripts):
+    root = make_task(script_path=scripts["ok"])
+    good = make_task(script_path=scripts["ok"])
+    bad = make_task(script_path=scripts["fail"])
+    joined = make_task(script_path=scripts["ok"])
+    after_good = make_task(script_path=scripts["ok"])
+    below_joined = make_task(script_path=scripts["ok"])
+    depend(client, admin_headers, good, root)
+    depend(client, admin_headers, bad, root)
+    depend(client, admin_headers, joined, good, bad)
+    depend(client, admin_headers, after_good, good)
+    depend(client, admin_headers, below_joined, joined)
+
+    status = start_downstream(root["id"]).result(timeout=30)
+    assert status == {
+        good["id"]: "succeeded",
+        bad["id"]: "failed",
+        joined["id"]: "skipped",
+        after_good["id"]: "succeeded",
+        below_joined["id"]: "skipped",
+    }
+
+
+def test_nothing_downstream(make_task, scripts):
+    assert start_downstream(make_task(script_path=scripts["ok"])["id"]) is None
+
+
+def test_cycles_are_rejected(client, admin_headers, make_task, scripts):
+    first = make_task(script_path=scripts["ok"])
+    second = make_task(script_path=scripts["ok"])
+    depend(client, admin_headers, second, first)
+    response = client.put(f"/tasks/{first['id']}/dependencies", json=[second["id"]], headers=admin_headers)
+    assert response.status_code == 422
+    assert response.json()["detail"]["ids"] == [second["id"]]
+    response = client.put(f"/tasks/{first['id']}/dependencies", json=[first["id"]], headers=admin_headers)
+    assert response.status_code == 422
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import delete
+
+from core import dag
+from core.executor import TaskExecutor, executor
+from core.run_queue import run_requests
+from db.session import scheduler_engine
+from routers import debug
+
+
+@pytest.fixture
+def blocking_script(tmp_path):
+    # Runs until the flag file exists
+    flag = tmp_path / "release"
+    script = tmp_path / "block.sh"
+    script.write_text(f"while [ ! -f {flag} ]; do sleep 0.02; done\n")
+    yield str(script)
+    flag.touch()
+
+
+def test_manual_run_goes_through_the_executor(client, admin_headers, make_task, script):
+    task = make_task(script_path=script)
+    submitted = executor.stats()["submitted"]
+    response = client.post(f"/debug/run-task/{task['id']}", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert executor.stats()["submitted"] == submitted + 1
+
+
+def test_manual_run_respects_the_overlap_policy(client, admin_headers, make_task, blocking_script, tmp_path):
+    task = make_task(script_path=blocking_script, skip_if_running=True)
+    running = dag.submit_run(task["id"], blocking_script, "", "bash", 1, True)
+    response = client.post(f"/debug/run-task/{task['id']}", headers=admin_headers)
+    assert response.status_code == 409
+    (tmp_path / "release").touch()
+    assert running.result(timeout=10).successful
+
+
+def test_manual_run_is_rejected_when_the_queue_is_full(client, admin_headers, make_task, script, monkeypatch):
+    full = TaskExecutor(max_workers=1, type_limits={}, max_queue=0, mode="thread")
+    monkeypatch.setattr(dag, "executor", full)
+    task = make_task(script_path=script)
+    response = client.post(f"/debug/run-task/{task['id']}", headers=admin_headers)
+    assert response.status_code == 429
+
+
+def test_queued_manual_run_respects_the_overlap_policy(client, admin_headers, make_task, script, monkeypatch):
+    monkeypatch.setattr(debug, "EXECUTION_MODE", "queue")
+    task = make_task(script_path=script, skip_if_running=True)
+    try:
+        assert client.post(f"/debug/run-task/{task['id']}", headers=admin_headers).status_code == 200
+        assert client.post(f"/debug/run-task/{task['id']}", headers=admin_headers).status_code == 409
+    finally:
+        with scheduler_engine.begin() as connection:
+            connection.execute(delete(run_requests).where(run_requests.c.task_id == task["id"]))
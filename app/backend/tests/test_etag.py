@@ -0,0 +1,23 @@
+def test_unchanged_task_is_not_sent_again(client, admin_headers, make_task, script):
+    task = make_task(script_path=script)
+    first = client.get(f"/tasks/{task['id']}", headers=admin_headers)
+    etag = first.headers["ETag"]
+    again = client.get(f"/tasks/{task['id']}", headers=admin_headers | {"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["ETag"] == etag
+
+    response = client.put(f"/tasks/{task['id']}", json=first.json() | {"taskname": "renamed"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    changed = client.get(f"/tasks/{task['id']}", headers=admin_headers | {"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["taskname"] == "renamed"
+    assert changed.headers["ETag"] != etag
+
+
+def test_task_list_etag_changes_after_a_write(client, admin_headers, make_task):
+    params = {"name_prefix": "etag-list"}
+    etag = client.get("/tasks", params=params, headers=admin_headers).headers["ETag"]
+    assert client.get("/tasks", params=params, headers=admin_headers | {"If-None-Match": etag}).status_code == 304
+    task = make_task(taskname="etag-list")
+    changed = client.get("/tasks", params=params, headers=admin_headers | {"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert [item["id"] for item in changed.json()] == [task["id"]]
@@ -0,0 +1,59 @@
+import asyncio, json
+
+from core.events import EventBroker, broker
+from routers import tasks
+
+
+def test_subscribers_get_their_events_and_drop_the_oldest():
+    async def scenario():
+        events = EventBroker(queue_size=2)
+        one, every = events.subscribe(1), events.subscribe()
+        for n in range(3):
+            events.publish({"type": "output", "task_id": 1, "n": n})
+        events.publish({"type": "output", "task_id": 2, "n": 3})
+        await asyncio.sleep(0)
+        received = lambda subscription: [subscription.queue.get_nowait()["n"] for _ in range(subscription.queue.qsize())]
+        assert received(one) == [1, 2] and one.dropped == 1
+        assert received(every) == [2, 3] and every.dropped == 2
+        events.unsubscribe(one)
+        events.unsubscribe(every)
+        assert events.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+class Connection:
+    """The part of a Request the SSE endpoint uses."""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+def test_event_published_after_connecting_is_streamed(monkeypatch):
+    # The test client buffers whole responses, so the endless stream is read directly
+    monkeypatch.setattr(tasks, "SSE_KEEPALIVE_SECONDS", 0.05)
+
+    async def scenario():
+        connection = Connection()
+        response = await tasks.stream_task_events(connection, task_id=900600, user=None)
+        assert response.media_type == "text/event-stream"
+        stream = response.body_iterator
+        assert await asyncio.wait_for(anext(stream), 5) == ": keep-alive\n\n"
+        broker.publish({"type": "run_started", "task_id": 900601})
+        broker.publish({"type": "run_finished", "task_id": 900600, "exit_code": 0})
+        message = await asyncio.wait_for(anext(stream), 5)
+        while message.startswith(":"):
+            message = await asyncio.wait_for(anext(stream), 5)
+        event, data = message.strip().split("\n")
+        assert event == "event: run_finished"
+        assert json.loads(data.removeprefix("data: ")) == {"type": "run_finished", "task_id": 900600, "exit_code": 0}
+        # The subscription ends with the connection
+        connection.disconnected = True
+        async for _ in stream:
+            pass
+        assert broker.subscriber_count() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,104 @@
+import os, threading, time
+
+import pytest
+
+from core.executor import TaskExecutor, QueueFull
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.01)
+
+
+def test_caps_concurrency_per_type():
+    executor = TaskExecutor(max_workers=4, type_limits={"bash": 1}, max_queue=10, mode="thread")
+    release = threading.Event()
+    futures = [executor.submit("bash", release.wait, 5) for _ in range(3)]
+    futures.append(executor.submit("python", lambda: "done"))
+    assert futures[-1].result(timeout=5) == "done"
+    stats = executor.stats()
+    assert stats["running_by_type"]["bash"] == 1
+    assert stats["queue_depth"] == 2
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert executor.stats()["completed"] == 4
+    executor.shutdown()
+
+
+def test_rejects_when_queue_is_full():
+    executor = TaskExecutor(max_workers=1, type_limits={}, max_queue=1, mode="thread")
+    release = threading.Event()
+    running = executor.submit("bash", release.wait, 5)
+    waiting = executor.submit("bash", release.wait, 5)
+    with pytest.raises(QueueFull):
+        executor.submit("bash", release.wait, 5)
+    assert executor.stats()["rejected"] == 1
+    release.set()
+    running.result(timeout=5)
+    waiting.result(timeout=5)
+    executor.shutdown()
+
+
+def test_submit_run_skips_and_folds_runs_of_a_busy_task():
+    executor = TaskExecutor(max_workers=4, type_limits={}, max_queue=10, mode="thread")
+    release = threading.Event()
+    first = executor.submit_run(1, 1, False, "bash", release.wait, 5)
+    queued = executor.submit_run(1, 1, False, "bash", release.wait, 5)
+    folded = executor.submit_run(1, 1, False, "bash", release.wait, 5)
+    assert first is not None and queued is not None
+    assert folded is None
+    assert executor.submit_run(2, 1, True, "bash", lambda: True) is not None
+    executor.submit_run(3, 1, True, "bash", release.wait, 5)
+    assert executor.submit_run(3, 1, True, "bash", release.wait, 5) is None
+    release.set()
+    queued.result(timeout=5)
+    assert executor.stats()["skipped"] == 2
+    executor.shutdown()
+
+
+def test_failed_run_is_counted_and_propagated():
+    executor = TaskExecutor(max_workers=1, type_limits={}, max_queue=10, mode="thread")
+    future = executor.submit("bash", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result(timeout=5)
+    wait_until(lambda: executor.stats()["failed"] == 1)
+    assert executor.stats()["running"] == 0
+    executor.shutdown()
+
+
+def test_pool_is_created_once_under_concurrent_submits():
+    executor = TaskExecutor(max_workers=8, type_limits={}, max_queue=100, mode="thread")
+    created = []
+    original = executor._get_pool.__func__
+
+    def counting_get_pool(self):
+        pool = original(self)
+        created.append(id(pool))
+        return pool
+
+    executor._get_pool = counting_get_pool.__get__(executor)
+    start = threading.Barrier(8)
+
+    def submit():
+        start.wait()
+        executor.submit("bash", time.sleep, 0.01).result(timeout=5)
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(created)) == 1
+    executor.shutdown()
+
+
+def test_process_mode_runs_in_a_fresh_interpreter():
+    executor = TaskExecutor(max_workers=1, type_limits={}, max_queue=10, mode="process")
+    try:
+        assert executor.submit("python", os.getpid).result(timeout=60) != os.getpid()
+        assert executor._pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        executor.shutdown()
@@ -0,0 +1,79 @@
+import os, signal, subprocess, sys, time
+
+import pytest
+
+from core.limits import effective_limits, limited_command, Watchdog
+from core import runner
+from core.runner import run_script
+
+
+def limits(**values) -> dict:
+    return effective_limits(values)
+
+
+def run(command: list[str], **values) -> subprocess.CompletedProcess:
+    return subprocess.run(limited_command(command, limits(**values)), capture_output=True, text=True, timeout=30)
+
+
+def test_no_wrapper_without_limits():
+    assert limited_command(["bash", "job.sh"], limits()) == ["bash", "job.sh"]
+
+
+def test_wrapper_applies_rlimits_and_nice():
+    result = run(["bash", "-c", "ulimit -t; ulimit -v; nice"], max_cpu_seconds=7, max_memory_mb=512, nice=3)
+    assert result.returncode == 0, result.stderr
+    cpu, memory, nice = result.stdout.split()
+    assert cpu == "7"
+    assert int(memory) == 512 * 1024
+    assert int(nice) == os.nice(0) + 3
+
+
+def test_wrapper_reports_a_missing_command():
+    result = run(["/does/not/exist"], nice=1)
+    assert result.returncode == 127
+    assert "Could not execute" in result.stderr
+
+
+def test_memory_limit_stops_the_script():
+    result = run([sys.executable, "-c", "b = bytearray(512 * 1024 * 1024)"], max_memory_mb=256)
+    assert result.returncode != 0
+    assert "MemoryError" in result.stderr
+
+
+def test_watchdog_kills_the_process_group():
+    watchdog = Watchdog(grace_seconds=0.2)
+    process = subprocess.Popen(["bash", "-c", "trap '' TERM; sleep 30 & wait"], start_new_session=True)
+    deadline = watchdog.watch(process.pid, 0.2)
+    started = time.monotonic()
+    assert process.wait(timeout=10) == -signal.SIGKILL
+    assert time.monotonic() - started < 5
+    assert deadline.reason == "timeout"
+
+
+@pytest.mark.parametrize("field, value", [
+    ("timeout_seconds", -1), ("max_memory_mb", -1), ("max_cpu_seconds", -1), ("nice", -5), ("max_output_bytes", -1),
+])
+def test_negative_limits_are_rejected(client, admin_headers, field, value):
+    body = {"taskname": "limits", "sheduled": False, "runcount": 0, "successful": False, "script_type": "bash", field: value}
+    assert client.post("/tasks", json=body, headers=admin_headers).status_code == 422
+
+
+def test_spawn_failure_fails_the_run(tmp_path, monkeypatch):
+    script = tmp_path / "job.sh"
+    script.write_text("echo hello\n")
+    recorded = []
+    monkeypatch.setattr(runner.run_writer, "record", lambda **run: recorded.append(run))
+    monkeypatch.setattr(runner, "plan_retry", lambda *args: None)
+
+    def failing_popen(*args, **kwargs):
+        raise subprocess.SubprocessError("Exception occurred in preexec_fn.")
+
+    monkeypatch.setattr(runner.subprocess, "Popen", failing_popen)
+    assert not run_script(900100, str(script), "", "bash").successful
+    assert recorded[0]["successful"] is False
+    assert recorded[0]["exit_code"] is None
+
+
+def test_usage_ranks_by_cpu_or_duration_only(client, admin_headers):
+    assert client.get("/tasks/usage", params={"order_by": "duration"}, headers=admin_headers).status_code == 200
+    assert client.get("/tasks/usage", params={"order_by": "rss"}, headers=admin_headers).status_code == 422
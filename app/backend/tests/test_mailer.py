@@ -0,0 +1,134 @@
+import socket, time
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+from core.mailer import MailQueue
+
+
+class Recorder:
+    def __init__(self, reject_first: int = 0):
+        self.messages = []
+        self.reject_first = reject_first
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reject_first:
+            self.reject_first -= 1
+            return "451 Try again later"
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def smtp_server(handler):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        controller = Controller(handler, hostname="127.0.0.1", port=port)
+        controller.start()
+        servers.append(controller)
+        return "127.0.0.1", port
+
+    yield smtp_server
+    for controller in servers:
+        controller.stop()
+
+
+def message(subject: str, to: str | None = "user@example.com") -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = "scheduler@example.com"
+    if to:
+        msg["To"] = to
+    msg.set_content("body")
+    return msg
+
+
+def wait_until(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.02)
+
+
+def test_sends_over_one_connection(smtp_server):
+    handler = Recorder()
+    host, port = smtp_server(handler)
+    mail = MailQueue(host=host, port=port, username=None, password=None, starttls=False)
+    for i in range(5):
+        mail.enqueue(message(f"hello {i}"))
+    wait_until(lambda: mail.sent == 5)
+    mail.stop()
+    assert len(handler.messages) == 5
+    assert mail.connections_opened == 1
+
+
+def test_retries_temporary_failures(smtp_server):
+    handler = Recorder(reject_first=1)
+    host, port = smtp_server(handler)
+    mail = MailQueue(host=host, port=port, username=None, password=None, starttls=False, retry_delay=0.05)
+    mail.enqueue(message("retried"))
+    wait_until(lambda: mail.sent == 1)
+    mail.stop()
+    assert mail.failed == 0
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [["user@example.com"]]
+
+
+def test_gives_up_after_max_attempts(smtp_server):
+    handler = Recorder(reject_first=10)
+    host, port = smtp_server(handler)
+    mail = MailQueue(host=host, port=port, username=None, password=None, starttls=False,
+                     retry_delay=0.01, max_attempts=2)
+    mail.enqueue(message("dropped"))
+    wait_until(lambda: mail.failed == 1)
+    mail.stop()
+    assert mail.sent == 0
+
+
+def test_broken_message_does_not_stop_the_queue(smtp_server):
+    handler = Recorder()
+    host, port = smtp_server(handler)
+    mail = MailQueue(host=host, port=port, username=None, password=None, starttls=False)
+    mail.enqueue(message("no recipients", to=None))
+    mail.enqueue(message("after"))
+    wait_until(lambda: mail.sent == 1)
+    assert mail.failed == 1
+    assert mail._thread.is_alive()
+    mail.stop()
+
+
+def test_unexpected_error_does_not_kill_the_thread(smtp_server, monkeypatch):
+    handler = Recorder()
+    host, port = smtp_server(handler)
+    mail = MailQueue(host=host, port=port, username=None, password=None, starttls=False)
+    collect = mail._collect
+    calls = []
+
+    def failing_collect(first):
+        calls.append(first)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return collect(first)
+
+    monkeypatch.setattr(mail, "_collect", failing_collect)
+    mail.enqueue(message("lost"))
+    mail.enqueue(message("delivered"))
+    wait_until(lambda: mail.sent == 1)
+    assert mail._thread.is_alive()
+    mail.stop()
+
+
+def test_stop_flushes_queued_mail(smtp_server):
+    handler = Recorder()
+    host, port = smtp_server(handler)
+    mail = MailQueue(host=host, port=port, username=None, password=None, starttls=False)
+    for i in range(3):
+        mail.enqueue(message(f"queued {i}"))
+    mail.stop()
+    assert len(handler.messages) == 3
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from core.metrics import Counter, Histogram, _Sharded
+
+
+def run_in_threads(fn, count: int):
+    for _ in range(count):
+        thread = threading.Thread(target=fn)
+        thread.start()
+        thread.join()
+
+
+def test_counter_folds_shards_of_exited_threads():
+    counter = Counter("test_events", "Test events.", ("kind",))
+    run_in_threads(lambda: counter.inc("a"), 50)
+    assert counter.collect() == ['test_events_total{kind="a"} 50']
+    assert len(counter._shards) == 0
+    # Totals stay monotonic across scrapes and new threads
+    run_in_threads(lambda: counter.inc("a", amount=2), 5)
+    counter.inc("b")
+    assert counter.collect() == ['test_events_total{kind="a"} 60', 'test_events_total{kind="b"} 1']
+    assert len(counter._shards) == 1
+
+
+def test_histogram_folds_shards_of_exited_threads():
+    histogram = Histogram("test_seconds", "Test durations.", buckets=(1, 10))
+    run_in_threads(lambda: histogram.observe(0.5), 20)
+    run_in_threads(lambda: histogram.observe(5), 10)
+    lines = histogram.collect()
+    assert 'test_seconds_bucket{le="1"} 20' in lines
+    assert 'test_seconds_bucket{le="10"} 30' in lines
+    assert "test_seconds_count 30" in lines
+    assert len(histogram._shards) == 0
+    assert "test_seconds_count 30" in histogram.collect()
+
+
+def test_mail_totals_are_counters(client):
+    body = client.get("/metrics").text
+    assert "# TYPE mail_messages counter" in body
+    assert "# TYPE smtp_connections_opened counter" in body
+    mail_queue = [line for line in body.splitlines() if line.startswith("mail_queue{")]
+    assert sorted(line.split("}")[0] for line in mail_queue) == ['mail_queue{state="queued"', 'mail_queue{state="retrying"']
+
+
+def test_shard_types_must_implement_merge():
+    class Incomplete(_Sharded):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,49 @@
+from core import output
+from core.output import OutputCapture, RingBuffer, drop_captures, tail_output, TRUNCATION_MARKER
+
+
+def test_captures_are_bounded(monkeypatch):
+    monkeypatch.setattr(output, "TASK_OUTPUT_CAPTURES", 3)
+    for task_id in range(900001, 900006):
+        capture = OutputCapture(task_id)
+        capture.write(f"task {task_id}\n".encode())
+        capture.close()
+    assert len(output._captures) <= 3
+    assert list(output._captures)[-3:] == [900003, 900004, 900005]
+    # Evicted captures are still served from their log file
+    assert tail_output(900001, 100)["output"] == "task 900001\n"
+    assert tail_output(900001, 100)["running"] is None
+
+
+def test_deleted_tasks_are_dropped():
+    capture = OutputCapture(900010)
+    capture.write(b"hello\n")
+    capture.close()
+    assert tail_output(900010, 100)["running"] is False
+    drop_captures([900010])
+    assert 900010 not in output._captures
+
+
+def test_ring_buffer_keeps_the_newest_bytes():
+    buffer = RingBuffer(8)
+    for chunk in (b"0123", b"4567", b"89ab"):
+        buffer.append(chunk)
+    assert buffer.tail(100) == b"456789ab"
+    assert buffer.tail(3) == b"9ab"
+    assert buffer.dropped == 4
+
+
+def test_output_beyond_the_limits_is_truncated():
+    capture = OutputCapture(900020, buffer_bytes=16, max_bytes=32)
+    data = bytes(range(65, 91)) * 2  # 52 bytes
+    for offset in range(0, len(data), 10):
+        capture.write(data[offset:offset + 10])
+    capture.close()
+    # The log keeps the first max_bytes followed by the marker, the tail buffer the newest bytes
+    with open(capture.log_path, "rb") as f:
+        assert f.read() == data[:32] + TRUNCATION_MARKER.format(32).encode()
+    result = tail_output(900020, 100)
+    assert result["output"] == data[-16:].decode()
+    assert result["truncated"] is True and result["total_bytes"] == len(data)
+    assert capture.buffer.dropped == len(data) - 16
+    drop_captures([900020])
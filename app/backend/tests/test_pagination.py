@@ -0,0 +1,32 @@
+import uuid
+
+
+def pages(client, headers, **params) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        query = params | ({"cursor": cursor} if cursor else {})
+        response = client.get("/tasks", params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([task["id"] for task in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+def test_cursor_walks_filtered_pages(client, admin_headers, make_task):
+    prefix = f"page-{uuid.uuid4().hex[:8]}-"
+    bash = [make_task(taskname=f"{prefix}{i}")["id"] for i in range(5)]
+    python = make_task(taskname=f"{prefix}python", script_type="python")["id"]
+    make_task(taskname=f"other-{prefix}")
+
+    assert pages(client, admin_headers, limit=2, name_prefix=prefix, script_type="bash") == [bash[0:2], bash[2:4], bash[4:]]
+    # A last page that is exactly full is followed by an empty one
+    assert pages(client, admin_headers, limit=3, name_prefix=prefix) == [bash[0:3], bash[3:] + [python], []]
+    assert pages(client, admin_headers, limit=7, name_prefix=prefix) == [bash + [python]]
+
+
+def test_bad_cursor_is_rejected(client, admin_headers):
+    # Not base64, no position, and a position that is not an id
+    for cursor in ("not-a-cursor!", "e30", "eyJhZnRlciI6Im5vIn0"):
+        response = client.get("/tasks", params={"cursor": cursor}, headers=admin_headers)
+        assert response.status_code == 400, cursor
@@ -0,0 +1,135 @@
+import time
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import delete, select
+
+from core import dag, retry
+from core.dag import submit_run
+from core.executor import TaskExecutor
+from core.retry import backoff_delay, exit_codes, is_retryable, plan_retry, retry_failed
+from core.runner import RunResult
+from core.run_queue import run_requests
+from db.session import scheduler_engine
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.02)
+
+
+POLICY = {"max_attempts": 3, "retry_delay_seconds": 10, "retry_max_delay_seconds": 25,
+          "retry_jitter": 1.0, "retry_exit_codes": None}
+
+
+def test_exit_codes():
+    assert exit_codes(None) is None
+    assert exit_codes("1, 75") == {1, 75}
+    assert exit_codes("x, 2") == {2}
+    assert exit_codes("x") is None
+
+
+def test_is_retryable():
+    assert is_retryable(POLICY, 1, 1)
+    assert not is_retryable(POLICY, 3, 1)
+    policy = {**POLICY, "retry_exit_codes": "75"}
+    assert is_retryable(policy, 1, 75)
+    assert not is_retryable(policy, 1, 1)
+    assert not is_retryable(policy, 1, None)
+
+
+def test_backoff_delay():
+    policy = {**POLICY, "retry_jitter": 0.0}
+    assert [backoff_delay(policy, attempt) for attempt in (1, 2, 3)] == [10, 20, 25]
+    for _ in range(100):
+        assert 0 < backoff_delay(POLICY, 2) <= 20
+        assert 10 <= backoff_delay({**POLICY, "retry_jitter": 0.5}, 2) <= 20
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(retry, "_schedule_local", lambda *args: calls.append(args))
+    return calls
+
+
+@pytest.fixture
+def queued():
+    yield lambda task_id: _queued(task_id)
+    with scheduler_engine.begin() as connection:
+        connection.execute(delete(run_requests))
+
+
+def _queued(task_id: int) -> list:
+    with scheduler_engine.connect() as connection:
+        return connection.execute(
+            select(run_requests.c.attempt, run_requests.c.available_at).where(run_requests.c.task_id == task_id)
+        ).all()
+
+
+def test_plans_retry_from_the_task_policy(make_task):
+    task = make_task(max_attempts=2, retry_delay_seconds=5, retry_jitter=0.0)
+    before = datetime.now(timezone.utc)
+    run_at = plan_retry(task["id"], 1, 1)
+    assert before + timedelta(seconds=5) <= run_at <= datetime.now(timezone.utc) + timedelta(seconds=5)
+    assert plan_retry(task["id"], 2, 1) is None
+    assert plan_retry(-1, 1, 1) is None
+
+
+def test_schedules_local_retry(scheduled):
+    run_at = datetime.now(timezone.utc)
+    retry_failed(5, "bash", RunResult(False, 1, run_at))
+    retry_failed(5, "bash", RunResult(False, 2))
+    assert scheduled == [(5, 2, run_at)]
+
+
+def test_queues_retry_without_scheduler(make_task, queued, monkeypatch):
+    monkeypatch.setattr(retry, "_schedule_local", None)
+    task = make_task()
+    retry_failed(task["id"], "bash", RunResult(False, 1, datetime.now(timezone.utc) + timedelta(minutes=1)))
+    [row] = queued(task["id"])
+    assert row.attempt == 2 and row.available_at is not None
+
+
+def test_queues_retry(make_task, scheduled, queued, monkeypatch):
+    monkeypatch.setattr(retry, "EXECUTION_MODE", "queue")
+    task = make_task()
+    retry_failed(task["id"], "bash", RunResult(False, 2, datetime.now(timezone.utc) + timedelta(minutes=1)))
+    assert [row.attempt for row in queued(task["id"])] == [3]
+    assert scheduled == []
+
+
+@pytest.fixture
+def failing_task(make_task, make_script):
+    from routers.tasks import retry_job_id, scheduler
+
+    task = make_task(script_path=make_script("exit 3\n"), max_attempts=2, retry_delay_seconds=3600, retry_exit_codes="3")
+    yield task
+    if scheduler.get_job(retry_job_id(task["id"])):
+        scheduler.remove_job(retry_job_id(task["id"]))
+
+
+def retry_job(task: dict):
+    from routers.tasks import retry_job_id, scheduler
+    return scheduler.get_job(retry_job_id(task["id"]))
+
+
+def test_failed_run_registers_a_retry_job(failing_task):
+    future = submit_run(failing_task["id"], failing_task["script_path"], "", "bash")
+    assert not future.result(timeout=10).successful
+    wait_until(lambda: retry_job(failing_task) is not None)
+    assert retry_job(failing_task).args == (failing_task["id"], 2)
+
+
+def test_failed_run_in_a_pool_process_registers_a_retry_job(failing_task, monkeypatch):
+    pool = TaskExecutor(max_workers=1, type_limits={}, max_queue=10, mode="process")
+    monkeypatch.setattr(dag, "executor", pool)
+    try:
+        future = submit_run(failing_task["id"], failing_task["script_path"], "", "bash")
+        result = future.result(timeout=60)
+        assert not result.successful and result.retry_at is not None
+        wait_until(lambda: retry_job(failing_task) is not None)
+        assert retry_job(failing_task).args == (failing_task["id"], 2)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import delete, update
+
+from core import run_queue
+from core.run_queue import enqueue_run, claim_runs, finish_run, heartbeat, queue_depth, run_requests
+from db.session import scheduler_engine
+
+
+@pytest.fixture
+def queue(client):
+    def clear():
+        with scheduler_engine.begin() as connection:
+            connection.execute(delete(run_requests))
+    clear()
+    yield
+    clear()
+
+
+def test_claims_are_handed_out_once(queue, make_task):
+    task = make_task(max_instances=5)
+    for _ in range(3):
+        assert enqueue_run(task["id"])
+    first = claim_runs("worker-a", 2)
+    second = claim_runs("worker-b", 5)
+    assert len(first) == 2 and len(second) == 1
+    assert queue_depth() == {"running": 3}
+    assert not {claim["request_id"] for claim in first} & {claim["request_id"] for claim in second}
+    assert claim_runs("worker-c", 5) == []
+    assert first[0]["task"]["id"] == task["id"]
+
+
+def test_claims_respect_max_instances(queue, make_task):
+    task = make_task(max_instances=1)
+    enqueue_run(task["id"])
+    enqueue_run(task["id"])
+    claimed = claim_runs("worker-a", 5)
+    assert len(claimed) == 1
+    assert claim_runs("worker-b", 5) == []
+    finish_run(claimed[0]["request_id"])
+    assert len(claim_runs("worker-b", 5)) == 1
+
+
+def test_overlap_policy_on_enqueue(queue, make_task):
+    task = make_task()
+    assert enqueue_run(task["id"], max_instances=1)
+    # One run may wait behind the limit, further ones are folded into it
+    assert not enqueue_run(task["id"], max_instances=1)
+    claim_runs("worker-a", 1)
+    assert enqueue_run(task["id"], max_instances=1)
+    assert not enqueue_run(task["id"], max_instances=1, skip_if_running=True)
+
+
+def test_retries_are_not_claimed_before_they_are_due(queue, make_task):
+    task = make_task(max_instances=5)
+    enqueue_run(task["id"], attempt=2, available_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    assert claim_runs("worker-a", 5) == []
+    # A retry that is not due yet does not hold back a regular run
+    assert enqueue_run(task["id"], max_instances=1)
+    enqueue_run(task["id"], attempt=3, available_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    attempts = sorted(claim["attempt"] for claim in claim_runs("worker-a", 5))
+    assert attempts == [1, 3]
+
+
+def test_claims_of_dead_workers_are_handed_out_again(queue, make_task):
+    task = make_task()
+    enqueue_run(task["id"])
+    claimed = claim_runs("worker-a", 1)
+    heartbeat("worker-a")
+    assert claim_runs("worker-b", 1) == []
+    with scheduler_engine.begin() as connection:
+        connection.execute(update(run_requests).values(
+            claimed_at=datetime.now(timezone.utc) - timedelta(seconds=run_queue.WORKER_LEASE_SECONDS + 1)))
+    reclaimed = claim_runs("worker-b", 1)
+    assert [claim["request_id"] for claim in reclaimed] == [claimed[0]["request_id"]]
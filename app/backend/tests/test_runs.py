@@ -0,0 +1,88 @@
+import time, uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlmodel import Session, select, func
+
+from core.runs import RunWriter
+from core.metrics import runs_dropped
+from models.task import Task, TaskRun
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.02)
+
+
+def run_of(task_id: int, successful: bool = True) -> dict:
+    now = datetime.now(timezone.utc)
+    return {"task_id": task_id, "run_id": uuid.uuid4().hex, "started_at": now, "finished_at": now,
+            "duration": 0.0, "exit_code": 0 if successful else 1, "successful": successful}
+
+
+def recorded(engine, task_id: int) -> tuple[int, int]:
+    with Session(engine) as session:
+        rows = session.exec(select(func.count()).select_from(TaskRun).where(TaskRun.task_id == task_id)).one()
+        return rows, session.get(Task, task_id).runcount
+
+
+@pytest.fixture
+def task(engine, make_task):
+    # Runs written after their task was deleted leave rows behind for an id
+    # that SQLite hands out again, so a new task can start with rows
+    task = make_task()
+    task["rows"] = recorded(engine, task["id"])[0]
+    return task
+
+
+def new_runs(engine, task: dict) -> tuple[int, int]:
+    rows, runcount = recorded(engine, task["id"])
+    return rows - task["rows"], runcount
+
+
+def dropped() -> float:
+    return sum(float(line.split()[-1]) for line in runs_dropped.collect())
+
+
+def test_flush_writes_rows_and_bumps_runcount(engine, task):
+    writer = RunWriter()
+    assert writer.flush([run_of(task["id"]) for _ in range(3)] + [run_of(task["id"], successful=False)])
+    assert new_runs(engine, task) == (4, 4)
+    assert writer.flush([run_of(task["id"])])
+    assert new_runs(engine, task) == (5, 5)
+
+
+def test_failed_write_is_retried(engine, task):
+    writer = RunWriter(flush_interval=0.01, retry_delay=0.01)
+    write, failures = writer.flush, []
+
+    def flaky(batch):
+        if len(failures) < 2:
+            failures.append(len(batch))
+            return False
+        return write(batch)
+
+    writer.flush = flaky
+    for _ in range(3):
+        writer.record(**run_of(task["id"]))
+    wait_until(lambda: new_runs(engine, task) == (3, 3))
+    writer.stop()
+    assert len(failures) == 2
+
+
+def test_batch_is_dropped_after_max_attempts(engine, task):
+    writer = RunWriter(flush_interval=0.5, max_attempts=3, retry_delay=0.01)
+    attempts = []
+    writer.flush = lambda batch: attempts.append(len(batch)) or False
+    before = dropped()
+    writer.record(**run_of(task["id"]))
+    writer.record(**run_of(task["id"]))
+    wait_until(lambda: dropped() - before == 2)
+    # Runs arriving after the batch was given up on are written again
+    writer.flush = RunWriter.flush.__get__(writer)
+    writer.record(**run_of(task["id"]))
+    writer.stop()
+    assert len(attempts) == 3
+    assert new_runs(engine, task) == (1, 1)
@@ -0,0 +1,39 @@
+from models.task import Task
+from routers.tasks import scheduler, sync_scheduled_tasks, schedule_tasks, unschedule_tasks
+
+
+def scheduled_task(session, cron: str) -> Task:
+    task = Task(taskname="sync", sheduled=True, runcount=0, successful=False, schedule_cron=cron,
+                script_path="/bin/true", script_type="bash")
+    session.add(task)
+    session.commit()
+    session.refresh(task)
+    return task
+
+
+def test_sync_skips_tasks_with_an_invalid_cron(client, session):
+    broken = scheduled_task(session, "not a cron")
+    valid = scheduled_task(session, "*/5 * * * *")
+    try:
+        sync_scheduled_tasks()
+        assert scheduler.get_job(str(valid.id)) is not None
+        assert scheduler.get_job(str(broken.id)) is None
+    finally:
+        unschedule_tasks([broken.id, valid.id])
+        session.delete(broken)
+        session.delete(valid)
+        session.commit()
+
+
+def test_bulk_scheduling_skips_tasks_with_an_invalid_cron(client, session):
+    broken = scheduled_task(session, "61 * * * *")
+    valid = scheduled_task(session, "0 4 * * *")
+    try:
+        schedule_tasks([broken, valid])
+        assert scheduler.get_job(str(valid.id)) is not None
+        assert scheduler.get_job(str(broken.id)) is None
+    finally:
+        unschedule_tasks([broken.id, valid.id])
+        session.delete(broken)
+        session.delete(valid)
+        session.commit()
@@ -0,0 +1,46 @@
+import json, os, subprocess, sys
+
+from sqlalchemy import create_engine, inspect, text
+
+from db.schema import migrate
+from models.task import Task
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = """
+import json
+from fastapi.testclient import TestClient
+import main
+with TestClient(main.app):
+    print(json.dumps(sorted(main.app.state.startup_timings)))
+"""
+
+
+def test_startup_creates_the_schema_on_an_empty_database(tmp_path):
+    # A fresh interpreter, since the app binds its engines to DATABASE_URL on import
+    database = tmp_path / "empty.db"
+    result = subprocess.run([sys.executable, "-c", STARTUP], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120,
+                            env=os.environ | {"DATABASE_URL": f"sqlite:///{database}"})
+    assert result.returncode == 0, result.stderr
+    assert "schema" in json.loads(result.stdout.splitlines()[-1])
+    tables = set(inspect(create_engine(f"sqlite:///{database}")).get_table_names())
+    assert {"task", "taskrun", "users", "runrequest", "apscheduler_jobs"} <= tables
+
+
+def test_migrate_adds_missing_columns_and_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE task (id INTEGER PRIMARY KEY, taskname VARCHAR NOT NULL, sheduled BOOLEAN NOT NULL,"
+            " runcount INTEGER NOT NULL, successful BOOLEAN NOT NULL)"
+        ))
+        connection.execute(text("INSERT INTO task (taskname, sheduled, runcount, successful) VALUES ('old', 0, 3, 1)"))
+    migrate(engine)
+    migrate(engine)  # a second run finds nothing to do
+
+    inspector = inspect(engine)
+    assert {column.name for column in Task.__table__.columns} <= {column["name"] for column in inspector.get_columns("task")}
+    assert {index.name for index in Task.__table__.indexes} <= {index["name"] for index in inspector.get_indexes("task")}
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT taskname, runcount, max_instances FROM task")).one()
+    assert tuple(row) == ("old", 3, 1)
@@ -0,0 +1,130 @@
+import os, subprocess, sys, time
+
+import pytest
+
+from core.scripts import ScriptRegistry, ScriptInvalid
+from core.runner import _cold_command, run_script
+from core import runner
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.02)
+
+
+def compiles(registry, path: str) -> bool:
+    try:
+        return registry.lookup(path, "python")["code_path"] is not None
+    except ScriptInvalid:
+        return False
+
+
+@pytest.fixture(params=["inotify", "stat"])
+def registry(request, tmp_path):
+    return ScriptRegistry(cache_dir=str(tmp_path / "cache"), watch=request.param)
+
+
+def test_changed_script_is_reloaded(registry, tmp_path):
+    script = tmp_path / "job.py"
+    script.write_text("print('one')\n")
+    first = registry.lookup(str(script), "python")
+    assert registry.lookup(str(script), "python")["sha256"] == first["sha256"]
+    assert registry.hits == 1
+
+    # Saved the way editors do: a new file renamed over the old one
+    (tmp_path / "job.py.new").write_text("print('two, longer')\n")
+    os.replace(tmp_path / "job.py.new", script)
+    wait_until(lambda: registry.lookup(str(script), "python")["sha256"] != first["sha256"])
+
+
+def test_broken_and_fixed_script(registry, tmp_path):
+    script = tmp_path / "job.py"
+    script.write_text("def broken(:\n")
+    with pytest.raises(ScriptInvalid, match="does not compile"):
+        registry.lookup(str(script), "python")
+    script.write_text("print('fixed')\n")
+    wait_until(lambda: compiles(registry, str(script)))
+
+
+def test_missing_script_and_deleted_script(registry, tmp_path):
+    with pytest.raises(ScriptInvalid, match="can't be read"):
+        registry.lookup(str(tmp_path / "missing.sh"), "bash")
+    script = tmp_path / "job.sh"
+    script.write_text("echo hi\n")
+    registry.lookup(str(script), "bash")
+    script.unlink()
+
+    def rejected():
+        try:
+            registry.lookup(str(script), "bash")
+        except ScriptInvalid:
+            return True
+        return False
+    wait_until(rejected)
+
+
+def test_bash_syntax_error(registry, tmp_path):
+    script = tmp_path / "job.sh"
+    script.write_text("if then fi\n")
+    with pytest.raises(ScriptInvalid, match="syntax error"):
+        registry.lookup(str(script), "bash")
+
+
+def test_cold_runs_execute_the_cached_bytecode(tmp_path):
+    registry = ScriptRegistry(cache_dir=str(tmp_path / "cache"), watch="stat")
+    scripts = tmp_path / "scripts"
+    scripts.mkdir()
+    (scripts / "helper.py").write_text("NAME = 'helper'\n")
+    script = scripts / "job.py"
+    script.write_text("import sys, helper\nprint(__name__, __file__, sys.argv[1:], helper.NAME)\n")
+    entry = registry.lookup(str(script), "python")
+    command = _cold_command([sys.executable, str(script), "a", "b"], entry)
+    assert entry["code_path"] in command
+
+    # Without its source the script can only run from the bytecode
+    script.unlink()
+    result = subprocess.run(command, capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["__main__", str(script), "['a',", "'b']", "helper"]
+
+
+def test_cold_run_falls_back_to_the_source(tmp_path):
+    script = tmp_path / "job.py"
+    script.write_text("import sys\nsys.exit(3)\n")
+    command = _cold_command([sys.executable, str(script)], {"script_type": "python", "code_path": str(tmp_path / "gone.pyc")})
+    assert subprocess.run(command, timeout=30).returncode == 3
+
+
+def test_cache_is_evicted_by_size(tmp_path):
+    registry = ScriptRegistry(cache_dir=str(tmp_path / "cache"), watch="stat", maxsize=2, cache_max_bytes=1)
+    paths = []
+    for i in range(5):
+        script = tmp_path / f"job{i}.py"
+        script.write_text(f"print({i})\n")
+        paths.append(registry.lookup(str(script), "python")["code_path"])
+    cached = {os.path.join(registry.cache_dir, name) for name in os.listdir(registry.cache_dir)}
+    # Over the limit, only the new file and those of scripts in the registry at the time stay
+    assert cached == set(paths[2:])
+
+
+def test_runner_does_not_spawn_invalid_scripts(tmp_path, monkeypatch):
+    script = tmp_path / "job.py"
+    script.write_text("def broken(:\n")
+    recorded = []
+    monkeypatch.setattr(runner.run_writer, "record", lambda **run: recorded.append(run))
+    monkeypatch.setattr(runner, "plan_retry", lambda *args: None)
+    monkeypatch.setattr(runner, "_spawn", lambda *args: pytest.fail("spawned an invalid script"))
+    assert not run_script(900300, str(script), "", "python").successful
+    assert recorded[0]["exit_code"] is None
+
+
+def test_cold_python_run(tmp_path, monkeypatch):
+    script = tmp_path / "job.py"
+    script.write_text("import sys\nprint('hello', *sys.argv[1:])\n")
+    recorded = []
+    monkeypatch.setattr(runner.run_writer, "record", lambda **run: recorded.append(run))
+    assert run_script(900301, str(script), "x y", "python").successful
+    with open(recorded[0]["output_path"]) as f:
+        assert f.read() == "hello x y\n"
@@ -0,0 +1,36 @@
+import pytest
+
+from routers.tasks import scheduler
+
+
+def body(script: str, **fields) -> dict:
+    return {"taskname": "options", "sheduled": True, "schedule_cron": "*/15 * * * *", "runcount": 0, "successful": False,
+            "script_path": script, "script_type": "bash", **fields}
+
+
+@pytest.mark.parametrize("bad", [
+    {"max_instances": 0},
+    {"misfire_grace_time": 0},
+    {"misfire_grace_time": -5},
+    {"schedule_cron": "* * *"},
+])
+def test_invalid_job_options_are_rejected_before_the_commit(client, admin_headers, script, bad):
+    before = len(client.get("/tasks", params={"limit": 1000}, headers=admin_headers).json())
+    response = client.post("/tasks", json=body(script, **bad), headers=admin_headers)
+    assert response.status_code == 422, response.text
+    assert len(client.get("/tasks", params={"limit": 1000}, headers=admin_headers).json()) == before
+
+
+def test_job_options_reach_the_scheduler(client, admin_headers, script):
+    task = client.post("/tasks", json=body(script, coalesce=False, misfire_grace_time=30, max_instances=2),
+                       headers=admin_headers).json()
+    try:
+        job = scheduler.get_job(str(task["id"]))
+        assert job.coalesce is False
+        assert job.misfire_grace_time == 30
+        assert job.args[4] == 2
+        response = client.put(f"/tasks/{task['id']}", json=body(script, misfire_grace_time=0), headers=admin_headers)
+        assert response.status_code == 422
+        assert scheduler.get_job(str(task["id"])).misfire_grace_time == 30
+    finally:
+        client.delete(f"/tasks/{task['id']}", headers=admin_headers)
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlmodel import select
+
+from core import timeline
+from core.timeline import expand_cron, rebuild_fire_times, drop_fire_times, use_timezone
+from models.task import TaskFireTime
+from routers.tasks import scheduler
+
+BERLIN = ZoneInfo("Europe/Berlin")
+
+
+@pytest.fixture
+def berlin():
+    previous = timeline._timezone
+    use_timezone(BERLIN)
+    yield BERLIN
+    use_timezone(previous)
+
+
+def test_cron_is_expanded_in_the_given_timezone():
+    start = datetime(2026, 1, 10, 12, 0, tzinfo=timezone.utc)
+    fires, _ = expand_cron("0 3 * * *", start, BERLIN)
+    assert fires[0] == datetime(2026, 1, 11, 2, 0, tzinfo=timezone.utc)
+    assert all(fire.tzinfo == timezone.utc for fire in fires)
+    fires, _ = expand_cron("0 3 * * *", start, timezone.utc)
+    assert fires[0] == datetime(2026, 1, 11, 3, 0, tzinfo=timezone.utc)
+
+
+def test_stored_fire_times_follow_the_scheduler_timezone(engine, session, berlin):
+    rebuild_fire_times([(900200, "30 3 * * *")])
+    try:
+        fires = session.exec(select(TaskFireTime.fire_at).where(TaskFireTime.task_id == 900200)).all()
+        assert fires
+        assert all(fire.astimezone(BERLIN).hour == 3 and fire.minute == 30 for fire in fires)
+    finally:
+        drop_fire_times([900200])
+
+
+def test_timeline_matches_the_scheduled_job(client, admin_headers, session, tmp_path):
+    script = tmp_path / "job.sh"
+    script.write_text("echo hello\n")
+    body = {"taskname": "timeline", "sheduled": True, "schedule_cron": "17 */2 * * *", "runcount": 0,
+            "successful": False, "script_path": str(script), "script_type": "bash"}
+    task = client.post("/tasks", json=body, headers=admin_headers).json()
+    try:
+        job = scheduler.get_job(str(task["id"]))
+        first = session.exec(select(TaskFireTime.fire_at).where(TaskFireTime.task_id == task["id"])
+                             .order_by(TaskFireTime.fire_at)).first()
+        assert first == job.next_run_time.astimezone(timezone.utc)
+    finally:
+        client.delete(f"/tasks/{task['id']}", headers=admin_headers)
@@ -0,0 +1,42 @@
+import uuid
+
+import pytest
+from sqlmodel import Session
+
+from core.security import hash_password, user_cache
+from models.user import Users, UserRole
+
+
+@pytest.fixture
+def user(client, engine):
+    with Session(engine) as session:
+        user = Users(username=f"cached-{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@example.com",
+                     hashed_password=hash_password("first"), is_active=True, role=UserRole.admin)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+    token = client.post("/login", data={"username": user.username, "password": "first"}).json()["access_token"]
+    yield user, {"Authorization": f"Bearer {token}"}
+    with Session(engine) as session:
+        session.delete(session.get(Users, user.id))
+        session.commit()
+    user_cache.pop(user.id)
+
+
+def test_role_change_invalidates_the_cached_user(client, admin_headers, user):
+    user, headers = user
+    assert client.get("/admin/users", headers=headers).status_code == 200
+    assert user_cache.get(user.id) is not None
+    response = client.put(f"/admin/users/{user.id}/role", json={"role": "viewer"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get("/admin/users", headers=headers).status_code == 403
+
+
+def test_password_change_invalidates_the_cached_user(client, user):
+    user, headers = user
+    change = {"old_password": "first", "new_password": "second"}
+    assert client.post("/change-password", json=change, headers=headers).status_code == 200
+    # A cached user would still carry the old password hash
+    assert client.post("/change-password", json=change, headers=headers).status_code == 403
+    back = {"old_password": "second", "new_password": "first"}
+    assert client.post("/change-password", json=back, headers=headers).status_code == 200
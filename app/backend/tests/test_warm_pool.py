@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from core import runner, warm_pool as warm_pool_module
+from core.limits import effective_limits, killed_reason
+from core.output import OutputCapture, drop_captures, tail_output
+from core.warm_pool import WarmPool, WarmPoolUnavailable
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def pool():
+    pool = WarmPool(preload="", max_runs=2)
+    yield pool
+    pool.shutdown()
+
+
+def run(pool: WarmPool, script: str, args: list[str] = (), **limits) -> tuple[int | None, str, object]:
+    capture = OutputCapture(900500)
+    try:
+        returncode, _, deadline = pool.run(script, list(args), capture, effective_limits(limits))
+    finally:
+        capture.close()
+        drop_captures([900500])
+    return returncode, capture.tail(4096), deadline
+
+
+def test_exit_code_and_argv_are_passed_through(pool, make_script):
+    script = make_script("import sys\nprint(sys.argv[1:])\nsys.exit(3)\n", "job.py")
+    returncode, output, _ = run(pool, script, ["a", "b c"])
+    assert returncode == 3
+    assert output == "['a', 'b c']\n"
+
+
+def test_timeout_kills_the_forked_child(pool, make_script):
+    script = make_script("import time\nprint('started', flush=True)\ntime.sleep(60)\n", "job.py")
+    started = time.monotonic()
+    returncode, output, deadline = run(pool, script, timeout_seconds=1)
+    assert time.monotonic() - started < 30
+    assert returncode is not None and returncode < 0
+    assert killed_reason(deadline, returncode) == "timeout"
+    assert output == "started\n"
+
+
+def test_template_is_recycled_after_max_runs(pool, make_script):
+    script = make_script("print('ok')\n", "job.py")
+    for _ in range(3):
+        assert run(pool, script)[0] == 0
+    assert pool.templates_started == 2
+
+
+def test_template_is_replaced_after_a_crash(pool, make_script):
+    script = make_script("print('ok')\n", "job.py")
+    assert run(pool, script)[0] == 0
+    template = pool._template
+    template.process.kill()
+    wait_until(lambda: template.closed)
+    assert run(pool, script)[:2] == (0, "ok\n")
+    assert pool.templates_started == 2
+
+
+def test_unavailable_template_is_reported(monkeypatch):
+    def broken(preload):
+        raise OSError("no python3")
+
+    monkeypatch.setattr(warm_pool_module, "_Template", broken)
+    with pytest.raises(WarmPoolUnavailable):
+        WarmPool()._current()
+
+
+def test_runner_falls_back_to_a_cold_run(engine, make_script, monkeypatch):
+    class Unavailable:
+        def run(self, *args):
+            raise WarmPoolUnavailable("template is shutting down")
+
+    monkeypatch.setattr(runner, "warm_pool", Unavailable())
+    monkeypatch.setattr(runner, "plan_retry", lambda *args: None)
+    script = make_script("import sys\nprint(sys.argv[1:])\n", "job.py")
+    assert runner.run_script(900501, script, "x y", "python").successful
+    assert tail_output(900501, 100)["output"] == "['x', 'y']\n"
+    drop_captures([900501])
@@ -0,0 +1,116 @@
+"""
+worker.py
+
+Standalone worker for EXECUTION_MODE=queue. Claims pending runs from the
+RunRequest queue, executes them on the local bounded executor and records the
+results. Start as many workers on as many hosts as needed:
+
+    python worker.py
+
+Environment Variables:
+- WORKER_POLL_INTERVAL: Seconds to sleep when the queue is empty.
+- WORKER_HEARTBEAT_INTERVAL: Seconds between lease renewals of claimed runs.
+- WORKER_METRICS_PORT: If set, serves Prometheus metrics of this worker on that port.
+- TASK_MAX_WORKERS / TASK_TYPE_LIMITS / TASK_EXECUTOR_MODE: see core/executor.py.
+"""
+
+import os, time, socket, signal, threading, logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.executor import executor
+from core.runner import run_script, RunResult
+from core.runs import run_writer
+from core.run_queue import claim_runs, finish_run, heartbeat
+from core.dag import start_downstream
+from core.retry import retry_failed
+from core.limits import task_limits
+from core.metrics import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("worker")
+
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", 1))
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", 30))
+WORKER_METRICS_PORT = os.getenv("WORKER_METRICS_PORT")
+
+stop = threading.Event()
+
+
+def execute(claim: dict) -> RunResult:
+    try:
+        task = claim["task"]
+        if task is None:
+            logger.warning(f"Task {claim['task_id']} no longer exists, dropping run request {claim['request_id']}")
+            return RunResult(False, claim["attempt"])
+        return run_script(task["id"], task["script_path"], task["parameters"] or "", task["script_type"], task_limits(task),
+                          claim["attempt"])
+    finally:
+        finish_run(claim["request_id"])
+
+
+def schedule_retry(task_id: int, script_type: str, future):
+    # Failed runs come back with the time of their next attempt, which goes
+    # back into the queue from here, also when the run executed in a pool process
+    if future.exception() is None:
+        retry_failed(task_id, script_type, future.result())
+
+
+def trigger_downstream(task_id: int, future):
+    # Tasks depending on this one run as a DAG on this worker's executor
+    if future.exception() is None and future.result().successful:
+        start_downstream(task_id)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port: int):
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Serving metrics on port {port}")
+
+
+def main():
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    logger.info(f"Worker {worker_id} started with {executor.max_workers} slots")
+    if WORKER_METRICS_PORT:
+        serve_metrics(int(WORKER_METRICS_PORT))
+
+    last_heartbeat = time.monotonic()
+    while not stop.is_set():
+        if time.monotonic() - last_heartbeat >= WORKER_HEARTBEAT_INTERVAL:
+            heartbeat(worker_id)
+            last_heartbeat = time.monotonic()
+
+        slots = executor.free_slots()
+        claimed = claim_runs(worker_id, slots) if slots else []
+        for claim in claimed:
+            script_type = claim["task"]["script_type"] if claim["task"] else "unknown"
+            future = executor.submit(script_type, execute, claim)
+            future.add_done_callback(lambda f, task_id=claim["task_id"], script_type=script_type: schedule_retry(task_id, script_type, f))
+            future.add_done_callback(lambda f, task_id=claim["task_id"]: trigger_downstream(task_id, f))
+        if not claimed:
+            stop.wait(WORKER_POLL_INTERVAL)
+
+    logger.info(f"Worker {worker_id} stopping, waiting for running scripts")
+    executor.shutdown(wait=True)
+    run_writer.stop()
+
+
+if __name__ == "__main__":
+    main()